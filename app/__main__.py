@@ -10,13 +10,28 @@ import argparse
 import sys
 import json
 import os
+import time
+from datetime import datetime
 from pathlib import Path
 
 from app.interactive_questionnaire import InteractiveQuestionnaire
-from app.app_config import RESPONSES_DIR, GENERATED_DIR
+from app.app_config import GENERATED_DIR, LAYOUTS
+from app.utils.gemini_utils import PREFERRED_MODEL
+from app.utils.model_resolver import get_model_resolver
+from app.utils.generation_backends import get_backend
+from app.utils.batch_generation import (
+    DEFAULT_WORKERS, find_response_files, run_batch,
+    print_batch_result, print_batch_summary
+)
+from app.utils.response_validator import get_response_validator
+from app.utils.generated_dirs import sweep_empty_dirs
+from app.utils.answer_journal import journal_path
+from app.utils.response_catalog import FORMAT_UNREADABLE, get_response_catalog
+from app.utils.layout_migration import migrate_layout
+from app.utils.storage import FileStorage, get_storage
 
-def main():
-    """Main entry point for the Portfolio Builder application."""
+def build_parser():
+    """Build the command-line parser."""
     parser = argparse.ArgumentParser(
         description="NESA Stage 6 IT Multimedia Portfolio Builder"
     )
@@ -44,6 +59,11 @@ def main():
         help='Student ID to load responses for',
         type=str
     )
+    load_parser.add_argument(
+        '--fuzzy',
+        action='store_true',
+        help='Match --student-id against part of the student ID or file name'
+    )
     
     # List command
     list_parser = subparsers.add_parser('list', help='List available resources')
@@ -57,127 +77,387 @@ def main():
         action='store_true',
         help='List all response files'
     )
+    list_parser.add_argument(
+        '--rebuild-index',
+        action='store_true',
+        help='Rebuild the response catalog from the files on disk first'
+    )
+    list_parser.add_argument(
+        '--page-size',
+        type=int,
+        help='Show student portfolios this many at a time (default: all)'
+    )
+    list_parser.add_argument(
+        '--page',
+        type=int,
+        default=1,
+        help='Which page of student portfolios to show with --page-size (default: 1)'
+    )
     
-    # Parse arguments
-    args = parser.parse_args()
+    # Batch generation command
+    batch_parser = subparsers.add_parser(
+        'batch', help='Generate statements for every responses file'
+    )
+    batch_parser.add_argument(
+        '--responses-dir',
+        help='Directory of responses files to use instead of the configured storage',
+        type=str,
+        default=None
+    )
+    batch_parser.add_argument(
+        '--pattern',
+        help='Glob pattern for responses files',
+        type=str,
+        default='*.json'
+    )
+    batch_parser.add_argument(
+        '--workers',
+        help='Number of concurrent generations',
+        type=int,
+        default=DEFAULT_WORKERS
+    )
+    batch_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always call the model, ignoring cached generations'
+    )
+    batch_parser.add_argument(
+        '--hedge-after',
+        help='Send a duplicate request to a fallback model if the preferred model '
+             'has not responded after this many seconds',
+        type=float,
+        default=None
+    )
+    batch_parser.add_argument(
+        '--by-section',
+        action='store_true',
+        help='Generate the sections of each statement in parallel and stitch them together'
+    )
     
-    # If no command specified, show a menu of options
-    if not args.command:
-        print("\nNESA Stage 6 IT Multimedia Portfolio Builder")
-        print("-" * 50)
-        print("Please select an option:")
-        print("1. Start a new questionnaire")
-        print("2. Load existing responses")
-        print("3. List available resources")
-        print("4. Exit")
-        
+    # Model resolution cache command
+    models_parser = subparsers.add_parser(
+        'models', help='Show or refresh the cached model choice'
+    )
+    models_parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Forget the cached fallback model and recorded model failures'
+    )
+    
+    # Validate responses files command
+    validate_parser = subparsers.add_parser(
+        'validate', help='Check every responses file against the schema'
+    )
+    validate_parser.add_argument(
+        '--responses-dir',
+        help='Directory of responses files to use instead of the configured storage',
+        type=str,
+        default=None
+    )
+    validate_parser.add_argument(
+        '--pattern',
+        help='Glob pattern for responses files',
+        type=str,
+        default='*.json'
+    )
+    
+    # Sweep empty generated directories command
+    sweep_parser = subparsers.add_parser(
+        'sweep', help='Remove empty directories left in the generated statements folder'
+    )
+    sweep_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only list the directories that would be removed'
+    )
+    
+    # Storage layout migration command
+    migrate_parser = subparsers.add_parser(
+        'migrate', help='Move responses and statements into the flat or sharded layout'
+    )
+    migrate_parser.add_argument(
+        'layout',
+        choices=LAYOUTS,
+        help='Layout to switch to'
+    )
+    migrate_parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Only count what would be moved'
+    )
+    
+    return parser
+
+MENU_OPTIONS = """
+NESA Stage 6 IT Multimedia Portfolio Builder
+--------------------------------------------------
+Please select an option:
+1. Start a new questionnaire
+2. Load existing responses
+3. List available resources
+4. Exit"""
+
+class MenuSession:
+    """Runs the main menu and the commands chosen from it in one loop.
+
+    Each command returns the next state ('menu' or 'exit') instead of calling
+    main() again, so a long session doesn't build up a deeper stack or keep
+    earlier questionnaires alive. The session owns the current questionnaire.
+    """
+
+    def __init__(self):
+        self.questionnaire = None
+
+    def run(self, args=None):
+        """Run commands until the user exits.
+
+        Args:
+            args (argparse.Namespace, optional): Command to run first; the menu
+                is shown if it has none
+        """
+        state = 'menu'
+        if args is not None and args.command:
+            state = self.run_command(args)
+        while state == 'menu':
+            args = self.choose_from_menu()
+            state = self.run_command(args) if args is not None else 'exit'
+        self.questionnaire = None
+
+    def choose_from_menu(self):
+        """Show the menu and return the chosen command, or None to exit."""
+        print(MENU_OPTIONS)
         while True:
             try:
                 choice = input("\nEnter your choice (1-4): ")
                 
                 if choice == '1':
-                    args.command = 'new'
-                    args.student_id = None
-                    break
+                    return argparse.Namespace(command='new', student_id=None)
                 elif choice == '2':
-                    args.command = 'load'
-                    # Initialize attributes for the 'load' command
-                    args.responses_file = None
-                    args.student_id = None
-                    break
+                    return argparse.Namespace(command='load', responses_file=None,
+                                              student_id=None, fuzzy=False)
                 elif choice == '3':
-                    args.command = 'list'
-                    # Initialize attributes for the 'list' command
-                    args.students = True
-                    args.responses = True
                     # Show both students and responses
-                    list_response_files()
-                    print("\n")
-                    list_student_portfolios()
-                    # Return to main menu
-                    input("\nPress ENTER to return to the main menu...")
-                    main()  # Restart the main function to show the menu again
-                    return
+                    return argparse.Namespace(command='list', students=False,
+                                              responses=False, rebuild_index=False,
+                                              page=1, page_size=None)
                 elif choice == '4':
                     print("Exiting...")
-                    return
+                    return None
                 else:
                     print("Invalid choice. Please enter a number between 1 and 4.")
             except ValueError:
                 print("Invalid input. Please enter a number.")
-            except KeyboardInterrupt:
+            except (KeyboardInterrupt, EOFError):
                 print("\nExiting...")
-                return
+                return None
+
+    def run_command(self, args):
+        """Run one command.
+
+        Returns:
+            str: 'menu' to show the main menu again, 'exit' to stop
+        """
+        if args.command == 'list':
+            if args.rebuild_index:
+                get_response_catalog().rebuild()
+                print("Response catalog rebuilt.")
+            if args.students:
+                list_student_portfolios(args.page, args.page_size)
+            elif args.responses:
+                list_response_files()
+            else:
+                # Default to listing both
+                list_response_files()
+                print("\n")
+                list_student_portfolios(args.page, args.page_size)
+            # Return to main menu
+            input("\nPress ENTER to return to the main menu...")
+            return 'menu'
+        
+        elif args.command == 'batch':
+            run_batch_command(args.responses_dir, args.pattern, args.workers,
+                              use_cache=not args.no_cache, hedge_after=args.hedge_after,
+                              by_section=args.by_section)
+        
+        elif args.command == 'models':
+            show_model_cache(refresh=args.refresh)
+        
+        elif args.command == 'validate':
+            validate_responses_command(args.responses_dir, args.pattern)
+        
+        elif args.command == 'sweep':
+            sweep_command(dry_run=args.dry_run)
+        
+        elif args.command == 'migrate':
+            migrate_command(args.layout, dry_run=args.dry_run)
+        
+        elif args.command == 'load':
+            # Load existing responses
+            storage = get_storage()
+            if args.responses_file:
+                responses_path = storage.find_responses(args.responses_file)
+            elif args.student_id:
+                # Find responses file for student ID
+                responses_path = find_responses_for_student(args.student_id, args.fuzzy)
+            else:
+                # List available response files and prompt user to select one
+                responses_path = select_responses_file()
+            
+            if responses_path and storage.responses_exists(responses_path):
+                # Run questionnaire with loaded responses
+                self.questionnaire = InteractiveQuestionnaire()
+                self.questionnaire.load_responses_from_file(responses_path)
+            elif args.student_id and journal_path(args.student_id).exists():
+                # Never saved, but the answers given so far were journalled
+                self.questionnaire = InteractiveQuestionnaire(student_id=args.student_id)
+                self.questionnaire.recover_unsaved_responses()
+            else:
+                print(f"Error: Could not find responses file.")
+                return 'exit'
+            return self.run_questionnaire()
+        
+        else:  # 'new' command
+            # Run the interactive questionnaire
+            self.questionnaire = InteractiveQuestionnaire(student_id=args.student_id)
+            if args.student_id:
+                self.questionnaire.recover_unsaved_responses()
+            return self.run_questionnaire()
+        return 'exit'
+
+    def run_questionnaire(self):
+        """Run the current questionnaire, then release it."""
+        back_to_menu = self.questionnaire.run()
+        self.questionnaire = None
+        return 'menu' if back_to_menu else 'exit'
+
+def main(argv=None):
+    """Main entry point for the Portfolio Builder application."""
+    args = build_parser().parse_args(argv)
+    MenuSession().run(args)
+
+def run_batch_command(responses_dir=None, pattern='*.json', workers=DEFAULT_WORKERS,
+                      use_cache=True, hedge_after=None, by_section=False):
+    """Generate statements for all stored responses concurrently and report results.
+
+    With responses_dir, the responses files in that directory are used instead of
+    the configured storage.
+    """
+    storage = FileStorage(responses_dir) if responses_dir else get_storage()
+    responses_files = find_response_files(storage, pattern)
+    if not responses_files:
+        print("No response files found.")
+        return []
     
-    # Handle commands
-    if args.command == 'list':
-        if args.students:
-            list_student_portfolios()
-        elif args.responses:
-            list_response_files()
-        else:
-            # Default to listing both
-            list_response_files()
-            print("\n")
-            list_student_portfolios()
-        # Return to main menu
-        input("\nPress ENTER to return to the main menu...")
-        main()  # Restart the main function to show the menu again
-        return
+    print(f"\nGenerating {len(responses_files)} statements with {workers} workers...")
+    print("-" * 50)
+    start = time.perf_counter()
+    results = run_batch(responses_files, workers=workers, storage=storage,
+                        on_result=print_batch_result, use_cache=use_cache,
+                        hedge_after=hedge_after, by_section=by_section)
+    print_batch_summary(results, time.perf_counter() - start)
+    return results
+
+def show_model_cache(refresh=False):
+    """Show the cached model resolution state, optionally clearing it first."""
+    resolver = get_model_resolver(get_backend().name)
+    if refresh:
+        resolver.refresh()
+        print("Model cache cleared. The next generation will try the preferred model again.")
     
-    elif args.command == 'load':
-        # Load existing responses
-        if args.responses_file:
-            responses_path = Path(args.responses_file)
-        elif args.student_id:
-            # Find responses file for student ID
-            responses_path = find_responses_for_student(args.student_id)
-        else:
-            # List available response files and prompt user to select one
-            responses_path = select_responses_file()
-        
-        if responses_path and responses_path.exists():
-            # Run questionnaire with loaded responses
-            questionnaire = InteractiveQuestionnaire()
-            questionnaire.load_responses_from_file(responses_path)
-            questionnaire.run()
-        else:
-            print(f"Error: Could not find responses file.")
-            return
+    state = resolver.describe()
+    resolved = state['resolved']
+    print(f"\nPreferred model: {PREFERRED_MODEL}")
+    if resolved.get('model'):
+        resolved_at = datetime.fromtimestamp(resolved['resolved_at']).strftime('%Y-%m-%d %H:%M')
+        print(f"Cached fallback model: {resolved['model']} (resolved {resolved_at})")
+    else:
+        print("Cached fallback model: none")
+    for model_name, failed_at in state['failed'].items():
+        status = "skipped" if resolver.is_failing(model_name) else "will be retried"
+        failed_at = datetime.fromtimestamp(failed_at).strftime('%Y-%m-%d %H:%M')
+        print(f"Failed model: {model_name} at {failed_at} ({status})")
+
+def validate_responses_command(responses_dir=None, pattern='*.json'):
+    """Validate all stored responses and print the errors found in each.
+
+    With responses_dir, the responses files in that directory are checked instead
+    of the configured storage.
+    """
+    storage = FileStorage(responses_dir) if responses_dir else get_storage()
+    results = get_response_validator().validate_storage(storage, pattern)
+    if not results:
+        print("No response files found.")
+        return results
     
-    else:  # 'new' command
-        # Run the interactive questionnaire
-        questionnaire = InteractiveQuestionnaire(student_id=args.student_id)
-        questionnaire.run()
+    invalid = 0
+    for ref, errors in results.items():
+        status = "OK  " if not errors else "FAIL"
+        print(f"[{status}] {Path(str(ref)).name}")
+        for error in errors:
+            print(f"       {error['message']}")
+        invalid += bool(errors)
+    print(f"\n{len(results) - invalid} valid, {invalid} with errors")
+    return results
 
-def list_student_portfolios():
-    """List all student portfolios in the data directory."""
+def sweep_command(dry_run=False):
+    """Remove (or with dry_run, list) the empty directories under GENERATED_DIR."""
+    removed = sweep_empty_dirs(GENERATED_DIR, dry_run=dry_run)
+    for path in removed:
+        print(f"{'Would remove' if dry_run else 'Removed'} {path.relative_to(GENERATED_DIR)}")
+    action = "would be removed" if dry_run else "removed"
+    print(f"\n{len(removed)} empty directories {action}")
+    return removed
+
+def migrate_command(layout, dry_run=False):
+    """Switch the storage layout and move the existing files into it."""
+    print(f"{'Checking' if dry_run else 'Migrating'} to the {layout} layout...")
+    result = migrate_layout(layout, dry_run=dry_run)
+    action = "would be moved" if dry_run else "moved"
+    print(f"{result['responses_moved']} responses files {action}")
+    print(f"{result['statements_moved']} student statement directories {action}")
+    for path in result['skipped']:
+        print(f"Kept in place (no student ID): {path.name}")
+    for path in result['conflicts']:
+        print(f"Not moved (already exists in the {layout} layout): {path}")
+    return result
+
+def list_student_portfolios(page=1, page_size=None):
+    """List the student portfolios in the storage backend.
+
+    With file storage the rows come from the portfolio index, which only looks
+    inside the directories on the requested page.
+
+    Args:
+        page (int): Page to show (1-based) when page_size is given
+        page_size (int, optional): Number of students per page (default: all)
+
+    Returns:
+        list: The rows shown, as dicts with 'id', 'statements' and 'latest'
+    """
     print("\nAvailable student portfolios:")
     print("-" * 40)
     
+    storage = get_storage()
+    offset = (max(page, 1) - 1) * page_size if page_size else 0
     students = []
-    for student_dir in GENERATED_DIR.glob('*'):
-        if student_dir.is_dir():
-            student_id = student_dir.name
-            statements = list(student_dir.glob('statement_of_intent_*.md'))
-            students.append({
-                'id': student_id,
-                'statements': len(statements),
-                'latest': max(statements).name if statements else 'No statements'
-            })
+    for student in storage.list_portfolios(offset, page_size):
+        if not students:
+            # Print table header (sorted by student ID, newest first)
+            print(f"{'Student ID':<20} {'Statements':<12} Latest File")
+            print("-" * 60)
+        latest = student['latest'] or 'No statements'
+        print(f"{student['id']:<20} {student['statements']:<12} {latest}")
+        students.append({'id': student['id'], 'statements': student['statements'],
+                         'latest': latest})
     
     if not students:
         print("No student portfolios found.")
-        return
+        return students
     
-    # Sort by student ID
-    students.sort(key=lambda x: x['id'], reverse=True)
-    
-    # Print table
-    print(f"{'Student ID':<20} {'Statements':<12} Latest File")
-    print("-" * 60)
-    for student in students:
-        print(f"{student['id']:<20} {student['statements']:<12} {student['latest']}")
+    if page_size:
+        total = storage.count_portfolios()
+        pages = (total + page_size - 1) // page_size
+        print(f"\nPage {max(page, 1)} of {pages} ({total} students)")
     print()
     
     return students
@@ -187,52 +467,24 @@ def list_response_files():
     print("\nAvailable response files:")
     print("-" * 40)
     
-    responses = []
-    for response_file in RESPONSES_DIR.glob('*.json'):
-        if response_file.is_file():
-            # Try to load the file to get student info
-            try:
-                with open(response_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Check if it's the new format with metadata
-                    if isinstance(data, dict) and 'student_id' in data:
-                        student_id = data['student_id']
-                        timestamp = data.get('timestamp', 'Unknown')
-                        responses.append({
-                            'file': response_file,
-                            'student_id': student_id,
-                            'timestamp': timestamp,
-                            'size': response_file.stat().st_size
-                        })
-                    else:
-                        # Old format without metadata
-                        responses.append({
-                            'file': response_file,
-                            'student_id': 'Unknown',
-                            'timestamp': response_file.stat().st_mtime,
-                            'size': response_file.stat().st_size
-                        })
-            except (json.JSONDecodeError, IOError):
-                # If we can't read the file, just show basic info
-                responses.append({
-                    'file': response_file,
-                    'student_id': 'Unknown (Error reading file)',
-                    'timestamp': response_file.stat().st_mtime,
-                    'size': response_file.stat().st_size
-                })
+    # Metadata comes from the storage backend's index, not from parsing every file
+    responses = get_storage().list_responses()
+    for response in responses:
+        if response['format'] == FORMAT_UNREADABLE:
+            response['student_id'] = 'Unknown (Error reading file)'
+        elif response['student_id'] is None:
+            # Old format without metadata
+            response['student_id'] = 'Unknown'
     
     if not responses:
         print("No response files found.")
         return []
     
-    # Sort by timestamp (newest first)
-    responses.sort(key=lambda x: x['timestamp'] if isinstance(x['timestamp'], (int, float)) else 0, reverse=True)
-    
-    # Print table
+    # Print table (newest first)
     print(f"{'#':<3} {'Student ID':<20} {'File':<30} {'Size':<10}")
     print("-" * 65)
     for i, response in enumerate(responses, 1):
-        filename = response['file'].name
+        filename = response['name']
         size_kb = response['size'] / 1024
         print(f"{i:<3} {response['student_id']:<20} {filename:<30} {size_kb:.1f} KB")
     print()
@@ -255,26 +507,40 @@ def select_responses_file():
             
             choice_num = int(choice)
             if 1 <= choice_num <= len(responses):
-                return responses[choice_num - 1]['file']
+                return responses[choice_num - 1]['ref']
             else:
                 print(f"Invalid choice. Please enter a number between 1 and {len(responses)}.")
         except ValueError:
             print("Invalid input. Please enter a number.")
 
-def find_responses_for_student(student_id):
-    """Find the most recent response file for a given student ID."""
-    # Look for response files matching the student ID pattern
-    matching_files = list(RESPONSES_DIR.glob(f'*{student_id}*.json'))
+def find_responses_for_student(student_id, fuzzy=False):
+    """Find the most recent response file for a given student ID.
     
-    if not matching_files:
-        print(f"No response files found for student ID: {student_id}")
-        return None
+    Args:
+        student_id: Exact student ID, or with fuzzy=True part of a student ID or
+            file name
+        fuzzy: Match the ID as a substring instead of exactly
+    """
+    storage = get_storage()
+    if not fuzzy:
+        # Exact lookup in the storage backend's student ID index
+        latest = storage.latest_responses(student_id)
+        if latest is None:
+            print(f"No response files found for student ID: {student_id}")
+            print("Use --fuzzy to search for partial IDs and file names.")
+        return latest
     
-    # Sort by modification time (newest first)
-    matching_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
+    matches = storage.search_responses(student_id)
+    if not matches:
+        print(f"No response files found matching: {student_id}")
+        return None
     
-    # Return the most recent file
-    return matching_files[0]
+    students = {match['student_id'] for match in matches}
+    if len(students) > 1:
+        print(f"{len(matches)} response files from {len(students)} students match "
+              f"'{student_id}'; loading the most recent one.")
+    # Entries are newest first
+    return matches[0]['ref']
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,4 @@
+import hashlib
 import os
 from pathlib import Path
 
@@ -9,6 +10,8 @@ DATA_DIR = BASE_DIR / 'app' / 'data'
 STUDENTS_DIR = DATA_DIR / 'students'
 RESPONSES_DIR = DATA_DIR / 'responses'
 GENERATED_DIR = DATA_DIR / 'generated'
+CACHE_DIR = DATA_DIR / 'cache'
+JOURNALS_DIR = DATA_DIR / 'journals'
 TEMPLATES_DIR = BASE_DIR / 'app' / 'templates'
 STATIC_DIR = BASE_DIR / 'app' / 'static'
 
@@ -22,17 +25,30 @@ os.makedirs(TEMPLATES_DIR, exist_ok=True)
 STUDENT_RESPONSES_FILE = RESPONSES_DIR / 'student_responses.json'
 STATEMENT_SCHEMA = DATA_DIR / 'statement_intent_schema.json'
 
-# Create a symbolic link for backward compatibility
-if not (BASE_DIR / 'statement_intent_schema.json').exists() and STATEMENT_SCHEMA.exists():
-    try:
-        import os
-        os.symlink(STATEMENT_SCHEMA, BASE_DIR / 'statement_intent_schema.json')
-    except (OSError, AttributeError):
-        pass  # Symlink creation not supported or not needed
+# Database of the SQLite storage backend (PORTFOLIO_STORAGE=sqlite)
+DATABASE_FILE = DATA_DIR / 'portfolio.db'
+
+# On-disk layout of responses and generated statements. 'flat' keeps every
+# responses file directly in RESPONSES_DIR and one GENERATED_DIR/<student_id>
+# directory per student. 'sharded' nests both under a two-level prefix of a hash
+# of the student ID (responses/3/f/<file>.json, generated/3/f/<student_id>/), so
+# no single directory grows with the whole archive. The layout in use is kept in
+# LAYOUT_FILE and changed with `python -m app migrate`; readers accept both.
+# One-character hex directories are only taken for shards while the sharded
+# layout is in use or a root holds SHARD_MARKER (written by the migration while
+# it still has shards to move), so a flat student directory such as 'a' is kept.
+LAYOUT_FILE = DATA_DIR / 'layout'
+SHARD_MARKER = '.sharded'
+LAYOUT_FLAT = 'flat'
+LAYOUT_SHARDED = 'sharded'
+LAYOUTS = (LAYOUT_FLAT, LAYOUT_SHARDED)
+SHARD_LEVELS = 2
+SHARD_CHARS = '0123456789abcdef'
 
 # Template files
 STATEMENT_TEMPLATE = TEMPLATES_DIR / 'statement_template.md'
 STAGE_TEMPLATE = TEMPLATES_DIR / 'stage_template.md'
+QUESTIONS_FILE = TEMPLATES_DIR / 'QS_STATEMENT_OF_INTENT.md'
 
 # Default template content
 DEFAULT_STATEMENT_TEMPLATE = """# Statement of Intent: {student_name}
@@ -70,3 +86,149 @@ if not STATEMENT_TEMPLATE.exists():
 if not os.path.exists(STAGE_TEMPLATE):
     with open(STAGE_TEMPLATE, 'w', encoding='utf-8') as f:
         f.write(DEFAULT_STAGE_TEMPLATE)
+
+
+def get_storage_layout():
+    """Return the layout new files are written in (LAYOUT_FLAT or LAYOUT_SHARDED)."""
+    try:
+        layout = LAYOUT_FILE.read_text(encoding='utf-8').strip()
+    except OSError:
+        return LAYOUT_FLAT
+    return layout if layout in LAYOUTS else LAYOUT_FLAT
+
+
+def set_storage_layout(layout):
+    """Record the layout new files are written in.
+
+    Raises:
+        ValueError: If the layout isn't one of LAYOUTS
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown storage layout: {layout}")
+    tmp_path = LAYOUT_FILE.with_name(f'.{LAYOUT_FILE.name}.tmp')
+    tmp_path.write_text(layout + '\n', encoding='utf-8')
+    os.replace(tmp_path, LAYOUT_FILE)
+
+
+def shard_parts(student_id):
+    """Return the shard directory names for a student ID, e.g. ('3', 'f')."""
+    digest = hashlib.sha256(str(student_id).encode('utf-8')).hexdigest()
+    return tuple(digest[:SHARD_LEVELS])
+
+
+def is_shard_name(name):
+    """Check whether a directory name has the form of a shard level."""
+    return len(name) == 1 and name in SHARD_CHARS
+
+
+def uses_shards(root):
+    """Check whether a responses or statements root may contain shard directories.
+
+    True while the sharded layout is in use or the root is marked as sharded.
+    """
+    return (get_storage_layout() == LAYOUT_SHARDED
+            or os.path.exists(os.path.join(root, SHARD_MARKER)))
+
+
+def mark_sharded(root, sharded=True):
+    """Add or remove a root's SHARD_MARKER."""
+    marker = Path(root) / SHARD_MARKER
+    if sharded:
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+    else:
+        try:
+            marker.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def student_responses_dir(student_id, root=None, layout=None):
+    """Return the directory a student's responses files are saved in.
+
+    Args:
+        student_id (str): Student ID
+        root (Path, optional): Responses root. Defaults to RESPONSES_DIR.
+        layout (str, optional): Layout to resolve for. Defaults to the current one.
+    """
+    root = Path(root) if root else RESPONSES_DIR
+    if (layout or get_storage_layout()) == LAYOUT_SHARDED:
+        return root.joinpath(*shard_parts(student_id))
+    return root
+
+
+def student_generated_dir(student_id, root=None, layout=None):
+    """Return the directory a student's statements are saved in.
+
+    Args:
+        student_id (str): Student ID
+        root (Path, optional): Generated statements root. Defaults to GENERATED_DIR.
+        layout (str, optional): Layout to resolve for. Defaults to the current one.
+    """
+    root = Path(root) if root else GENERATED_DIR
+    if (layout or get_storage_layout()) == LAYOUT_SHARDED:
+        return root.joinpath(*shard_parts(student_id), str(student_id))
+    return root / str(student_id)
+
+
+def find_student_generated_dir(student_id, root=None):
+    """Return a student's existing statements directory in either layout.
+
+    The current layout is checked first; if the student has no directory yet the
+    current layout's path is returned.
+    """
+    layout = get_storage_layout()
+    preferred = student_generated_dir(student_id, root, layout)
+    if preferred.is_dir():
+        return preferred
+    other = student_generated_dir(student_id, root,
+                                  LAYOUT_FLAT if layout == LAYOUT_SHARDED else LAYOUT_SHARDED)
+    return other if other.is_dir() else preferred
+
+
+def _shard_subdirs(path):
+    try:
+        with os.scandir(path) as it:
+            return sorted(entry.path for entry in it
+                          if is_shard_name(entry.name) and entry.is_dir())
+    except FileNotFoundError:
+        return []
+
+
+def layout_dirs(root):
+    """Return a root and every shard directory below it that exists.
+
+    Files are found in both layouts by looking in each of these directories.
+    """
+    dirs = [Path(root)]
+    if not uses_shards(root):
+        return dirs
+    level = [str(root)]
+    for _ in range(SHARD_LEVELS):
+        level = [sub for path in level for sub in _shard_subdirs(path)]
+        dirs.extend(Path(path) for path in level)
+    return dirs
+
+
+def iter_student_dirs(root=None):
+    """Yield (student_id, path) for every student statements directory in either layout.
+
+    Args:
+        root (Path, optional): Generated statements root. Defaults to GENERATED_DIR.
+    """
+    root = Path(root) if root else GENERATED_DIR
+    levels = SHARD_LEVELS if uses_shards(root) else 0
+    pending = [(str(root), 0)]
+    while pending:
+        path, depth = pending.pop()
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if not entry.is_dir():
+                        continue
+                    if depth < levels and is_shard_name(entry.name):
+                        pending.append((entry.path, depth + 1))
+                    elif depth in (0, SHARD_LEVELS):
+                        yield entry.name, entry.path
+        except FileNotFoundError:
+            continue
@@ -18,13 +18,25 @@ from pathlib import Path
 # Add parent directory to path to allow absolute imports
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.utils.generate_statement_prompt import generate_prompt
-from app.utils.gemini_utils import configure_gemini, generate_statement
+from app.utils.generate_statement_prompt import choose_styles, generate_prompt, statement_header
+from app.utils.gemini_utils import configure_gemini, stream_statement
+from app.utils.answer_journal import AnswerJournal, journal_path, replay_journal
+from app.utils.question_cache import get_questions, parse_questions
+from app.utils.storage import get_storage
+from app.utils.resilience import CircuitOpenError
+from app.utils.terminal import TerminalRenderer, progress_bar
+from app.utils.schema_registry import get_schema
+from app.utils.section_generation import (
+    regenerate_changed_sections, save_section_state, section_fingerprints
+)
+from app.utils.file_naming import to_snake_case, statement_filename
 from app.app_config import (
-    STUDENT_RESPONSES_FILE, STATEMENT_SCHEMA, 
-    GENERATED_DIR, TEMPLATES_DIR, RESPONSES_DIR, STUDENTS_DIR
+    STUDENT_RESPONSES_FILE, STATEMENT_SCHEMA, TEMPLATES_DIR, STUDENTS_DIR
 )
 
+# Appended to a streamed draft whose generation failed part-way
+INCOMPLETE_MARKER = "<!-- incomplete:"
+
 class InteractiveQuestionnaire:
     def __init__(self, student_id: str = None):
         """Initialize the questionnaire.
@@ -33,53 +45,75 @@ class InteractiveQuestionnaire:
             student_id: Optional student ID to load existing responses
         """
         self.responses: Dict[str, Any] = {}
-        self.questions: List[Dict] = []
+        self._questions: Optional[List[Dict]] = None  # Loaded on first access
         self.current_question_index = 0
+        # A generated ID is replaced by the one in a loaded responses file
+        self.generated_id = student_id is None
         self.student_id = student_id or datetime.now().strftime("%Y%m%d_%H%M%S")
         self.project_title = None  # Will be set when responses are loaded or entered
-        self.responses_path = RESPONSES_DIR / f'responses_{self.student_id}.json'
-        self.output_dir = GENERATED_DIR / self.student_id
-        self.output_dir.mkdir(parents=True, exist_ok=True)
-        self.load_questions()
+        # Where the responses are saved: a Path, or a record name for database storage
+        self.responses_path = get_storage().responses_ref(self.student_id,
+                                                          f'responses_{self.student_id}.json')
+        self._journal = None  # Opened on the first answer
+        self.renderer = TerminalRenderer()
+
+    @property
+    def questions(self) -> List[Dict]:
+        """The questions, loaded on first access."""
+        if self._questions is None:
+            self.load_questions()
+        return self._questions
+
+    @questions.setter
+    def questions(self, questions: List[Dict]):
+        self._questions = questions
         
+    @property
+    def journal(self) -> AnswerJournal:
+        """The answer journal for this student's session."""
+        if self._journal is None or self._journal.path != journal_path(self.student_id):
+            if self._journal is not None:
+                self._journal.close()
+            self._journal = AnswerJournal(journal_path(self.student_id))
+        return self._journal
+
+    def record_response(self, question_id: str, response: str):
+        """Store an answer and append it to the journal so it survives a crash."""
+        self.responses[question_id] = response
+        self.journal.append(question_id, response)
+
+    def recover_unsaved_responses(self) -> int:
+        """Replay answers from a journal left by a session that ended without saving.
+
+        Returns:
+            int: Number of answers recovered
+        """
+        recovered = {
+            question_id: response
+            for question_id, response in replay_journal(journal_path(self.student_id)).items()
+            if self.responses.get(question_id) != response
+        }
+        if recovered:
+            self.responses.update(recovered)
+            print(f"Recovered {len(recovered)} unsaved answers from the last session")
+        return len(recovered)
+
     def get_snake_case_title(self):
         """Convert the project title to snake_case for filenames."""
         if not self.project_title and 'q1' in self.responses:
             self.project_title = self.responses['q1']
             
-        if not self.project_title:
-            return "untitled_project"
-            
-        # Convert to snake_case
-        # Replace spaces and special characters with underscores
-        snake_title = self.project_title.lower()
-        snake_title = ''.join(c if c.isalnum() else '_' for c in snake_title)
-        # Replace multiple underscores with a single one
-        while '__' in snake_title:
-            snake_title = snake_title.replace('__', '_')
-        # Remove leading/trailing underscores
-        snake_title = snake_title.strip('_')
-        
-        return snake_title
+        return to_snake_case(self.project_title)
 
     def load_questions(self):
-        """Load questions from the schema file and question file."""
+        """Load questions from the compiled question cache."""
         try:
-            # Load schema for structure
-            with open(STATEMENT_SCHEMA, 'r', encoding='utf-8') as f:
-                schema = json.load(f)
-                
-            # Load questions from markdown file in templates directory
-            questions_path = TEMPLATES_DIR / 'QS_STATEMENT_OF_INTENT.md'
-            if not questions_path.exists():
-                # Try the old location for backward compatibility
-                questions_path = Path(__file__).parent.parent / 'QS_STATEMENT_OF_INTENT.md'
+            # Make sure the schema is present and valid (parsed once per process)
+            get_schema()
                 
-            with open(questions_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                
-            # Parse questions from markdown
-            self.parse_questions(content)
+            # Questions are parsed from the markdown only when it has changed
+            self._questions = get_questions()
+            self.add_default_questions()
             
             if not self.questions:
                 print("Warning: No questions were parsed from the file.")
@@ -95,44 +129,11 @@ class InteractiveQuestionnaire:
 
     def parse_questions(self, content: str):
         """Parse questions from markdown content."""
-        # Simple approach: Look for lines with question marks
-        lines = content.split('\n')
-        current_section = "Introduction"
-        question_count = 0
-        
-        for i, line in enumerate(lines):
-            # Check for section headers
-            if line.startswith('## '):
-                current_section = line.replace('## ', '').strip()
-                continue
-                
-            # Look for questions (lines with **What, **How, etc.)
-            if '**' in line and '?' in line and any(q in line for q in ['What', 'How', 'Why', 'Describe']):
-                question_text = line.strip().replace('**', '')
-                question_count += 1
-                
-                # Get the title from the previous ### line if available
-                title = ""
-                for j in range(i-1, max(0, i-10), -1):
-                    if lines[j].startswith('### '):
-                        title = lines[j].replace('### ', '').strip()
-                        break
-                
-                if not title:
-                    title = f"Question {question_count}"
-                
-                # Create question object
-                question = {
-                    'section': current_section,
-                    'title': title,
-                    'text': question_text,
-                    'id': f"q{question_count}",
-                    'required': True
-                }
-                
-                self.questions.append(question)
-        
-        # If no questions were found, add some default questions
+        self._questions = (self._questions or []) + parse_questions(content)
+        self.add_default_questions()
+
+    def add_default_questions(self):
+        """Add some default questions if none were found."""
         if not self.questions:
             print("No questions found in the markdown file. Adding default questions.")
             default_questions = [
@@ -174,34 +175,44 @@ class InteractiveQuestionnaire:
             ]
             self.questions.extend(default_questions)
 
+    def progress(self):
+        """Return (answered, total) counts of the required questions."""
+        required = [q for q in self.questions if q.get('required', True)]
+        answered = sum(1 for q in required if self.responses.get(q['id']))
+        return answered, len(required)
+
     def display_question(self, question: Dict):
         """Display the current question and navigation options."""
-        os.system('cls' if os.name == 'nt' else 'clear')
-        print(f"\n{question['section']}")
-        print("=" * len(question['section']))
-        print(f"\n{question['text']}")
+        answered, total = self.progress()
+        lines = [
+            "",
+            question['section'],
+            "=" * len(question['section']),
+            f"Progress: {progress_bar(answered, total)} required questions answered",
+            "",
+            question['text'],
+        ]
         
         # Show if question has been answered
         question_id = question['id']
         if question_id in self.responses:
-            print("\nCurrent response:")
-            print("-" * 15)
-            print(self.responses[question_id])
-            print("-" * 15)
+            lines += ["", "Current response:", "-" * 15, self.responses[question_id], "-" * 15]
         
         # Show navigation
-        print("\n" + "-" * 50)
-        print("Options:")
-        print("1. Answer this question")
-        print("2. Skip this question")
+        lines += ["", "-" * 50, "Options:", "1. Answer this question", "2. Skip this question"]
         if self.current_question_index > 0:
-            print("3. Previous question")
+            lines.append("3. Previous question")
         if self.current_question_index < len(self.questions) - 1:
-            print("4. Next question")
-        print("5. Save and generate statement")
-        print("6. Save responses without generating")
-        print("7. Exit without saving")
-        print("-" * 50)
+            lines.append("4. Next question")
+        lines += [
+            "5. Save and generate statement",
+            "6. Save responses without generating",
+            "7. Exit without saving",
+            "8. Save and regenerate changed sections only",
+            "-" * 50,
+        ]
+        # Redrawn in place, without spawning a shell to clear the screen
+        self.renderer.render(lines)
 
     def get_user_input(self, question: Dict) -> str:
         """Get and validate user input for the current question."""
@@ -234,28 +245,41 @@ class InteractiveQuestionnaire:
         # Get snake_case title for the filename
         snake_title = self.get_snake_case_title()
         
-        # Update the responses path with the snake_case title
-        self.responses_path = RESPONSES_DIR / f'{snake_title}_{self.student_id}.json'
-        
-        # Save responses to file
-        with open(self.responses_path, 'w', encoding='utf-8') as f:
-            json.dump({
-                'student_id': self.student_id,
-                'project_title': self.project_title,
-                'timestamp': datetime.now().isoformat(),
-                'responses': self.responses
-            }, f, indent=2)
+        # Compact the journal into the saved responses; saves are atomic, so a
+        # crash leaves either the old responses plus the journal or the new ones
+        self.responses_path = get_storage().save_responses(
+            self.student_id, self.project_title, self.responses,
+            f'{snake_title}_{self.student_id}.json'
+        )
+        self.journal.discard()
         
         print(f"\nResponses saved to {self.responses_path}")
         return True
 
     def run(self):
-        """Run the interactive questionnaire."""
+        """Run the interactive questionnaire.
+
+        Returns:
+            bool: True if the student asked to return to the main menu
+        """
         # Check if we have any questions
         if not self.questions:
             print("\nError: No questions available. Cannot continue.")
-            return
-            
+            return False
+        
+        try:
+            return self._run_questions()
+        finally:
+            # Make sure every journalled answer is on disk, even after Ctrl-C
+            if self._journal is not None:
+                self._journal.close()
+
+    def _run_questions(self):
+        """Show questions and handle the navigation options until the student leaves.
+
+        Returns:
+            bool: True if the student asked to return to the main menu
+        """
         while True:
             # Make sure we don't go out of bounds
             if self.current_question_index >= len(self.questions):
@@ -272,7 +296,7 @@ class InteractiveQuestionnaire:
                 choices.append("3")
             if self.current_question_index < len(self.questions) - 1:
                 choices.append("4")
-            choices.extend(["5", "6", "7"])
+            choices.extend(["5", "6", "7", "8"])
             
             while True:
                 choice = input("\nChoose an option: ").strip()
@@ -284,7 +308,7 @@ class InteractiveQuestionnaire:
             if choice == "1":  # Answer
                 response = self.get_user_input(question)
                 if response:
-                    self.responses[question['id']] = response
+                    self.record_response(question['id'], response)
                 self.current_question_index += 1
             elif choice == "2":  # Skip
                 self.current_question_index += 1
@@ -293,18 +317,29 @@ class InteractiveQuestionnaire:
             elif choice == "4" and "4" in choices:  # Next
                 self.current_question_index += 1
             elif choice == "5":  # Save and generate
-                self.save_and_generate()
-                return
+                return bool(self.save_and_generate())
             elif choice == "6":  # Save without generating
                 if self.save_responses():
                     print("\nResponses saved. You can continue later by running this program again.")
                     return
             elif choice == "7":  # Exit
-                print("\nExiting without saving. Your progress will be lost.")
+                if self._journal is not None and self._journal.appends:
+                    print("\nExiting without saving. Your answers are kept and will be "
+                          f"restored the next time you load student ID {self.student_id}.")
+                else:
+                    print("\nExiting without saving.")
                 return
+            elif choice == "8":  # Save and regenerate changed sections
+                # Stay on this question so the student can edit and regenerate again
+                self.save_and_regenerate_sections()
+                input("\nPress ENTER to continue editing...")
                 
     def save_and_generate(self):
-        """Save responses and generate the statement of intent."""
+        """Save responses and generate the statement of intent.
+
+        Returns:
+            bool: True if the student asked to return to the main menu
+        """
         if not self.responses:
             print("No responses to save. Exiting.")
             return
@@ -314,7 +349,7 @@ class InteractiveQuestionnaire:
         print("\nGenerating your Statement of Intent...")
         
         try:
-            # Configure Gemini
+            # Configure Gemini (a no-op once the API has been configured)
             try:
                 configure_gemini()
             except ValueError as e:
@@ -328,87 +363,157 @@ class InteractiveQuestionnaire:
             
             # Generate the prompt
             try:
-                prompt = generate_prompt(self.responses)
+                selection = choose_styles(self.responses)
+                prompt = generate_prompt(self.responses, selection=selection)
             except Exception as e:
                 print(f"\nError generating prompt: {str(e)}")
                 return
             
-            # Generate the statement
+            # Create a timestamped name to avoid overwriting previous versions
+            self.get_snake_case_title()
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            name = statement_filename(self.project_title, timestamp)
+            
+            # Stream the statement to the terminal and a draft file as it is generated,
+            # then save it to storage
+            draft_file = self.statement_draft_path()
+            draft_file.parent.mkdir(parents=True, exist_ok=True)
+            print(f"\nWriting: {name}")
+            print("-" * 50)
+            stats = {}
             try:
-                statement = generate_statement(prompt)
+                stream_statement(prompt, draft_file, echo=True, stats=stats,
+                                 header=statement_header(self.responses, selection))
+            except CircuitOpenError as e:
+                print(f"\nThe Gemini API is currently unavailable: {str(e)}")
+                print(f"Your responses are saved. Please try again in about {e.retry_in:.0f} seconds.")
+                if stats.get('chunks'):
+                    partial = self.keep_incomplete_draft(draft_file, e)
+                    print(f"The partial statement has been kept in {partial}")
+                elif draft_file.exists():
+                    draft_file.unlink()
+                return
             except Exception as e:
                 print(f"\nError from Gemini API: {str(e)}")
+                if stats.get('retries'):
+                    print(f"Gave up after {stats['retries']} retries.")
                 print("This might be due to API rate limits, invalid API key, or network issues.")
+                if stats.get('chunks'):
+                    partial = self.keep_incomplete_draft(draft_file, e)
+                    print(f"The partial statement has been kept in {partial}")
+                elif draft_file.exists():
+                    draft_file.unlink()
                 return
-            
-            # Get snake_case title for the filename
-            snake_title = self.get_snake_case_title()
-            
-            # Create a timestamped filename to avoid overwriting previous versions
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            output_file = self.output_dir / f'{snake_title}_statement_of_intent_{timestamp}.md'
-            
-            # Save the generated statement
-            with open(output_file, 'w', encoding='utf-8') as f:
-                # Check if statement is a Gemini response object or a string
-                if hasattr(statement, 'text'):
-                    f.write(statement.text)
-                else:
-                    f.write(statement)
+            print("-" * 50)
+            output_file = self.save_statement_draft(draft_file, name)
+            # Remember what each section was generated from for later partial updates
+            save_section_state(self.student_id, name,
+                               section_fingerprints(self.responses, selection=selection), selection)
             
             print("\n" + "="*50)
             print("Your Statement of Intent has been generated!")
             print(f"File saved as: {output_file}")
+            if stats.get('time_to_first_token') is not None:
+                print(f"First text after {stats['time_to_first_token']:.1f}s, "
+                      f"complete after {stats['total_time']:.1f}s")
+            if stats.get('retries'):
+                print(f"Recovered after {stats['retries']} retries "
+                      f"({stats['backoff_time']:.1f}s waiting)")
             print("="*50)
             
-            # Show the complete generated document
-            print("\nComplete Generated Statement of Intent:")
-            print("-" * 50)
-            try:
-                with open(output_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    print(content)
-                print("-" * 50)
-                
-                # Prompt to return to main menu
-                input("\nPress ENTER to return to the main menu...")
-                # Return to main menu
-                from app.__main__ import main
-                main()
-                return
-            except Exception as e:
-                print(f"\nCould not display preview: {str(e)}")
-                # Prompt to return to main menu even in case of error
-                input("\nPress ENTER to return to the main menu...")
-                # Return to main menu
-                from app.__main__ import main
-                main()
-                return
+            # Prompt to return to main menu
+            input("\nPress ENTER to return to the main menu...")
+            return True
             
         except Exception as e:
             print(f"\nUnexpected error: {str(e)}")
             print("Please check your configuration and try again.")
             # Prompt to return to main menu even in case of error
             input("\nPress ENTER to return to the main menu...")
-            # Return to main menu
-            from app.__main__ import main
-            main()
-            return
+            return True
+
+    def statement_draft_path(self) -> Path:
+        """The file a statement is streamed to before it is saved, next to the journal."""
+        journal = journal_path(self.student_id)
+        return journal.with_name(f'{self.student_id}.statement.md')
+
+    def save_statement_draft(self, draft_file: Path, name: str):
+        """Save a streamed statement to storage and remove the draft.
+
+        Returns:
+            The saved statement's ref
+        """
+        text = draft_file.read_text(encoding='utf-8')
+        output_file = get_storage().save_statement(self.student_id, name, text)
+        draft_file.unlink()
+        return output_file
+
+    def keep_incomplete_draft(self, draft_file: Path, error) -> Path:
+        """Keep a statement whose stream failed part-way as a draft marked incomplete.
+
+        The partial text is not saved to storage, so it is never listed or picked up
+        as the student's latest statement.
+
+        Returns:
+            Path: The incomplete draft
+        """
+        with open(draft_file, 'a', encoding='utf-8') as f:
+            f.write(f"\n\n{INCOMPLETE_MARKER} generation stopped: {error} -->\n")
+        incomplete = draft_file.with_name(f'{self.student_id}.statement.incomplete.md')
+        os.replace(draft_file, incomplete)
+        return incomplete
+
+    def save_and_regenerate_sections(self):
+        """Save responses and regenerate only the sections whose answers changed.
+
+        The unchanged sections are copied from the latest statement, so editing one
+        answer costs one section's generation instead of the whole document.
+
+        Returns:
+            bool: True if a statement was regenerated
+        """
+        if not self.responses:
+            print("No responses to save.")
+            return False
+
+        self.save_responses()
+        try:
+            configure_gemini()
+        except (ValueError, ImportError) as e:
+            print(f"\nError configuring Gemini API: {str(e)}")
+            return False
+
+        print("\nChecking which sections need updating...")
+        stats = {}
+        try:
+            output_file = regenerate_changed_sections(self.responses, self.student_id,
+                                                      self.project_title, stats=stats)
+        except CircuitOpenError as e:
+            print(f"\nThe Gemini API is currently unavailable: {str(e)}")
+            print(f"Your responses are saved. Please try again in about {e.retry_in:.0f} seconds.")
+            return False
+        except Exception as e:
+            print(f"\nError from Gemini API: {str(e)}")
+            return False
+
+        print("\n" + "="*50)
+        if output_file is None:
+            print("No answers that the statement depends on have changed.")
+        else:
+            print(f"Regenerated sections: {', '.join(stats['regenerated'])}")
+            print(f"File saved as: {output_file}")
+        print("="*50)
+        return output_file is not None
 
     def load_existing_responses(self):
         """Load existing responses from file if available."""
         try:
-            if self.responses_path.exists():
-                with open(self.responses_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    # Check if it's the new format with metadata
-                    if isinstance(data, dict) and 'responses' in data:
-                        self.responses = data['responses']
-                        if 'student_id' in data and not self.student_id:
-                            self.student_id = data['student_id']
-                    else:
-                        # Assume it's the old format (just a dict of responses)
-                        self.responses = data
+            storage = get_storage()
+            if storage.responses_exists(self.responses_path):
+                record = storage.load_responses(self.responses_path)
+                self.responses = record['responses']
+                if record['student_id'] and not self.student_id:
+                    self.student_id = record['student_id']
                 print(f"Loaded existing responses from {self.responses_path}")
                 return True
         except Exception as e:
@@ -419,33 +524,25 @@ class InteractiveQuestionnaire:
         """Load responses from a specific file path.
         
         Args:
-            file_path: Path to the responses file
+            file_path: Path to the responses file (or record name for database storage)
             
         Returns:
             bool: True if responses were loaded successfully, False otherwise
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                
-                # Check if it's the new format with metadata
-                if isinstance(data, dict) and 'responses' in data:
-                    self.responses = data['responses']
-                    if 'student_id' in data and not self.student_id:
-                        self.student_id = data['student_id']
-                        # Update the output directory for this student
-                        self.output_dir = GENERATED_DIR / self.student_id
-                        self.output_dir.mkdir(parents=True, exist_ok=True)
-                else:
-                    # Assume it's the old format (just a dict of responses)
-                    self.responses = data
-                
-                # Update the responses path to point to this file
-                self.responses_path = Path(file_path)
-                
-                print(f"Loaded responses from {file_path}")
-                print(f"Found {len(self.responses)} responses")
-                return True
+            record = get_storage().load_responses(file_path)
+            self.responses = record['responses']
+            if record['student_id'] and (self.generated_id or not self.student_id):
+                self.student_id = record['student_id']
+                self.generated_id = False
+            
+            # Update the responses path to point to this record
+            self.responses_path = record['ref']
+            
+            print(f"Loaded responses from {file_path}")
+            print(f"Found {len(self.responses)} responses")
+            self.recover_unsaved_responses()
+            return True
         except Exception as e:
             print(f"Error loading responses from {file_path}: {str(e)}")
             return False
@@ -473,7 +570,7 @@ if __name__ == "__main__":
         questionnaire = InteractiveQuestionnaire()
         
         # Check for existing responses
-        responses_exist = questionnaire.responses_path.exists()
+        responses_exist = get_storage().responses_exists(questionnaire.responses_path)
         
         if responses_exist:
             print(f"\nFound existing responses at {questionnaire.responses_path}")
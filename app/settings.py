@@ -0,0 +1,125 @@
+"""
+Process-wide runtime settings for the Portfolio Builder.
+
+Settings are read from the environment and the project's .env file once, the first
+time they are needed, and then reused for the rest of the process. Call
+``reload_settings()`` after editing .env to pick up the changes.
+"""
+
+import os
+import threading
+
+from app.app_config import BASE_DIR
+
+# Prompt token budget used when neither PORTFOLIO_TOKEN_BUDGET nor a model limit is lower
+DEFAULT_TOKEN_BUDGET = 16000
+
+ENV_FILE = BASE_DIR / '.env'
+
+
+def _read_env_file_value(env_path, name):
+    """Read a single value directly from a .env file as a last resort."""
+    if not env_path.exists():
+        return None
+    with open(env_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.startswith(f'{name}='):
+                return line.strip().split('=', 1)[1].strip().strip('"').strip("'")
+    return None
+
+
+def _as_bool(value, default=False):
+    if value is None:
+        return default
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _as_number(name, default, cast=float):
+    """Read a numeric environment variable, warning and using the default if it isn't one."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return cast(value.strip())
+    except ValueError:
+        kind = 'an integer' if cast is int else 'a number'
+        print(f"Warning: {name}={value!r} is not {kind}; using {default}")
+        return default
+
+
+class Settings:
+    """Snapshot of the runtime settings."""
+
+    def __init__(self, env_file=None):
+        """Load the settings from the environment and the .env file.
+
+        Args:
+            env_file (Path, optional): .env file to load. Defaults to the project's .env.
+        """
+        self.env_file = env_file or ENV_FILE
+        try:
+            from dotenv import load_dotenv
+            load_dotenv(self.env_file)
+        except ImportError:
+            pass
+
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            api_key = _read_env_file_value(self.env_file, 'GEMINI_API_KEY')
+            if api_key:
+                print("Loaded API key from .env file")
+
+        self.gemini_api_key = api_key
+        self.debug = _as_bool(os.getenv('DEBUG'))
+        self.default_student_id = os.getenv('DEFAULT_STUDENT_ID')
+
+        # Generation backend (see app.utils.generation_backends)
+        self.generation_backend = (os.getenv('PORTFOLIO_BACKEND') or 'gemini').strip().lower()
+        failing = os.getenv('PORTFOLIO_MOCK_FAILING_MODELS', '')
+        self.mock_backend = {
+            'latency': _as_number('PORTFOLIO_MOCK_LATENCY', 0.5),
+            'tokens_per_second': _as_number('PORTFOLIO_MOCK_TOKEN_RATE', 200.0),
+            'error_rate': _as_number('PORTFOLIO_MOCK_ERROR_RATE', 0.0),
+            'error_code': _as_number('PORTFOLIO_MOCK_ERROR_CODE', 503, int),
+            'failing_models': [m.strip() for m in failing.split(',') if m.strip()],
+            'seed': _as_number('PORTFOLIO_MOCK_SEED', 0, int),
+        }
+
+        # Storage backend (see app.utils.storage)
+        self.storage_backend = (os.getenv('PORTFOLIO_STORAGE') or 'files').strip().lower()
+        self.database_file = os.getenv('PORTFOLIO_DATABASE') or None
+        self.sqlite_wal = ((os.getenv('PORTFOLIO_SQLITE_WAL') or '1').strip().lower()
+                           not in ('0', 'false', 'no', 'off'))
+
+        # Maximum estimated prompt tokens (see app.utils.token_budget)
+        self.token_budget = _as_number('PORTFOLIO_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET, int)
+
+    def __repr__(self):
+        key = self.gemini_api_key
+        masked = f"{key[:5]}...{key[-4:]}" if key else None
+        return f"Settings(gemini_api_key={masked!r}, debug={self.debug!r})"
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings(reload=False):
+    """Return the process-wide settings, loading them on first use.
+
+    Args:
+        reload (bool): Re-read the environment and .env file
+
+    Returns:
+        Settings: The current settings
+    """
+    global _settings
+    with _settings_lock:
+        if _settings is None or reload:
+            _settings = Settings()
+        return _settings
+
+
+def reload_settings():
+    """Re-read the settings from the environment and the .env file."""
+    return get_settings(reload=True)
@@ -0,0 +1,146 @@
+"""
+Append-only journal of questionnaire answers.
+
+Every answer is appended to a per-session journal (``JOURNALS_DIR/<student_id>.jsonl``)
+as soon as it is given, so a crash or Ctrl-C between answers loses nothing.
+Appends are flushed to the operating system straight away and fsynced in batches.
+Saving compacts the journal into the canonical responses JSON with an atomic
+rename and then removes the journal; a journal that is still there on the next
+``load`` holds answers that were never saved and is replayed on top of them.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.app_config import JOURNALS_DIR
+
+JOURNAL_SUFFIX = '.jsonl'
+
+# fsync after this many appends or this many seconds, whichever comes first
+DEFAULT_FSYNC_EVERY = 8
+DEFAULT_FSYNC_INTERVAL = 2.0
+
+
+def journal_path(student_id, journals_dir=None):
+    """Return the journal file for a student's session."""
+    return (Path(journals_dir) if journals_dir else JOURNALS_DIR) / f'{student_id}{JOURNAL_SUFFIX}'
+
+
+def write_json_atomic(path, data, indent=2):
+    """Write JSON so readers only ever see the old or the complete new file.
+
+    The data goes to a temporary file in the same directory, which is fsynced
+    and then renamed over the target.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f'.{path.name}.{threading.get_ident()}.tmp')
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(data, indent=indent))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def replay_journal(path):
+    """Read the answers recorded in a journal.
+
+    A torn last line (from a crash in the middle of an append) is ignored.
+
+    Args:
+        path (Path): Journal file
+
+    Returns:
+        dict: Question id -> latest answer; empty if there is no journal
+    """
+    answers = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(entry, dict) and 'id' in entry:
+                    answers[entry['id']] = entry.get('response', '')
+    except FileNotFoundError:
+        pass
+    return answers
+
+
+class AnswerJournal:
+    """Appends answers to a journal file, fsyncing in batches."""
+
+    def __init__(self, path, fsync_every=DEFAULT_FSYNC_EVERY,
+                 fsync_interval=DEFAULT_FSYNC_INTERVAL):
+        """Initialise the journal. The file is opened on the first append.
+
+        Args:
+            path (Path): Journal file
+            fsync_every (int): fsync after this many unsynced appends
+            fsync_interval (float): fsync when the oldest unsynced append is this old
+        """
+        self.path = Path(path)
+        self.fsync_every = max(1, int(fsync_every))
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        #: Number of answers appended
+        self.appends = 0
+        #: Number of fsync calls made
+        self.fsyncs = 0
+
+    def append(self, question_id, response):
+        """Record one answer.
+
+        Args:
+            question_id (str): Question id, e.g. 'q3'
+            response (str): The answer
+        """
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'a', encoding='utf-8')
+            self._last_sync = time.monotonic()
+        entry = {'id': question_id, 'response': response, 'time': time.time()}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        # Flushed to the OS straight away, so a crash of this process loses nothing
+        self._file.flush()
+        self.appends += 1
+        self._pending += 1
+        if (self._pending >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_interval):
+            self.sync()
+
+    def sync(self):
+        """fsync the appends made since the last sync."""
+        if self._file is not None and self._pending:
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Sync and close the journal file (it stays on disk for replay)."""
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+
+    def discard(self):
+        """Close and delete the journal once its answers have been saved."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._pending = 0
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,217 @@
+"""
+Concurrent batch generation of Statements of Intent.
+
+Lists the stored responses, builds a prompt for every record and dispatches the
+Gemini calls on a thread pool so that a whole class can be generated in roughly
+the time the API needs, rather than one student after another. Responses are read
+and statements saved through the storage backend (see app.utils.storage).
+"""
+
+import fnmatch
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from app.utils.file_naming import statement_filename
+from app.utils.gemini_utils import generate_statement
+from app.utils.generation_cache import get_generation_cache
+from app.utils.hedging import get_hedger
+from app.utils.generate_statement_prompt import choose_styles, generate_prompt, statement_header
+from app.utils.section_generation import (
+    generate_statement_by_sections, save_section_state, section_fingerprints
+)
+from app.utils.storage import get_storage
+
+DEFAULT_WORKERS = 4
+
+
+def find_response_files(storage=None, pattern='*.json'):
+    """Return every stored responses record whose name matches a pattern, sorted by name.
+
+    Args:
+        storage (StorageBackend, optional): Defaults to get_storage()
+        pattern (str): Glob pattern for record names
+
+    Returns:
+        list: Refs of the responses records (Paths for the files backend)
+    """
+    entries = (storage or get_storage()).list_responses()
+    return [entry['ref'] for entry in sorted(entries, key=lambda entry: entry['name'])
+            if fnmatch.fnmatch(entry['name'], pattern)]
+
+
+def load_response_file(ref, storage=None):
+    """Load a responses record in either the new (metadata) or old (flat) format.
+
+    Args:
+        ref: The record's ref (a Path for the files backend)
+        storage (StorageBackend, optional): Defaults to get_storage()
+
+    Returns:
+        tuple: (student_id, project_title, responses)
+    """
+    record = (storage or get_storage()).load_responses(ref)
+
+    responses = record['responses']
+    # Old format files have no metadata, so fall back to the file name
+    student_id = record['student_id'] or Path(str(ref)).stem
+    project_title = record['project_title'] or responses.get('q1')
+    return student_id, project_title, responses
+
+
+def generate_for_file(ref, storage=None, use_cache=True, hedge_after=None, by_section=False):
+    """Generate and save a statement for a single responses record.
+
+    Generation runs quietly, since several files are generated at once; failures
+    are reported through the result's 'error' instead.
+
+    Args:
+        ref: The responses record's ref (a Path for the files backend)
+        storage (StorageBackend, optional): Where the responses are read from and the
+            statement saved. Defaults to get_storage().
+        use_cache (bool): Set to False to bypass the generation cache
+        hedge_after (float, optional): Hedge to a fallback model after this many seconds
+        by_section (bool): Generate the sections in parallel and stitch them together
+
+    Returns:
+        dict: Result with 'file' (the responses ref), 'student_id', 'output' (the
+            statement's ref), 'ok', 'error', 'latency', 'retries', 'backoff_time',
+            'styles' and 'input_tokens' (estimated) keys
+    """
+    storage = storage or get_storage()
+    result = {
+        'file': ref,
+        'student_id': None,
+        'output': None,
+        'ok': False,
+        'error': None,
+        'latency': 0.0,
+        'retries': 0,
+        'backoff_time': 0.0,
+        'styles': None,
+        'input_tokens': 0,
+    }
+    stats = {}
+    start = time.perf_counter()
+    try:
+        student_id, project_title, responses = load_response_file(ref, storage)
+        result['student_id'] = student_id
+
+        selection = choose_styles(responses)
+        result['styles'] = selection
+        if by_section:
+            statement = generate_statement_by_sections(responses, project_title,
+                                                       use_cache=use_cache,
+                                                       hedge_after=hedge_after, stats=stats,
+                                                       selection=selection, verbose=False)
+        else:
+            prompt = generate_prompt(responses, selection=selection, stats=stats)
+            statement = generate_statement(prompt, use_cache=use_cache, stats=stats,
+                                           hedge_after=hedge_after, verbose=False)
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        name = statement_filename(project_title, timestamp)
+        text = statement.text if hasattr(statement, 'text') else statement
+        result['output'] = storage.save_statement(student_id, name,
+                                                  statement_header(responses, selection) + text)
+        save_section_state(student_id, name, section_fingerprints(responses, selection=selection),
+                           selection, storage)
+        result['ok'] = True
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        result['latency'] = time.perf_counter() - start
+        result['retries'] = stats.get('retries', 0)
+        result['backoff_time'] = stats.get('backoff_time', 0.0)
+        result['input_tokens'] = stats.get('input_tokens', 0)
+
+    return result
+
+
+def run_batch(responses_files, workers=DEFAULT_WORKERS, storage=None, on_result=None,
+              use_cache=True, hedge_after=None, by_section=False):
+    """Generate statements for many responses records concurrently.
+
+    Args:
+        responses_files (list): Refs of the responses records to process
+            (see find_response_files)
+        workers (int): Number of concurrent generations
+        storage (StorageBackend, optional): Where the responses are read from and
+            the statements saved. Defaults to get_storage().
+        on_result (callable, optional): Called with each result dict as it completes
+        use_cache (bool): Set to False to bypass the generation cache
+        hedge_after (float, optional): Hedge to a fallback model after this many seconds
+        by_section (bool): Generate each statement's sections in parallel
+
+    Returns:
+        list: Result dicts (see generate_for_file) in completion order
+    """
+    results = []
+    workers = max(1, int(workers))
+    storage = storage or get_storage()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(generate_for_file, ref, storage, use_cache, hedge_after, by_section)
+            for ref in responses_files
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if on_result:
+                on_result(result)
+    return results
+
+
+def _ref_name(ref):
+    """Return the name of a storage ref (a Path or a record name)."""
+    return Path(str(ref)).name
+
+
+def print_batch_result(result):
+    """Print a one-line status for a finished batch item."""
+    status = "OK  " if result['ok'] else "FAIL"
+    detail = _ref_name(result['output']) if result['ok'] else result['error']
+    if result['retries']:
+        detail += f" ({result['retries']} retries, {result['backoff_time']:.1f}s backoff)"
+    print(f"[{status}] {_ref_name(result['file']):<45} {result['latency']:6.1f}s  {detail}")
+
+
+def print_batch_summary(results, wall_time):
+    """Print totals for a finished batch run.
+
+    Args:
+        results (list): Result dicts from run_batch
+        wall_time (float): Total elapsed time in seconds
+    """
+    succeeded = [r for r in results if r['ok']]
+    failed = [r for r in results if not r['ok']]
+    latencies = sorted(r['latency'] for r in results)
+
+    print("\n" + "=" * 50)
+    print(f"Batch complete: {len(succeeded)} succeeded, {len(failed)} failed")
+    print(f"Wall-clock time: {wall_time:.1f}s")
+    if latencies:
+        serial_time = sum(latencies)
+        print(f"Per-file latency: min {latencies[0]:.1f}s, "
+              f"median {latencies[len(latencies) // 2]:.1f}s, max {latencies[-1]:.1f}s")
+        print(f"Serial time avoided: {max(0.0, serial_time - wall_time):.1f}s")
+    retries = sum(r['retries'] for r in results)
+    if retries:
+        backoff = sum(r['backoff_time'] for r in results)
+        print(f"Retries: {retries} ({backoff:.1f}s spent in backoff)")
+    input_tokens = [r['input_tokens'] for r in results if r['input_tokens']]
+    if input_tokens:
+        print(f"Estimated input tokens: {sum(input_tokens)} total, "
+              f"{sum(input_tokens) // len(input_tokens)} per statement")
+    cache_stats = get_generation_cache().stats()
+    print(f"Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    hedge_stats = get_hedger().stats()
+    if hedge_stats['hedges'] or hedge_stats['hedges_denied']:
+        print(f"Hedges: {hedge_stats['hedges']} sent ({hedge_stats['hedge_wins']} won, "
+              f"{hedge_stats['primary_wins']} lost), {hedge_stats['hedges_denied']} over budget")
+    if failed:
+        print("\nFailed files:")
+        for r in failed:
+            print(f"  {_ref_name(r['file'])}: {r['error']}")
+    print("=" * 50)
@@ -0,0 +1,39 @@
+"""
+File naming helpers shared by the questionnaire, batch generation and maintenance scripts.
+"""
+
+
+def to_snake_case(text):
+    """Convert text to snake_case.
+
+    Args:
+        text (str): Text to convert, usually a project title
+
+    Returns:
+        str: snake_case version of the text, or 'untitled_project' if empty
+    """
+    if not text:
+        return "untitled_project"
+
+    # Replace spaces and special characters with underscores
+    snake = ''.join(c if c.isalnum() else '_' for c in text.lower())
+    # Replace multiple underscores with a single one
+    while '__' in snake:
+        snake = snake.replace('__', '_')
+    # Remove leading/trailing underscores
+    snake = snake.strip('_')
+
+    return snake or "untitled_project"
+
+
+def statement_filename(project_title, timestamp):
+    """Build the filename used for a generated Statement of Intent.
+
+    Args:
+        project_title (str): The student's project title (may be empty)
+        timestamp (str): Timestamp in '%Y%m%d_%H%M%S' format
+
+    Returns:
+        str: e.g. 'monkey_man_mania_statement_of_intent_20250527_081155.md'
+    """
+    return f'{to_snake_case(project_title)}_statement_of_intent_{timestamp}.md'
@@ -1,52 +1,243 @@
 """
 Utility functions for interacting with the Gemini API.
 """
-import google.generativeai as genai
-from pathlib import Path
+import itertools
 import json
+import time
 
-def configure_gemini(api_key=None):
+from app.utils.generation_cache import (
+    get_generation_cache, make_cache_key, cache_disabled_by_env
+)
+from app.utils.model_resolver import get_model_resolver
+from app.settings import get_settings, reload_settings
+from app.utils.resilience import (
+    call_with_retry, get_circuit_breaker, is_model_unavailable
+)
+from app.utils.generation_backends import get_backend
+from app.utils.hedging import DEFAULT_HEDGE_AFTER, hedged_generate
+from app.utils.schema_registry import get_schema
+from app.utils.response_validator import ResponseValidator, get_response_validator
+
+# Model used first for every generation, and the fallbacks tried (in order) if it fails
+PREFERRED_MODEL = "gemini-2.5-flash-preview-05-20"
+FALLBACK_MODELS = [
+    "gemini-1.5-flash",
+    "gemini-1.5-pro",
+    "gemini-pro"
+]
+
+def configure_gemini(api_key=None, force=False):
     """
     Configure the Gemini API with the provided API key.
     
+    The API is only configured once per key; repeated calls are cheap no-ops.
+    Backends that don't need a key (such as the offline mock) skip the key lookup.
+    
     Args:
-        api_key (str, optional): Gemini API key. If not provided, looks for GEMINI_API_KEY in environment variables.
-    """
-    if not api_key:
-        # Load from environment variables first
-        from dotenv import load_dotenv
-        import os
-        import sys
-        from pathlib import Path
-        
-        # Try to load from .env file in project root
-        project_root = Path(__file__).parent.parent.parent
-        load_dotenv(project_root / '.env')
+        api_key (str, optional): Gemini API key. If not provided, uses GEMINI_API_KEY
+            from the process-wide settings (environment or .env file).
+        force (bool, optional): Reconfigure even if already configured with this key
+    """
+    backend = get_backend()
+    if backend.requires_api_key and not api_key:
+        api_key = get_settings().gemini_api_key
+        if not api_key:
+            raise ValueError("No API key found. Please set GEMINI_API_KEY in .env file.")
+    backend.configure(api_key, force=force)
+
+def reload_gemini_config():
+    """Reload the settings from the environment/.env and reconfigure the API."""
+    reload_settings()
+    configure_gemini(force=True)
+
+def _breaker_for(backend, model_name):
+    return get_circuit_breaker(f"{backend.name}:{model_name}")
+
+def _quiet(*args, **kwargs):
+    """Stand-in for print when generation runs with verbose=False."""
+
+def _generate_with_model(model_name, prompt_text, generation_config=None, use_cache=True,
+                         stats=None, log=print):
+    """
+    Generate content with a specific model, serving repeated prompts from the cache.
+    
+    The request goes through the active generation backend (see generation_backends).
+    
+    Transient API errors are retried with backoff (see app.utils.resilience).
+    
+    Args:
+        model_name (str): Name of the Gemini model to use
+        prompt_text (str): The prompt to send to the model
+        generation_config (dict, optional): Generation parameters passed to the model
+        use_cache (bool): Whether to read from and write to the generation cache
+        stats (dict, optional): Retry counters are accumulated here
+        log (callable): Receives progress messages. Defaults to print.
         
-        # Check for environment variable
-        api_key = os.getenv('GEMINI_API_KEY')
+    Returns:
+        str: Generated content
+    """
+    backend = get_backend()
+    cache = get_generation_cache() if use_cache and not cache_disabled_by_env() else None
+    if cache is not None:
+        cache_key = make_cache_key(prompt_text, model_name, generation_config, backend.name)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            log(f"Using cached statement for model: {model_name}")
+            return cached
+    
+    text = call_with_retry(
+        lambda: backend.generate(model_name, prompt_text, generation_config),
+        breaker=_breaker_for(backend, model_name),
+        stats=stats,
+        log=log
+    )
+    
+    if cache is not None:
+        cache.put(cache_key, text, model_name)
+    return text
+
+def _hedged_generate_with_model(model_name, hedge_model, prompt_text, generation_config=None,
+                                use_cache=True, stats=None, hedge_after=DEFAULT_HEDGE_AFTER,
+                                log=print):
+    """
+    Generate content with a model, hedging to a second model if it is slow to start.
+    
+    Args:
+        model_name (str): Preferred model
+        hedge_model (str): Model the duplicate request goes to
+        prompt_text (str): The prompt to send to the model
+        generation_config (dict, optional): Generation parameters passed to the model
+        use_cache (bool): Whether to read from and write to the generation cache
+        stats (dict, optional): Filled with the winning 'model', 'hedged', 'hedge_won'
+            and retry counters
+        hedge_after (float): Seconds to wait for a first token before hedging
+        log (callable): Receives progress messages. Defaults to print.
         
-        # If still no API key, check if we're in development mode
-        if not api_key:
-            # Look for the API key in the .env file directly as a last resort
-            env_path = project_root / '.env'
-            if env_path.exists():
-                with open(env_path, 'r') as f:
-                    for line in f:
-                        if line.startswith('GEMINI_API_KEY='):
-                            api_key = line.strip().split('=', 1)[1].strip().strip('"').strip("'")
-                            print(f"Loaded API key from .env file")
-                            break
+    Returns:
+        str: Generated content
+    """
+    stats = stats if stats is not None else {}
+    backend = get_backend()
+    cache = get_generation_cache() if use_cache and not cache_disabled_by_env() else None
+    if cache is not None:
+        cached = cache.get(make_cache_key(prompt_text, model_name, generation_config, backend.name))
+        if cached is not None:
+            log(f"Using cached statement for model: {model_name}")
+            return cached
+    
+    text = hedged_generate(backend, model_name, hedge_model, prompt_text, generation_config,
+                           hedge_after=hedge_after, stats=stats, log=log)
+    
+    if cache is not None:
+        cache.put(make_cache_key(prompt_text, stats['model'], generation_config, backend.name),
+                  text, stats['model'])
+    return text
+
+def _stream_with_model(model_name, prompt_text, out, echo=True, stats=None,
+                       generation_config=None, use_cache=True):
+    """
+    Stream content from a specific model, writing each chunk to a file as it arrives.
+    
+    Args:
+        model_name (str): Name of the Gemini model to use
+        prompt_text (str): The prompt to send to the model
+        out (file): Open text file the chunks are appended to
+        echo (bool): Whether to print chunks to the terminal as they arrive
+        stats (dict, optional): Filled with 'model', 'cached', 'chunks',
+            'time_to_first_token', 'total_time' and retry counters
+        generation_config (dict, optional): Generation parameters passed to the model
+        use_cache (bool): Whether to read from and write to the generation cache
         
-        if not api_key:
-            raise ValueError("No API key found. Please set GEMINI_API_KEY in .env file.")
-            
-    # Configure the Gemini API
-    print(f"Configuring Gemini API with key: {api_key[:5]}...{api_key[-4:]}")
+    Returns:
+        str: Generated content
+    """
+    stats = stats if stats is not None else {}
+    start = time.perf_counter()
+    stats.update({'model': model_name, 'cached': False, 'chunks': 0,
+                  'time_to_first_token': None, 'total_time': None})
+    
+    backend = get_backend()
+    cache = get_generation_cache() if use_cache and not cache_disabled_by_env() else None
+    if cache is not None:
+        cache_key = make_cache_key(prompt_text, model_name, generation_config, backend.name)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            out.write(cached)
+            out.flush()
+            if echo:
+                print(cached, flush=True)
+            elapsed = time.perf_counter() - start
+            stats.update({'cached': True, 'chunks': 1,
+                          'time_to_first_token': elapsed, 'total_time': elapsed})
+            return cached
+    
+    def start_stream():
+        # Pull the first chunk too, since rate-limit errors surface when iteration starts
+        chunks = iter(backend.stream(model_name, prompt_text, generation_config))
+        return next(chunks, None), chunks
     
-    genai.configure(api_key=api_key)
+    first_chunk, chunks = call_with_retry(
+        start_stream, breaker=_breaker_for(backend, model_name), stats=stats
+    )
+    if first_chunk is not None:
+        chunks = itertools.chain([first_chunk], chunks)
+    
+    parts = []
+    for text in chunks:
+        if stats['time_to_first_token'] is None:
+            stats['time_to_first_token'] = time.perf_counter() - start
+        out.write(text)
+        out.flush()
+        if echo:
+            print(text, end='', flush=True)
+        parts.append(text)
+        stats['chunks'] += 1
+    if echo:
+        print()
+    
+    text = ''.join(parts)
+    stats['total_time'] = time.perf_counter() - start
+    if cache is not None:
+        cache.put(cache_key, text, model_name)
+    return text
 
-def generate_statement(prompt_text, model_name="gemini-1.5-flash", api_key=None):
+def _find_fallback_model(model_name, log=print):
+    """
+    Pick the first available fallback model, reusing the cached choice while it is fresh.
+    
+    Args:
+        model_name (str): Model to use if no fallback is available
+        log (callable): Receives progress messages. Defaults to print.
+        
+    Returns:
+        str: Name of the model to use
+    """
+    backend = get_backend()
+    fallback = get_model_resolver(backend.name).resolve_fallback(
+        FALLBACK_MODELS,
+        backend.list_models,
+        default=model_name,
+        log=log
+    )
+    log(f"Using fallback model: {fallback}")
+    return fallback
+
+def _record_failure(resolver, model_name, error):
+    """Skip a model in later calls if the error shows it can't be used at all."""
+    if is_model_unavailable(error):
+        resolver.mark_failed(model_name)
+
+def _print_troubleshooting(error, log=print):
+    """Print troubleshooting tips for a failed generation."""
+    log(f"Error generating content: {error}")
+    log("\nTroubleshooting tips:")
+    log("1. Check if your API key is valid")
+    log("2. Make sure you have internet connectivity")
+    log("3. Try using a different model name")
+
+def generate_statement(prompt_text, model_name="gemini-1.5-flash", api_key=None,
+                       use_cache=True, generation_config=None, stats=None, hedge_after=None,
+                       verbose=True):
     """
     Generate content using the Gemini API.
     
@@ -54,60 +245,132 @@ def generate_statement(prompt_text, model_name="gemini-1.5-flash", api_key=None)
         prompt_text (str): The prompt to send to the model
         model_name (str, optional): Name of the Gemini model to use
         api_key (str, optional): Gemini API key. If not provided, will be loaded from environment
+        use_cache (bool, optional): Set to False to bypass the generation cache
+        generation_config (dict, optional): Generation parameters passed to the model
+        stats (dict, optional): Filled with 'model', 'attempts', 'retries' and
+            'backoff_time' for reporting ('hedged' and 'hedge_won' when hedging)
+        hedge_after (float, optional): If set, send a duplicate request to the first
+            fallback model when the preferred model hasn't produced any text after
+            this many seconds; the first to respond wins
+        verbose (bool, optional): Print progress and troubleshooting messages. Set to
+            False when several generations run at once (e.g. batch runs), so their
+            output doesn't interleave with the caller's
         
     Returns:
         str: Generated content
     """
+    stats = stats if stats is not None else {}
+    log = print if verbose else _quiet
+    
     # Configure Gemini with API key
     configure_gemini(api_key)
+    resolver = get_model_resolver(get_backend().name)
     try:
-        # First try with the specified model (Gemini 2.5 Flash Preview)
-        preferred_model = "gemini-2.5-flash-preview-05-20"
+        if resolver.is_failing(PREFERRED_MODEL):
+            log(f"Skipping {PREFERRED_MODEL} (failed recently)")
+            model_name = _find_fallback_model(model_name, log)
+        else:
+            try:
+                # Try the preferred model first
+                log(f"Trying model: {PREFERRED_MODEL}")
+                stats['model'] = PREFERRED_MODEL
+                if hedge_after is not None:
+                    hedge_model = _find_fallback_model(model_name, log)
+                    text = _hedged_generate_with_model(PREFERRED_MODEL, hedge_model, prompt_text,
+                                                       generation_config, use_cache, stats,
+                                                       hedge_after, log)
+                else:
+                    text = _generate_with_model(PREFERRED_MODEL, prompt_text, generation_config,
+                                                use_cache, stats, log)
+                log(f"Successfully used model: {stats['model']}")
+                resolver.mark_ok(stats['model'])
+                return text
+            except Exception as e:
+                log(f"Could not use preferred model: {e}")
+                log("Falling back to alternative models...")
+                _record_failure(resolver, PREFERRED_MODEL, e)
+                model_name = _find_fallback_model(model_name, log)
         
+        # Generate content
+        stats['model'] = model_name
         try:
-            # Try the preferred model first
-            print(f"Trying model: {preferred_model}")
-            model = genai.GenerativeModel(preferred_model)
-            response = model.generate_content(prompt_text)
-            print(f"Successfully used model: {preferred_model}")
-            return response.text
+            text = _generate_with_model(model_name, prompt_text, generation_config,
+                                        use_cache, stats, log)
         except Exception as e:
-            print(f"Could not use preferred model: {e}")
-            print("Falling back to alternative models...")
-            
-            # Get available models
-            models = genai.list_models()
-            available_models = [model.name for model in models]
-            print(f"Available models: {available_models}")
-            
-            # Try other models in order of preference
-            fallback_models = [
-                "gemini-1.5-flash",
-                "gemini-1.5-pro",
-                "gemini-pro"
-            ]
-            
-            for fallback in fallback_models:
-                for available in available_models:
-                    if fallback in available:
-                        model_name = available
-                        print(f"Using fallback model: {model_name}")
-                        break
-                if model_name:
-                    break
-        
-        # Generate content
-        model = genai.GenerativeModel(model_name)
-        response = model.generate_content(prompt_text)
-        return response.text
+            _record_failure(resolver, model_name, e)
+            raise
+        resolver.mark_ok(model_name)
+        return text
     except Exception as e:
-        print(f"Error generating content: {e}")
-        print("\nTroubleshooting tips:")
-        print("1. Check if your API key is valid")
-        print("2. Make sure you have internet connectivity")
-        print("3. Try using a different model name")
+        _print_troubleshooting(e, log)
         raise
 
+def stream_statement(prompt_text, output_file, model_name="gemini-1.5-flash", api_key=None,
+                     echo=True, stats=None, use_cache=True, generation_config=None, header=None):
+    """
+    Generate content using the Gemini API, streaming it to a file and the terminal.
+    
+    Each chunk is appended to ``output_file`` as soon as it arrives, so a partial
+    statement survives if the connection drops mid-generation.
+    
+    Args:
+        prompt_text (str): The prompt to send to the model
+        output_file (str or Path): Markdown file the statement is written to
+        model_name (str, optional): Name of the Gemini model to use
+        api_key (str, optional): Gemini API key. If not provided, will be loaded from environment
+        echo (bool, optional): Print chunks to the terminal as they arrive
+        stats (dict, optional): Filled with timing information, including
+            'time_to_first_token', and retry counters ('retries', 'backoff_time')
+        use_cache (bool, optional): Set to False to bypass the generation cache
+        generation_config (dict, optional): Generation parameters passed to the model
+        header (str, optional): Text written to the file before the statement (not
+            echoed or returned), e.g. statement_header()
+        
+    Returns:
+        str: Generated content
+    """
+    stats = stats if stats is not None else {}
+    
+    # Configure Gemini with API key
+    configure_gemini(api_key)
+    resolver = get_model_resolver(get_backend().name)
+    with open(output_file, 'w', encoding='utf-8') as out:
+        if header:
+            out.write(header)
+            out.flush()
+        try:
+            if resolver.is_failing(PREFERRED_MODEL):
+                print(f"Skipping {PREFERRED_MODEL} (failed recently)")
+                model_name = _find_fallback_model(model_name)
+            else:
+                try:
+                    # Try the preferred model first
+                    print(f"Trying model: {PREFERRED_MODEL}")
+                    text = _stream_with_model(PREFERRED_MODEL, prompt_text, out, echo, stats,
+                                              generation_config, use_cache)
+                    resolver.mark_ok(PREFERRED_MODEL)
+                    return text
+                except Exception as e:
+                    if stats.get('chunks'):
+                        # Part of the statement is already on disk, so don't mix in another model
+                        raise
+                    print(f"Could not use preferred model: {e}")
+                    print("Falling back to alternative models...")
+                    _record_failure(resolver, PREFERRED_MODEL, e)
+                    model_name = _find_fallback_model(model_name)
+            
+            try:
+                text = _stream_with_model(model_name, prompt_text, out, echo, stats,
+                                          generation_config, use_cache)
+            except Exception as e:
+                _record_failure(resolver, model_name, e)
+                raise
+            resolver.mark_ok(model_name)
+            return text
+        except Exception as e:
+            _print_troubleshooting(e)
+            raise
+
 def save_generated_content(content, filename="generated_statement.md"):
     """
     Save the generated content to a file.
@@ -137,30 +400,26 @@ def load_student_responses(json_file):
         print(f"Error loading responses: {e}")
         raise
 
-def validate_responses(responses, schema_file='statement_intent_schema.json'):
+def validate_responses(responses, schema_file=None):
     """
     Validate student responses against the schema.
     
+    Checks required fields, types, allowed options and lengths using the compiled
+    validator (see app.utils.response_validator).
+    
     Args:
-        responses (dict): Student responses
-        schema_file (str): Path to schema file
+        responses (dict): Student responses, keyed by schema field ids or q1..qN
+        schema_file (str, optional): Path to schema file. Defaults to STATEMENT_SCHEMA.
         
     Returns:
         tuple: (is_valid, list_of_errors)
     """
     try:
-        # Load schema
-        with open(schema_file, 'r', encoding='utf-8') as f:
-            schema = json.load(f)
-        
-        errors = []
-        
-        # Check required fields
-        for section in schema.get('sections', []):
-            for field in section.get('fields', []):
-                field_id = field.get('id')
-                if field.get('required', False) and field_id not in responses:
-                    errors.append(f"Missing required field: {field_id}")
+        if schema_file is None:
+            validator = get_response_validator()
+        else:
+            validator = ResponseValidator(get_schema(schema_file))
+        errors = [error['message'] for error in validator.validate(responses)]
         
         return (len(errors) == 0, errors)
         
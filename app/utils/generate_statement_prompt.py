@@ -6,8 +6,12 @@ document based on student responses.
 
 """
 
+import hashlib
 import json
+import random
+import re
 import sys
+import threading
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -15,152 +19,142 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 # Import app_config for file paths
 from app.app_config import STATEMENT_SCHEMA
+from app.utils.schema_registry import get_schema
+from app.utils.token_budget import (
+    estimate_static_tokens, estimate_tokens, fit_responses, get_token_budget
+)
 
 def load_schema(schema_file=None):
     """Load the JSON schema file.
     
+    The schema comes from the shared schema registry, so the file is only parsed
+    again when it changes.
+    
     Args:
         schema_file: Optional path to schema file. If None, uses the path from app_config.
     """
-    if schema_file is None:
-        schema_file = STATEMENT_SCHEMA
-        
     try:
-        with open(schema_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return get_schema(schema_file)
     except FileNotFoundError:
-        print(f"Error: Schema file '{schema_file}' not found.")
-        # Try the old location as a fallback
-        old_path = Path(__file__).parent.parent.parent / 'statement_intent_schema.json'
-        if old_path.exists():
-            print(f"Using fallback schema file at {old_path}")
-            with open(old_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+        print(f"Error: Schema file '{schema_file or STATEMENT_SCHEMA}' not found.")
         exit(1)
     except json.JSONDecodeError:
-        print(f"Error: Invalid JSON in schema file '{schema_file}'.")
+        print(f"Error: Invalid JSON in schema file '{schema_file or STATEMENT_SCHEMA}'.")
         exit(1)
 
-def generate_prompt(student_responses):
-    """
-    Generate a prompt for the Gemini API following the NESA Statement of Intent structure,
-    with enhanced instructions to ensure Band 6 quality, a "community college student" voice,
-    and Australian spelling.
-    """
-    schema = load_schema() # Schema loaded but not directly used in this prompt's construction
-    
-    # Import random for variety features
-    import random
-
-    # Build the prompt
-    prompt_parts = [
-        "# NESA Stage 6 Industrial Technology Multimedia - Statement of Intent Generation",
-        "\n## Instructions for AI Assistant (Band 6 Enhancement & Style Adaptation Protocol)",
-        "You are an expert AI Assistant specializing in the NESA Stage 6 Industrial Technology Multimedia Major Project. Your core task is to generate a comprehensive, academically rigorous, and **Band 6-level Statement of Intent** document based on the student's provided responses. **Crucially, you must transform, elevate, and elaborate on the student's input to meet Band 6 standards, AND adapt the language style as specified.**",
-
-        "\n**Follow these strict guidelines for Band 6 quality, writing style, and spelling:**",
-        "1.  **Content Elevation (Band 6):** If a student's response is vague, generic, or lacks sufficient detail/justification for a Band 6, **you must rephrase, expand, and add the necessary academic depth and logical connections.** For example:",
-        "    *   **'Problem/Opportunity':** Reframe niche preferences into demonstrable user needs or genuine opportunities for innovation.",
-        "    *   **'Justification':** Clearly articulate the 'why' behind choices, linking them to project goals, audience needs, and industry relevance.",
-        "    *   **'Objectives':** Translate commercial/marketing goals (e.g., 'Steam launch,' 'YouTube views') into specific, *product-centric*, and *measurable* academic objectives related to user experience, learning outcomes, or technical demonstration.",
-        "    *   **'Characteristics/Criteria':** Convert subjective desires into actionable design principles or measurable evaluation points.",
-        "2.  **Language Style Adaptation (Highly Technical Year 12 Student / Community College Voice):**",
-        "    *   **Vocabulary:** Use direct, clear, and slightly less formal vocabulary. Replace overly academic/complex words (e.g., 'encompass', 'meticulously', 'mitigate', 'discerning', 'propensity', 'efficacy', 'necessitate') with simpler, more common synonyms (e.g., 'include', 'carefully', 'reduce', 'good', 'tendency', 'effectiveness', 'require').",
-        "    *   **Sentence Structure:** Opt for more direct and concise sentence structures. Break down long, complex sentences into shorter, more manageable ones. Prioritise active voice.",
-        "    *   **Tone:** Maintain an enthusiastic, confident, and professional tone, reflective of a student passionate about their technical work, but without excessive formality. The language should be highly articulate and clear, but sound like a capable Year 12 student writing a project brief, not a university essay.",
-        "    *   **Technical Terminology:** **Crucially, technical terms, software, and hardware names should remain precise and be formatted consistently (e.g., `Python`, `Adobe After Effects`, `Raspberry Pi`). Do NOT simplify technical jargon or compromise accuracy.** The student is highly skilled technically.",
-        "    *   **Individual Voice:** Create a UNIQUE voice for each student. Some students might use more slang or colloquialisms, others might be more formal. Some might use shorter sentences, others longer ones. Some might be more enthusiastic, others more matter-of-fact. Vary paragraph lengths and sentence structures significantly between different statements.",
-        "    *   **Authentic Variations:** Include occasional 'authentic' elements like a personal anecdote, a specific example from the student's experience, or a unique perspective on their project. Make each statement feel genuinely individual.",
-        "    *   **Structural Diversity:** Don't always follow the exact same pattern in each section. Sometimes lead with examples, other times with principles. Sometimes use lists, other times use paragraphs. Vary how information is presented.",
-        "    *   **Project-Specific Language:** Adapt vocabulary and phrasing to match the type of project. Game projects might use more action-oriented language, educational projects more supportive language, technical projects more precise language.",
-        "    *   **Confidence Variation:** Some students should sound very confident about their skills and project, others slightly more tentative or reflective. This creates authentic diversity in voice.",
-        "    *   **Section Organization:** Don't always present information in the same order within sections. Sometimes start with the 'what', other times with the 'why'. Create natural variation in how ideas flow.",
-        "3.  **Australian Spelling Conventions:** Consistently use Australian English spelling (e.g., '-ise' instead of '-ize', 'colour' instead of 'color', 'favourite' instead of 'favorite', 'programme' instead of 'program' for a show/event, but 'program' for software code).",
-        "4.  **Specificity and Detail:** Elaborate on broad statements, adding concrete examples or explanations where appropriate, but explaining them in the adapted style.",
-        "5.  **Logical Coherence:** Ensure all sections flow logically and build upon each other. Explicitly connect the problem statement to the project's solution, objectives, and success criteria, maintaining smooth transitions in the adapted style.",
-        "6.  **Adherence to Structure:** Strictly follow the provided section structure and numbering.",
-        "7.  **Placeholders:** If information is genuinely missing and cannot be reasonably inferred or elevated to Band 6 standard, keep the bracketed placeholder `[ ]` as a prompt for future student input.",
-        "8.  **Formatting:** Use Markdown for headings and emphasis (bolding).",
-
-        "\n## Student Responses (for reference and transformation)",
-        json.dumps(student_responses, indent=2), # Displays student's raw input to the AI
-
-        "\n## Band 6 Statement of Intent Template (to be populated, elevated, and styled by AI)",
-        "\n# Statement of Intent: [Project Title - *Incorporate student's project title (e.g., `q1`)*]",
-
-        "\n## 1.1 Introduction: Defining the Project and its Purpose",
+# Static instruction blocks, shared by every student
+INSTRUCTION_PARTS = [
+    "# NESA Stage 6 Industrial Technology Multimedia - Statement of Intent Generation",
+    "\n## Instructions for AI Assistant (Band 6 Enhancement & Style Adaptation Protocol)",
+    "You are an expert AI Assistant specializing in the NESA Stage 6 Industrial Technology Multimedia Major Project. Your core task is to generate a comprehensive, academically rigorous, and **Band 6-level Statement of Intent** document based on the student's provided responses. **Crucially, you must transform, elevate, and elaborate on the student's input to meet Band 6 standards, AND adapt the language style as specified.**",
+
+    "\n**Follow these strict guidelines for Band 6 quality, writing style, and spelling:**",
+    "1.  **Content Elevation (Band 6):** If a student's response is vague, generic, or lacks sufficient detail/justification for a Band 6, **you must rephrase, expand, and add the necessary academic depth and logical connections.** For example:",
+    "    *   **'Problem/Opportunity':** Reframe niche preferences into demonstrable user needs or genuine opportunities for innovation.",
+    "    *   **'Justification':** Clearly articulate the 'why' behind choices, linking them to project goals, audience needs, and industry relevance.",
+    "    *   **'Objectives':** Translate commercial/marketing goals (e.g., 'Steam launch,' 'YouTube views') into specific, *product-centric*, and *measurable* academic objectives related to user experience, learning outcomes, or technical demonstration.",
+    "    *   **'Characteristics/Criteria':** Convert subjective desires into actionable design principles or measurable evaluation points.",
+    "2.  **Language Style Adaptation (Highly Technical Year 12 Student / Community College Voice):**",
+    "    *   **Vocabulary:** Use direct, clear, and slightly less formal vocabulary. Replace overly academic/complex words (e.g., 'encompass', 'meticulously', 'mitigate', 'discerning', 'propensity', 'efficacy', 'necessitate') with simpler, more common synonyms (e.g., 'include', 'carefully', 'reduce', 'good', 'tendency', 'effectiveness', 'require').",
+    "    *   **Sentence Structure:** Opt for more direct and concise sentence structures. Break down long, complex sentences into shorter, more manageable ones. Prioritise active voice.",
+    "    *   **Tone:** Maintain an enthusiastic, confident, and professional tone, reflective of a student passionate about their technical work, but without excessive formality. The language should be highly articulate and clear, but sound like a capable Year 12 student writing a project brief, not a university essay.",
+    "    *   **Technical Terminology:** **Crucially, technical terms, software, and hardware names should remain precise and be formatted consistently (e.g., `Python`, `Adobe After Effects`, `Raspberry Pi`). Do NOT simplify technical jargon or compromise accuracy.** The student is highly skilled technically.",
+    "    *   **Individual Voice:** Create a UNIQUE voice for each student. Some students might use more slang or colloquialisms, others might be more formal. Some might use shorter sentences, others longer ones. Some might be more enthusiastic, others more matter-of-fact. Vary paragraph lengths and sentence structures significantly between different statements.",
+    "    *   **Authentic Variations:** Include occasional 'authentic' elements like a personal anecdote, a specific example from the student's experience, or a unique perspective on their project. Make each statement feel genuinely individual.",
+    "    *   **Structural Diversity:** Don't always follow the exact same pattern in each section. Sometimes lead with examples, other times with principles. Sometimes use lists, other times use paragraphs. Vary how information is presented.",
+    "    *   **Project-Specific Language:** Adapt vocabulary and phrasing to match the type of project. Game projects might use more action-oriented language, educational projects more supportive language, technical projects more precise language.",
+    "    *   **Confidence Variation:** Some students should sound very confident about their skills and project, others slightly more tentative or reflective. This creates authentic diversity in voice.",
+    "    *   **Section Organization:** Don't always present information in the same order within sections. Sometimes start with the 'what', other times with the 'why'. Create natural variation in how ideas flow.",
+    "3.  **Australian Spelling Conventions:** Consistently use Australian English spelling (e.g., '-ise' instead of '-ize', 'colour' instead of 'color', 'favourite' instead of 'favorite', 'programme' instead of 'program' for a show/event, but 'program' for software code).",
+    "4.  **Specificity and Detail:** Elaborate on broad statements, adding concrete examples or explanations where appropriate, but explaining them in the adapted style.",
+    "5.  **Logical Coherence:** Ensure all sections flow logically and build upon each other. Explicitly connect the problem statement to the project's solution, objectives, and success criteria, maintaining smooth transitions in the adapted style.",
+    "6.  **Adherence to Structure:** Strictly follow the provided section structure and numbering.",
+    "7.  **Placeholders:** If information is genuinely missing and cannot be reasonably inferred or elevated to Band 6 standard, keep the bracketed placeholder `[ ]` as a prompt for future student input.",
+    "8.  **Formatting:** Use Markdown for headings and emphasis (bolding).",
+]
+
+RESPONSES_HEADING = "\n## Student Responses (for reference and transformation)"
+TEMPLATE_HEADING = "\n## Band 6 Statement of Intent Template (to be populated, elevated, and styled by AI)"
+TITLE_TEMPLATE = "\n# Statement of Intent: [Project Title - *Incorporate student's project title (e.g., `q1`)*]"
+
+# Placeholder in a section line that is replaced with the student's `q4` response
+Q4_SLOT = '{q4}'
+
+# Section templates in document order: (number, heading, body lines)
+SECTION_TEMPLATES = [
+    ("1.1", "\n## 1.1 Introduction: Defining the Project and its Purpose", [
         "/* RANDOMLY SELECT ONE OF THESE OPENING STYLES FOR THE FIRST PARAGRAPH */",
         "STYLE 1: For my Industrial Technology Multimedia Major Project, I'm going to design, build, and make [specific multimedia product type - *Use `q2`. Elevate if generic, e.g., 'a highly interactive web-based simulation' instead of just 'website'. Adapt language.*] titled '[Project Title - *From `q1`*]'.",
         "STYLE 2: My name is [student name - make up a realistic name], and I'm creating [specific multimedia product type - *Use `q2`. Elevate if generic*] called '[Project Title - *From `q1`*]' for my Industrial Technology Multimedia Major Project. This is something I'm really excited about.",
         "STYLE 3: '[Project Title - *From `q1`*]' is a [specific multimedia product type - *Use `q2`. Elevate if generic*] that I'm developing as my Industrial Technology Multimedia Major Project. It represents my passion for [relevant field from `q4` or `q5`].",
         "STYLE 4: Have you ever wondered [question related to the problem/opportunity in `q3`]? That's exactly what my Industrial Technology Multimedia Major Project '[Project Title - *From `q1`*]' aims to address through [specific multimedia product type - *Use `q2`. Elevate if generic*].",
-        
+
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE PROBLEM/OPPORTUNITY PARAGRAPH */",
         "STYLE 1: This project is mostly happening because I've noticed [specific problem/opportunity - *Use `q3`. **CRITICAL**: Rephrase student input to reflect a genuine user need, a gap in knowledge/resources, or a significant societal/creative opportunity, not a niche preference or personal whim. Adapt language to be more direct and less academic.*].",
         "STYLE 2: What really pushed me to create this was [specific problem/opportunity - *Use `q3`*]. I kept seeing this issue come up, and I thought, 'Someone should really do something about this.' So I decided that someone would be me.",
         "STYLE 3: The main reason behind this project is simple: [specific problem/opportunity - *Use `q3`*]. It's something I've experienced personally, and I know many others have too.",
         "STYLE 4: I started working on this after realizing [specific problem/opportunity - *Use `q3`*]. It's a problem that doesn't get enough attention, but it affects [relevant group] in significant ways.",
-        
+
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE FOCUS/TECHNOLOGIES PARAGRAPH */",
         "STYLE 1: My project will specifically focus on [core content/subject matter - *Use `q5`. Elaborate on the core theme, narrative, or gameplay focus beyond just listing techniques. E.g., 'the exploration of non-Euclidean geometry through interactive puzzle design'. Adapt language.*] by primarily using [main multimedia forms/technologies - *Use `q4`. List specific software/languages and justify their relevance to the project's aims. Keep technical terms precise but adapt surrounding language.*].",
         "STYLE 2: To bring this vision to life, I'll be diving deep into [core content/subject matter - *Use `q5`*]. The technical side will involve [main multimedia forms/technologies - *Use `q4`*], which I've chosen because [brief justification related to project goals].",
         "STYLE 3: At its heart, this project explores [core content/subject matter - *Use `q5`*]. I'll be using [main multimedia forms/technologies - *Use `q4`*] to create something that's both technically impressive and meaningful to users.",
         "STYLE 4: The core of '[Project Title - *From `q1`*]' is all about [core content/subject matter - *Use `q5`*]. For the technical implementation, I've selected [main multimedia forms/technologies - *Use `q4`*] because these tools give me the flexibility and power I need for what I'm trying to achieve.",
-
-        "\n## 1.2 Rationale: Why This Project? Why This Approach?",
+    ]),
+    ("1.2", "\n## 1.2 Rationale: Why This Project? Why This Approach?", [
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE PERSONAL CONNECTION PARAGRAPH */",
         "STYLE 1: I decided to make this project because I'm really into [personal interest/connection - *Use `q5` and any other relevant student input. Connect personal passion to the project's academic or industry relevance. Adapt language.*]. This project fits right in with what I want to do in the [industry sector - *Use `q8`. Be specific, e.g., 'digital game development,' 'interactive educational media'. Adapt language.*] industry.",
         "STYLE 2: This project is personal for me. [Brief personal anecdote related to `q5` - create a short, authentic-sounding story]. That experience showed me how important this kind of work is, and it's pushed me toward the [industry sector - *Use `q8`*] field.",
         "STYLE 3: My passion for [personal interest/connection - *Use `q5`*] is what drives this project. I've always been fascinated by [aspect of the project], and I see this as my first real step toward a career in [industry sector - *Use `q8`*].",
         "STYLE 4: When I think about why I'm doing this project, it comes down to two things: my interest in [personal interest/connection - *Use `q5`*] and my goal to work in [industry sector - *Use `q8`*] after I finish school.",
-        
+
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE MEDIUM JUSTIFICATION PARAGRAPH */",
         "STYLE 1: I also really believe that [product type - *From `q2`*] is the best way to do this project because [justification - *Use `q6`. **Elevate**: Explain *why* this specific medium (e.g., a game, a website, an animation) uniquely addresses the identified problem/opportunity and engages the target audience, leveraging its specific characteristics (e.g., interactivity, immersion, visual storytelling, accessibility). Avoid vague statements like 'it's suitable'. Adapt language to be more direct.*].",
         "STYLE 2: Why [product type - *From `q2`*] and not something else? Simply put, [justification - *Use `q6`*]. No other format would allow the same level of [key benefit, e.g., 'engagement', 'clarity', 'emotional impact'].",
         "STYLE 3: The decision to create a [product type - *From `q2`*] wasn't random. I chose this format specifically because [justification - *Use `q6`*]. This approach lets me [key benefit] in a way that [alternative approach] simply couldn't.",
         "STYLE 4: A [product type - *From `q2`*] is perfect for what I'm trying to achieve. Here's why: [justification - *Use `q6`*]. This format gives me the tools to [key benefit] while still keeping the project manageable within my timeframe and resources.",
-        
+
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE SKILLS PARAGRAPH */",
         "STYLE 1: This project is a huge chance for me to learn and get really good at [2-3 specific techniques/processes - *Use `q7`. Be specific and demonstrate ambition, e.g., 'advanced character rigging and inverse kinematics,' 'real-time shader development,' 'complex database integration for dynamic content delivery'. Adapt language.*], which are all skills used a lot in today's [industry sector - *From `q8`*] industry.",
         "STYLE 2: On the technical side, I'm looking forward to developing my skills in [2-3 specific techniques/processes - *Use `q7`*]. These aren't just random techniques – they're highly valued in the [industry sector - *From `q8`*] industry, which is where I hope to work someday.",
         "STYLE 3: I'll be pushing myself to master [2-3 specific techniques/processes - *Use `q7`*] throughout this project. I've done some basic work with these before, but this is my chance to really level up and create something that shows what I can do. These skills are exactly what employers in [industry sector - *From `q8`*] are looking for.",
         "STYLE 4: The technical challenges of this project will help me grow in some important areas: [2-3 specific techniques/processes - *Use `q7`*]. I've researched what skills are most valuable in the [industry sector - *From `q8`*] industry, and these are definitely at the top of the list.",
-
-        "\n## 1.3 Target Audience: Who is this Project For, and Why?",
+    ]),
+    ("1.3", "\n## 1.3 Target Audience: Who is this Project For, and Why?", [
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE AUDIENCE IDENTIFICATION PARAGRAPH */",
         "STYLE 1: The main people I'm making '[Project Title - *From `q1`*]' for are [specific demographic - *Use `q10`. Be precise, e.g., 'Year 9-10 Science students studying ecosystems,' 'Independent game enthusiasts aged 25-45 who appreciate narrative-driven puzzle games'. Adapt language.*].",
         "STYLE 2: I've designed '[Project Title - *From `q1`*]' specifically with [specific demographic - *Use `q10`*] in mind. They're my primary audience, though others might find it useful too.",
         "STYLE 3: When I think about who will use '[Project Title - *From `q1`*]', I'm mainly focusing on [specific demographic - *Use `q10`*]. This is a group I understand well and feel I can create something valuable for.",
         "STYLE 4: '[Project Title - *From `q1`*]' targets [specific demographic - *Use `q10`*]. I chose this audience carefully after considering who would benefit most from what I'm creating.",
-        
+
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE AUDIENCE JUSTIFICATION PARAGRAPH */",
         "STYLE 1: I picked this group because [justification with reference to research/insights - *Use `q9`. **Elevate**: Avoid stereotypes or generalisations. Base justification on identified needs, learning gaps, market analysis, or specific psychological insights relevant to their engagement with multimedia. Adapt language to be more direct.*].",
         "STYLE 2: There are several reasons why I'm focusing on this particular audience. Most importantly, [justification - *Use `q9`*]. I've observed this firsthand and believe my project can make a real difference here.",
         "STYLE 3: My research into this audience revealed that [justification - *Use `q9`*]. This insight was eye-opening and helped me shape the entire direction of my project.",
         "STYLE 4: Why this specific audience? Because [justification - *Use `q9`*]. Understanding their unique needs has been crucial in developing something that will genuinely resonate with them.",
-        
+
         "/* RANDOMLY SELECT ONE OF THESE STYLES FOR THE AUDIENCE CHARACTERISTICS PARAGRAPH */",
         "STYLE 1: I expect this audience to [relevant characteristics - *Use `q10`, `q11`. **Transform**: Convert subjective desires into actionable user characteristics influencing design (e.g., 'a high level of digital literacy and access to mobile devices,' 'a preference for immersive narratives over competitive gameplay,' 'a desire for challenging mental stimulation'). Adapt language.*], which will directly change how I design the game, how it feels to play, and what it does, so it works well for them.",
         "STYLE 2: Understanding my audience's characteristics is crucial. They tend to [relevant characteristics - *Use `q10`, `q11`*], and I've designed every aspect of my project with these traits in mind.",
         "STYLE 3: The specific needs and preferences of my audience include [relevant characteristics - *Use `q10`, `q11`*]. These insights aren't just interesting – they're guiding my design decisions at every step.",
         "STYLE 4: What makes this audience unique? For one thing, they [relevant characteristics - *Use `q10`, `q11`*]. I'm constantly referring back to these characteristics as I develop my project to ensure it meets their specific needs.",
-
-        "\n## 1.4 Project Goals and Objectives",
+    ]),
+    ("1.4", "\n## 1.4 Project Goals and Objectives", [
         "The main goal of this project is to [main purpose/impact - *Use `q11`. **Elevate**: Reframe vague desires (e.g., 'feel young') into concrete, measurable impacts or benefits for the user, aligning with the project's core problem/opportunity. E.g., 'provide an innovative platform for conceptual understanding,' 'deliver a deeply engaging interactive narrative experience'. Adapt language.*]. To do this, here are my clear and important goals:",
         "\n- **Objective 1 (User Experience/Learning Outcome):** [Specific, measurable objective - *Use `q15`. **CRITICAL Transformation**: If student input is a commercial goal (e.g., 'launch on Steam'), rephrase it to describe what the *user will achieve or experience within the product*. E.g., 'Enable users to successfully complete all three core levels of the game, demonstrating mastery of its unique puzzle mechanics,' or 'Help players clearly understand complex scientific principles through interactive visualisations.' Adapt language.*]",
         "\n- **Objective 2 (Engagement/Aesthetics/Technical Aspect):** [Specific, measurable objective - *Use `q16` or other relevant input. Focus on the project's inherent qualities. E.g., 'Make the game look good with a consistent [visual style, e.g., cyberpunk aesthetic] and [auditory design, e.g., atmospheric soundscape] to make it more immersive and fun,' or 'Make sure the controls are easy to use so players can move around and interact without problems.' Adapt language.*]",
         "\n- **Objective 3 (Skill Demonstration/Problem-Solving):** [Specific, measurable objective - *Use `q14` or `q7`. This objective should highlight a key technical or creative challenge. E.g., 'Successfully build advanced [skill, e.g., procedural generation algorithms] to make content that feels fresh every time you play,' or 'Show off great [skill, e.g., character animation] that makes characters feel real and expressive.' Adapt language.*]",
-
-        "\n## 1.5 Project Parameters, Scope, and Constraints",
+    ]),
+    ("1.5", "\n## 1.5 Project Parameters, Scope, and Constraints", [
         "The final thing I'm making will be a [product type - *From `q2`*], delivered as [specific format(s) and key technical parameters - *E.g., 'an HTML5 web application for desktop browsers,' 'an MP4 video file (about X minutes, 1920x1080 resolution),' 'a standalone program for Windows.' Adapt language.*].",
         "\nThe game will have [3-5 key components/features defining boundaries - *List concrete features that will be included, e.g., 'three distinct game levels,' 'an interactive quiz part,' 'custom character models and animations for the main characters.' Adapt language.*]. To make sure I can finish the project on time, I won't be adding things like [briefly mention 1-2 explicitly excluded items to manage scope, e.g., 'multiplayer functionality,' 'a lot of spoken dialogue,' 'player accounts'] to the final game.",
         "\nHere are the main limitations and challenges I expect to face while making this:",
         "-   **Time:** The biggest challenge is the time I have for the HSC course, which is about forty-two weeks. This means I really need to manage my time strictly and stick to the detailed plan I've set up. (This is static; student doesn't need to input for it).",
         "-   **Skills & Knowledge:** To do this well, I need to get good at [1-2 specific advanced skills needed - *Use `q19`, `q20`. E.g., 'advanced Python coding for game logic,' 'tricky 3D modelling work in Blender'*]. I'll learn these skills from [mention specific learning methods, e.g., 'online tutorials (like Udemy, Skillshare),' 'advice from people in the industry,' 'a lot of practice making smaller test projects'. Adapt language.*].",
-        f"-   **Resources & Equipment:** I need access to certain software (`{student_responses.get('q4', '')}` if available, otherwise specify. E.g., `Adobe Creative Suite`, `Unity`, `Blender`) and hardware ([e.g., 'a good computer for making art,' 'a drawing tablet']). I'll have to carefully handle things like [mention specific resource constraints from `q21`, `q22`, e.g., 'making the game run fast on the Raspberry Pi's limited power,' 'making sure all the game's art and sound look and feel consistent, even with limited time and software']. I'll manage this by testing and fixing bugs a lot. (Adapt language).",
+        "-   **Resources & Equipment:** I need access to certain software (`{q4}` if available, otherwise specify. E.g., `Adobe Creative Suite`, `Unity`, `Blender`) and hardware ([e.g., 'a good computer for making art,' 'a drawing tablet']). I'll have to carefully handle things like [mention specific resource constraints from `q21`, `q22`, e.g., 'making the game run fast on the Raspberry Pi's limited power,' 'making sure all the game's art and sound look and feel consistent, even with limited time and software']. I'll manage this by testing and fixing bugs a lot. (Adapt language).",
         "-   **Technical Complexity:** Making tricky features, like [specific complex technical aspect from `q22` or inferred, e.g., 'getting dynamic collision detection to work for different shapes,' 'building a smart enemy AI system,' 'making cool real-time fire effects'], will be a big technical challenge. This means I need to plan really well, test things often, and fix bugs carefully. (Adapt language).",
-
-        "\n## 1.6 Timeline and Milestones",
+    ]),
+    ("1.6", "\n## 1.6 Timeline and Milestones", [
         "The deadline for my project is around Week 3, Term 3. But I've been told it's smart to finish by Week 2 to have enough time for trials. This gives me about forty-two weeks to do everything.",
         "\nHere's my plan for the project:",
         "-   **Term 4 (Weeks 1-10):** First up is research, getting my ideas together, and detailed planning. This includes studying the game industry, writing down my early designs, and setting up my tech. (Adapt language).",
@@ -168,60 +162,517 @@ def generate_prompt(student_responses):
         "-   **Term 1 (Weeks 1-10):** This is where most of the building happens. I'll put in the main features, connect my tech (like Flask with the front-end, and getting the server running), and set up the main game loops or content. (Adapt language).",
         "-   **Term 2 (Weeks 1-10):** I'll create and add all the art, sound, and animations. Then, I'll do lots of testing to make sure everything works and find any bugs. (Adapt language).",
         "-   **Term 3 (Weeks 1-2):** Final polish, more testing, and finishing up the project. This means getting everything ready for the final presentation, writing up all the detailed documentation for my folio, and a final quality check. (Adapt language).",
-
-        "\n## 1.7 Expected Outcomes and Success Criteria",
+    ]),
+    ("1.7", "\n## 1.7 Expected Outcomes and Success Criteria", [
         "I'll judge if '[Project Title - *From `q1`*]' is successful based on how well it meets my goals and how good the final game and my folio are. Here are my specific success checks:",
         "1.  **Goals Met & Player Impact:** The game needs to clearly meet its main goals (from Section 1.4), especially in [reiterate key user outcome from objectives, e.g., 'getting players hooked on unique mechanics,' 'how well they understand game objectives']. I'll check this by [how it will be measured - *Use `q23`, `q24`. **Transform**: Focus on internal, academic validation methods like 'organised player feedback sessions,' 'watching how players interact with the game,' 'tracking how many levels they finish,' all written down in my folio.*]. (Adapt language).",
         "2.  **Tech Quality & Looks/Sounds:** The finished game needs to show that I'm really good at [technical skills from `q27`, e.g., 'coding efficiently,' 'making smooth animations,' 'rendering graphics well'], and it should have a strong [aesthetic style from `q17`, e.g., 'nostalgic retro video arcade look'] and great sound. I'll prove this with [how it will be shown - e.g., 'test reports showing good performance and few bugs,' 'a clear plan in my folio for how the game looks and sounds consistently,' 'getting positive feedback from my teachers and classmates on the art and tech.']. (Adapt language).",
         "3.  **Audience Fit & Improvement:** The game needs to be right for, easy to use for, and fun for its audience ([target audience from `q10`]). I'll keep checking and improving this by [how it will be assessed - *Use `q25`. **Transform**: Focus on 'getting feedback from players regularly,' 'advice from teachers and people in the game industry,' 'checking it against my detailed design plans in my folio,' so the game really connects with its players.*]. (Adapt language).",
+    ]),
+    ("1.8", "\n## 1.8 Opportunities", [
+        "When '[Project Title - *From `q1`*]' is done, it'll be a really important part of my portfolio. It'll show off my advanced skills in [2-3 key skill areas demonstrated - *Use `q28` and other relevant skill mentions. E.g., 'making interactive games,' 'full-stack web development,' 'tricky 2D/3D animation,' 'making good user interfaces'*]. This big project will be super helpful for applying to college or jobs in [relevant industry/field - *Use `q8` and `q28`. E.g., 'digital media,' 'game development'*]. Plus, I'll get good at [valuable process learned - e.g., 'managing a big creative project from start to finish,' 'using feedback to make it better,' 'solving tough tech problems when things get stressful'], which will be really useful later on. (Adapt language).",
+    ]),
+]
+
+VARIETY_INSTRUCTIONS = [
+    "\n## CRITICAL VARIETY INSTRUCTIONS",
+    "To ensure each Statement of Intent feels like original student work:",
+    "1. **REQUIRED: Each paragraph template below has already been chosen for this student from several styles.** Use it for the content and structure of that paragraph, not as wording to copy.",
+    "2. **REQUIRED: Create a unique student persona** for each statement. Give them distinctive traits like:",
+    "   - A specific confidence level (very confident, somewhat tentative, balanced)",
+    "   - A distinctive writing style (more technical, more emotional, more analytical)",
+    "   - Unique speech patterns (short sentences, complex sentences, use of questions, use of examples)",
+    "   - Different vocabulary preferences (simple, advanced, field-specific)",
+    "3. **REQUIRED: Vary paragraph structures** - Some students use topic sentences followed by details, others build to their main point, others use compare/contrast structures.",
+    "4. **REQUIRED: Include at least one authentic personal element** - a brief anecdote, a specific example from their experience, or a unique perspective.",
+    "5. **REQUIRED: Adjust language based on project type** - use different vocabulary and tone for games vs. educational tools vs. websites.",
+    "6. **REQUIRED: Include occasional 'authentic variations'** - some minor repetition of key points, varying levels of formality between sections, or natural transitions.",
+    "7. **REQUIRED: Vary formatting approaches** - some students might use more bullet points, others more paragraphs, some more headings.",
+    "8. **REQUIRED: Use different evidence types** - some students might cite statistics, others personal observations, others industry trends.",
+    "9. **REQUIRED: Create different emotional tones** - some students more enthusiastic, others more analytical, others more reflective.",
+    "10. **CRITICAL: Do NOT copy template instructions (text in square brackets or between asterisks) into your final output.**",
+    "11. **CRITICAL: DO NOT use phrases like 'This project is mostly happening because...' or any other template phrases verbatim. Rewrite them in your own unique style.**"
+]
+
+RANDOMIZATION_INSTRUCTIONS = [
+    "\n## RANDOMIZATION REQUIREMENTS",
+    "To create truly unique statements, you MUST use randomization in your approach:",
+    "1. Randomly vary how closely each section follows its paragraph templates - reorder, merge or split paragraphs where it reads more naturally.",
+    "2. Randomly determine the student's overall voice characteristics (confidence level, formality, sentence structure preferences).",
+    "3. Randomly decide whether to include more personal anecdotes or more objective analysis.",
+    "4. Randomly vary paragraph lengths throughout the document - mix very short (1-2 sentences) with medium and longer paragraphs.",
+    "5. Randomly select different transition phrases between sections and ideas - never use the same transitions in different statements.",
+    "6. IMPORTANT: Create a completely different 'feel' for each statement - if one is enthusiastic and personal, make another more measured and analytical."
+]
+
+FINAL_REMINDER = [
+    "\n## FINAL CRITICAL REMINDER",
+    "NEVER use the exact same phrases, sentence structures, or paragraph organization between different statements. Each statement must feel like it was written by a completely different student with their own unique voice, style, and approach.",
+    "REMEMBER: Markers will immediately recognize template language. Your goal is to make each statement feel genuinely original while maintaining Band 6 quality."
+]
+
+
+# Persona traits, mirroring the variety instructions. Section-parallel generation picks
+# one option per trait up front so that separately generated sections share one voice.
+PERSONA_TRAITS = [
+    ("Confidence", ["very confident", "somewhat tentative", "balanced and matter-of-fact"]),
+    ("Writing style", ["more technical", "more emotional", "more analytical"]),
+    ("Sentence patterns", ["short, punchy sentences", "longer, complex sentences",
+                           "the occasional rhetorical question", "lots of concrete examples"]),
+    ("Vocabulary", ["simple", "advanced", "field-specific"]),
+    ("Emotional tone", ["enthusiastic", "analytical", "reflective"]),
+    ("Preferred evidence", ["statistics", "personal observations", "industry trends"]),
+]
+
+
+def slot(name):
+    """Return the marker for a named slot in a compiled prompt template."""
+    return f"\x00{name}\x00"
+
+
+_SLOT_PATTERN = re.compile(r'\x00(\w+)\x00')
+
+
+class PromptTemplate:
+    """A prompt compiled once into static text segments and named slots.
+
+    Rendering only joins the precompiled segments with the per-student values,
+    and everything before the first slot is byte-identical for every student.
+    """
+
+    def __init__(self, text):
+        """Compile a template.
+
+        Args:
+            text (str): Template text containing slot() markers
+        """
+        pieces = _SLOT_PATTERN.split(text)
+        self.literals = tuple(pieces[0::2])
+        self.slots = tuple(pieces[1::2])
+        #: Estimated tokens of all the static text
+        self.static_tokens = sum(estimate_static_tokens(literal) for literal in self.literals)
+
+    @property
+    def static_prefix(self):
+        """The text before the first slot, shared by every rendered prompt."""
+        return self.literals[0]
+
+    def render(self, **values):
+        """Fill the slots.
+
+        Args:
+            **values: Text for each slot name
+
+        Returns:
+            str: The rendered prompt
+        """
+        parts = [self.literals[0]]
+        for name, literal in zip(self.slots, self.literals[1:]):
+            parts.append(values[name])
+            parts.append(literal)
+        return ''.join(parts)
+
+
+_STYLE_GROUP_PATTERN = re.compile(r'^/\* RANDOMLY SELECT ONE OF THESE (.+?) \*/$')
+_STYLE_PATTERN = re.compile(r'^STYLE (\d+): ')
+
+
+def _parse_section_styles(body):
+    """Split a section body into plain lines and groups of STYLE variants.
+
+    Returns:
+        list: Plain template lines (str) and style groups
+            ({'label': ..., 'variants': (...)}) in template order
+    """
+    blocks = []
+    for line in body:
+        group = _STYLE_GROUP_PATTERN.match(line)
+        if group:
+            blocks.append({'label': group.group(1).capitalize(), 'variants': []})
+        elif _STYLE_PATTERN.match(line) and blocks and isinstance(blocks[-1], dict):
+            blocks[-1]['variants'].append(_STYLE_PATTERN.sub('', line, count=1))
+        else:
+            blocks.append(line)
+    for block in blocks:
+        if isinstance(block, dict):
+            block['variants'] = tuple(block['variants'])
+    return blocks
+
+
+# Section number -> template blocks, with each STYLE 1..N choice parsed into a group
+SECTION_BLOCKS = {number: _parse_section_styles(body) for number, _, body in SECTION_TEMPLATES}
+
+
+def _style_slot(number, group):
+    return f"style_{number.replace('.', '_')}_{group}"
+
+
+# (section number, slot name, variants) for every style group, in template order
+STYLE_GROUPS = tuple(
+    (number, _style_slot(number, group_index), block['variants'])
+    for number, blocks in SECTION_BLOCKS.items()
+    for group_index, block in enumerate(b for b in blocks if isinstance(b, dict))
+)
+
+
+def choose_styles(student_responses=None, seed=None):
+    """Pick one STYLE variant for every style group of every section.
+
+    The choice is drawn from a SHA-256 stream of the seed, so the same seed always
+    gives the same selection.
+
+    Args:
+        student_responses (dict, optional): Responses the default seed is derived from
+        seed (int, optional): Seed for the choice, for reproducible runs. Defaults to
+            a seed derived from the project title, so a student always gets the same styles.
+
+    Returns:
+        dict: Section number -> list of chosen STYLE numbers (1-based), one per group
+    """
+    if seed is None:
+        seed = persona_seed(student_responses or {})
+    stream = b''
+    counter = 0
+    while len(stream) < len(STYLE_GROUPS):
+        stream += hashlib.sha256(f"styles:{seed}:{counter}".encode('utf-8')).digest()
+        counter += 1
+    selection = {}
+    for byte, (number, _, variants) in zip(stream, STYLE_GROUPS):
+        selection.setdefault(number, []).append(byte % len(variants) + 1)
+    return selection
+
+
+# Comment a generated statement starts with, recording how it was generated
+STATEMENT_HEADER_PREFIX = '<!-- statement-of-intent '
+STATEMENT_HEADER_SUFFIX = ' -->'
+
+
+def statement_header(student_responses, selection=None, seed=None):
+    """Return the header comment written at the top of a generated statement.
+
+    The comment records the seed and the chosen styles, so the persona and the
+    paragraph variants of a statement can be reproduced from the file alone
+    (``choose_styles(seed=...)``, ``choose_persona(..., seed=...)``). Markdown
+    renderers don't show it.
+
+    Args:
+        student_responses (dict): Responses the statement was generated from
+        selection (dict, optional): Style selection used. Defaults to choose_styles().
+        seed (int, optional): Seed used. Defaults to persona_seed(student_responses).
+
+    Returns:
+        str: The header line followed by a blank line
+    """
+    if seed is None:
+        seed = persona_seed(student_responses)
+    if selection is None:
+        selection = choose_styles(student_responses, seed)
+    metadata = json.dumps({'seed': seed, 'styles': selection}, sort_keys=True,
+                          separators=(',', ':'))
+    return f"{STATEMENT_HEADER_PREFIX}{metadata}{STATEMENT_HEADER_SUFFIX}\n\n"
+
+
+def read_statement_header(text):
+    """Split a generated statement into its header metadata and its body.
 
-        "\n## 1.8 Opportunities",
-        "When '[Project Title - *From `q1`*]' is done, it'll be a really important part of my portfolio. It'll show off my advanced skills in [2-3 key skill areas demonstrated - *Use `q28` and other relevant skill mentions. E.g., 'making interactive games,' 'full-stack web development,' 'tricky 2D/3D animation,' 'making good user interfaces'*]. This big project will be super helpful for applying to college or jobs in [relevant industry/field - *Use `q8` and `q28`. E.g., 'digital media,' 'game development'*]. Plus, I'll get good at [valuable process learned - e.g., 'managing a big creative project from start to finish,' 'using feedback to make it better,' 'solving tough tech problems when things get stressful'], which will be really useful later on. (Adapt language)."
+    Returns:
+        tuple: (metadata dict with 'seed' and 'styles', or None; the statement text
+            without the header)
+    """
+    first_line, _, rest = text.partition('\n')
+    first_line = first_line.strip()
+    if not (first_line.startswith(STATEMENT_HEADER_PREFIX)
+            and first_line.endswith(STATEMENT_HEADER_SUFFIX)):
+        return None, text
+    try:
+        metadata = json.loads(first_line[len(STATEMENT_HEADER_PREFIX):-len(STATEMENT_HEADER_SUFFIX)])
+    except ValueError:
+        return None, text
+    return metadata, rest.lstrip('\n')
+
+
+def _style_values(selection):
+    """Return the slot values for a style selection."""
+    values = {}
+    positions = {}
+    for number, slot_name, variants in STYLE_GROUPS:
+        index = positions.get(number, 0)
+        positions[number] = index + 1
+        styles = selection.get(number, ())
+        values[slot_name] = variants[(styles[index] if index < len(styles) else 1) - 1]
+    return values
+
+
+def _section_lines(sections=None):
+    """Return the template lines for the requested sections (all by default).
+
+    Each style group becomes a single slot that is filled with the chosen variant.
+    """
+    lines = []
+    for number, heading, _ in SECTION_TEMPLATES:
+        if sections is not None and number not in sections:
+            continue
+        lines.append(heading)
+        group_index = 0
+        for block in SECTION_BLOCKS[number]:
+            if isinstance(block, dict):
+                lines.append(slot(_style_slot(number, group_index)))
+                group_index += 1
+            else:
+                lines.append(block.replace(Q4_SLOT, slot('q4')))
+    return lines
+
+
+def _compile_prompt_template():
+    prompt_parts = list(INSTRUCTION_PARTS)
+    prompt_parts += [
+        RESPONSES_HEADING,
+        slot('responses'),
+        TEMPLATE_HEADING,
+        TITLE_TEMPLATE,
     ]
+    prompt_parts += _section_lines()
+    prompt_parts += VARIETY_INSTRUCTIONS
+    prompt_parts += RANDOMIZATION_INSTRUCTIONS
+    prompt_parts += FINAL_REMINDER
+    return PromptTemplate("\n".join(prompt_parts))
+
 
-    # Add variety instructions at the end
-    variety_instructions = [
-        "\n## CRITICAL VARIETY INSTRUCTIONS",
-        "To ensure each Statement of Intent feels like original student work:",
-        "1. **REQUIRED: For each section, RANDOMLY SELECT ONE of the provided style options (STYLE 1, STYLE 2, etc.).** Do not use the same style for all sections. Mix them up to create a unique document.",
-        "2. **REQUIRED: Create a unique student persona** for each statement. Give them distinctive traits like:",
-        "   - A specific confidence level (very confident, somewhat tentative, balanced)",
-        "   - A distinctive writing style (more technical, more emotional, more analytical)",
-        "   - Unique speech patterns (short sentences, complex sentences, use of questions, use of examples)",
-        "   - Different vocabulary preferences (simple, advanced, field-specific)",
-        "3. **REQUIRED: Vary paragraph structures** - Some students use topic sentences followed by details, others build to their main point, others use compare/contrast structures.",
-        "4. **REQUIRED: Include at least one authentic personal element** - a brief anecdote, a specific example from their experience, or a unique perspective.",
-        "5. **REQUIRED: Adjust language based on project type** - use different vocabulary and tone for games vs. educational tools vs. websites.",
-        "6. **REQUIRED: Include occasional 'authentic variations'** - some minor repetition of key points, varying levels of formality between sections, or natural transitions.",
-        "7. **REQUIRED: Vary formatting approaches** - some students might use more bullet points, others more paragraphs, some more headings.",
-        "8. **REQUIRED: Use different evidence types** - some students might cite statistics, others personal observations, others industry trends.",
-        "9. **REQUIRED: Create different emotional tones** - some students more enthusiastic, others more analytical, others more reflective.",
-        "10. **CRITICAL: REMOVE ALL STYLE MARKERS like 'STYLE 1:', 'STYLE 2:' etc. from your final output. These are just selection guides for you.**",
-        "11. **CRITICAL: DO NOT use phrases like 'This project is mostly happening because...' or any other template phrases verbatim. Rewrite them in your own unique style.**"
+def _compile_section_template(number):
+    heading = section_heading(number)
+    prompt_parts = list(INSTRUCTION_PARTS)
+    prompt_parts += [
+        "\n## Student Persona (use this exact voice; other sections are written separately in the same voice)",
+        slot('persona'),
+        RESPONSES_HEADING,
+        slot('responses'),
+        f"\n## Section {number} Template (to be populated, elevated, and styled by AI)",
     ]
-    
-    # Add randomization instructions
-    randomization_instructions = [
-        "\n## RANDOMIZATION REQUIREMENTS",
-        "To create truly unique statements, you MUST use randomization in your approach:",
-        "1. For EACH SECTION, randomly select ONE of the provided style options (STYLE 1, STYLE 2, etc.).",
-        "2. Randomly determine the student's overall voice characteristics (confidence level, formality, sentence structure preferences).",
-        "3. Randomly decide whether to include more personal anecdotes or more objective analysis.",
-        "4. Randomly vary paragraph lengths throughout the document - mix very short (1-2 sentences) with medium and longer paragraphs.",
-        "5. Randomly select different transition phrases between sections and ideas - never use the same transitions in different statements.",
-        "6. IMPORTANT: Create a completely different 'feel' for each statement - if one is enthusiastic and personal, make another more measured and analytical."
+    prompt_parts += _section_lines([number])
+    prompt_parts += [
+        "\n## SECTION OUTPUT RULES",
+        f"1. Write ONLY section {number}. Start your output with the exact heading line `{heading}`.",
+        "2. Do NOT write the document title or any other section.",
+        "3. Use the paragraph templates above for content and structure, written in the persona's voice.",
+        "4. Do NOT copy template instructions (text in square brackets or between asterisks) into your output.",
+        "5. Do NOT use template phrases verbatim - rewrite them in the student's own voice.",
     ]
+    return PromptTemplate("\n".join(prompt_parts))
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_prompt_template(number=None):
+    """Return a compiled prompt template, compiling it on first use.
+
+    Args:
+        number (str, optional): Section number for a section prompt template.
+            Defaults to the whole-statement template.
+
+    Returns:
+        PromptTemplate: The compiled template
+    """
+    template = _templates.get(number)
+    if template is None:
+        with _templates_lock:
+            template = _templates.get(number)
+            if template is None:
+                if number is None:
+                    template = _compile_prompt_template()
+                else:
+                    template = _compile_section_template(number)
+                _templates[number] = template
+    return template
+
+
+def generate_prompt(student_responses, selection=None, seed=None, token_budget=None,
+                    stats=None):
+    """
+    Generate a prompt for the Gemini API following the NESA Statement of Intent structure,
+    with enhanced instructions to ensure Band 6 quality, a "community college student" voice,
+    and Australian spelling.
     
-    # Add the variety and randomization instructions to the prompt
-    prompt_parts.extend(variety_instructions)
-    prompt_parts.extend(randomization_instructions)
-    
-    # Add final reminder to avoid template language
-    prompt_parts.append("\n## FINAL CRITICAL REMINDER")
-    prompt_parts.append("NEVER use the exact same phrases, sentence structures, or paragraph organization between different statements. Each statement must feel like it was written by a completely different student with their own unique voice, style, and approach.")
-    prompt_parts.append("REMEMBER: Markers will immediately recognize template language. Your goal is to make each statement feel genuinely original while maintaining Band 6 quality.")
+    Only one STYLE variant per paragraph is sent; record the selection (see
+    choose_styles) alongside the output to reproduce a prompt. If the prompt would
+    exceed the token budget, the responses are trimmed (see token_budget.fit_responses).
     
-    return "\n".join(prompt_parts)
+    Args:
+        student_responses (dict): Student responses
+        selection (dict, optional): Style selection from choose_styles()
+        seed (int, optional): Seed for choose_styles() if no selection is given
+        token_budget (int, optional): Maximum estimated input tokens. Defaults to
+            get_token_budget().
+        stats (dict, optional): Filled with 'input_tokens' (estimated) and 'trimmed'
+            (the trimming steps applied)
+    """
+    selection = selection or choose_styles(student_responses, seed)
+    return _render_prompt(get_prompt_template(), student_responses, _style_values(selection),
+                          REFERENCED_QUESTIONS, token_budget, stats)
+
+
+def _render_prompt(template, student_responses, values, question_ids, token_budget, stats):
+    """Render a compiled prompt, fitting the responses slot into the token budget.
+
+    The q4 answer quoted in the instructions is trimmed along with the responses.
+    """
+    values = dict(values, q4=str(student_responses.get('q4', '')))
+    inline = ('q4',) if 'q4' in template.slots else ()
+    fixed_tokens = template.static_tokens
+    for name in template.slots:
+        if name.startswith('style_'):
+            fixed_tokens += estimate_static_tokens(values[name])
+        elif name not in ('responses',) + inline:
+            fixed_tokens += estimate_tokens(values[name])
+    budget = token_budget if token_budget is not None else get_token_budget()
+    responses, response_tokens, trimmed = fit_responses(student_responses, fixed_tokens,
+                                                        budget, question_ids,
+                                                        count=stats is not None,
+                                                        inline=inline)
+    if inline and trimmed:
+        values['q4'] = str(json.loads(responses).get('q4', ''))
+    if stats is not None:
+        stats['input_tokens'] = fixed_tokens + response_tokens
+        stats['trimmed'] = trimmed
+    return template.render(responses=responses, **values)
+
+
+def section_numbers():
+    """Return the section numbers of the statement in document order."""
+    return [number for number, _, _ in SECTION_TEMPLATES]
+
+
+def section_heading(number):
+    """Return the markdown heading line for a section number, e.g. '## 1.1 Introduction: ...'."""
+    for section_number, heading, _ in SECTION_TEMPLATES:
+        if section_number == number:
+            return heading.strip()
+    raise KeyError(f"Unknown section: {number}")
+
+
+# Questions every section needs for context: the project title and product type
+CONTEXT_QUESTIONS = ('q1', 'q2')
+
+
+def _question_order(question_id):
+    return int(question_id[1:])
+
+
+def _build_section_questions():
+    """Map each section to the question ids its template refers to, plus the context questions."""
+    section_questions = {}
+    for number, heading, body in SECTION_TEMPLATES:
+        referenced = set(re.findall(r'\bq\d+\b', ' '.join([heading] + body)))
+        referenced.update(CONTEXT_QUESTIONS)
+        section_questions[number] = tuple(sorted(referenced, key=_question_order))
+    return section_questions
+
+
+# Section number -> question ids the section depends on
+SECTION_QUESTIONS = _build_section_questions()
+
+# Every question the whole-statement template refers to
+REFERENCED_QUESTIONS = frozenset(qid for qids in SECTION_QUESTIONS.values() for qid in qids)
+
+
+def sections_for_questions(question_ids):
+    """Return the sections (in document order) that depend on any of the given questions."""
+    question_ids = set(question_ids)
+    return [number for number in section_numbers()
+            if question_ids.intersection(SECTION_QUESTIONS[number])]
+
+
+def section_responses(student_responses, number):
+    """Return only the responses a section depends on."""
+    return {qid: student_responses[qid] for qid in SECTION_QUESTIONS[number]
+            if qid in student_responses}
+
+
+def section_fingerprint(student_responses, number, persona, selection=None):
+    """Hash everything that goes into a section's prompt.
+
+    Two fingerprints match only if the section's template, its chosen styles, its
+    responses and the persona are unchanged, so an unchanged section never needs
+    regenerating.
+    """
+    selection = selection or choose_styles(student_responses)
+    template = next(body for n, _, body in SECTION_TEMPLATES if n == number)
+    payload = json.dumps({
+        'section': number,
+        'template': template,
+        'styles': selection.get(number, []),
+        'responses': section_responses(student_responses, number),
+        'persona': persona,
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def persona_seed(student_responses):
+    """Derive a stable persona seed from the project title."""
+    title = str(student_responses.get('q1', '')).strip().lower()
+    return int.from_bytes(hashlib.sha256(title.encode('utf-8')).digest()[:8], 'big')
+
+
+def choose_persona(student_responses, seed=None):
+    """Pick one option per persona trait.
+
+    Args:
+        student_responses (dict): Student responses
+        seed (int, optional): Seed for the choice. Defaults to persona_seed(student_responses).
+
+    Returns:
+        dict: Trait name -> chosen option
+    """
+    rng = random.Random(persona_seed(student_responses) if seed is None else seed)
+    return {trait: rng.choice(options) for trait, options in PERSONA_TRAITS}
+
+
+def generate_section_prompts(student_responses, persona=None, sections=None, selection=None,
+                             token_budget=None):
+    """Generate one prompt per statement section for section-parallel generation.
+
+    Each prompt carries the shared instructions, a fixed student persona and only
+    the responses that section depends on (see SECTION_QUESTIONS), so sections
+    generated independently read as one document and an answer change only
+    affects the prompts of the sections that use it.
+
+    Args:
+        student_responses (dict): Student responses
+        persona (dict, optional): Persona from choose_persona(). Chosen from the
+            responses if not given.
+        sections (list, optional): Section numbers to build prompts for. Defaults to all.
+        selection (dict, optional): Style selection from choose_styles()
+        token_budget (int, optional): Maximum estimated input tokens per prompt
+
+    Returns:
+        list: Dicts with 'number', 'heading', 'prompt', 'input_tokens' and
+            'trimmed', in document order
+    """
+    persona = persona or choose_persona(student_responses)
+    style_values = _style_values(selection or choose_styles(student_responses))
+    persona_lines = "\n".join(f"- {trait}: {option}" for trait, option in persona.items())
+
+    prompts = []
+    for number in section_numbers():
+        if sections is not None and number not in sections:
+            continue
+        prompt_stats = {}
+        prompt = _render_prompt(
+            get_prompt_template(number),
+            section_responses(student_responses, number),
+            dict(style_values, persona=persona_lines),
+            SECTION_QUESTIONS[number], token_budget, prompt_stats
+        )
+        prompts.append({
+            'number': number,
+            'heading': section_heading(number),
+            'prompt': prompt,
+            'input_tokens': prompt_stats['input_tokens'],
+            'trimmed': prompt_stats['trimmed'],
+        })
+    return prompts
+
 
 # --- Student Responses (This will be loaded from student_responses.json in your app) ---
 # For local testing, we'll keep the problematic responses to show the enhancement effect.
@@ -8,16 +8,18 @@ document based on student responses.
 import json
 from pathlib import Path
 
-def load_schema(schema_file='statement_intent_schema.json'):
-    """Load the JSON schema file."""
+from app.app_config import STATEMENT_SCHEMA
+from app.utils.schema_registry import get_schema
+
+def load_schema(schema_file=None):
+    """Load the JSON schema file (app_config.STATEMENT_SCHEMA by default)."""
     try:
-        with open(schema_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return get_schema(schema_file)
     except FileNotFoundError:
-        print(f"Error: Schema file '{schema_file}' not found.")
+        print(f"Error: Schema file '{schema_file or STATEMENT_SCHEMA}' not found.")
         exit(1)
     except json.JSONDecodeError:
-        print(f"Error: Invalid JSON in schema file '{schema_file}'.")
+        print(f"Error: Invalid JSON in schema file '{schema_file or STATEMENT_SCHEMA}'.")
         exit(1)
 
 def generate_prompt(student_responses):
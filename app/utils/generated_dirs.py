@@ -0,0 +1,46 @@
+"""
+Housekeeping for the generated statements tree.
+
+Older versions of the questionnaire created ``GENERATED_DIR/<student_id>`` every
+time it started, so browsing or loading responses left an empty timestamped
+directory behind. ``sweep_empty_dirs`` removes those leftovers.
+"""
+
+import os
+from pathlib import Path
+
+from app.app_config import GENERATED_DIR
+
+
+def sweep_empty_dirs(root=None, dry_run=False):
+    """Remove the empty directories below the generated statements directory.
+
+    Directories that only contain empty directories are removed too. The root
+    itself is always kept.
+
+    Args:
+        root (Path, optional): Directory to sweep. Defaults to GENERATED_DIR.
+        dry_run (bool): Only report what would be removed
+
+    Returns:
+        list: Paths of the directories removed (or that would be removed)
+    """
+    root = Path(root) if root else GENERATED_DIR
+    removed = []
+    removed_names = set()
+    # Walk bottom-up so a directory whose subdirectories were all empty is empty too
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        path = Path(dirpath)
+        if path == root or filenames:
+            continue
+        if any(os.path.join(dirpath, name) not in removed_names for name in dirnames):
+            continue
+        if not dry_run:
+            try:
+                path.rmdir()
+            except OSError:
+                # Something was written into it meanwhile
+                continue
+        removed.append(path)
+        removed_names.add(dirpath)
+    return removed
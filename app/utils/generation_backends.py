@@ -0,0 +1,294 @@
+"""
+Pluggable generation backends.
+
+``gemini_utils`` dispatches every model call through a ``GenerationBackend`` so the
+generation pipeline can run against Google Gemini or, for benchmarks and tests on an
+offline machine, a deterministic local mock.
+
+Select the backend with the ``PORTFOLIO_BACKEND`` setting (``gemini`` or
+``mock``, from the environment or .env) or with ``set_backend()``.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+
+from app.settings import get_settings
+
+
+class GenerationBackend:
+    """Interface every generation backend implements."""
+
+    #: Short name used for cache keys, circuit breakers and model state
+    name = 'base'
+    #: Whether configure() needs an API key
+    requires_api_key = False
+
+    def configure(self, api_key=None, force=False):
+        """Prepare the backend for use. Repeated calls should be cheap."""
+
+    def generate(self, model_name, prompt_text, generation_config=None):
+        """Generate the complete text for a prompt.
+
+        Args:
+            model_name (str): Model to use
+            prompt_text (str): The prompt
+            generation_config (dict, optional): Generation parameters
+
+        Returns:
+            str: Generated text
+        """
+        raise NotImplementedError
+
+    def stream(self, model_name, prompt_text, generation_config=None):
+        """Generate text for a prompt as an iterator of text chunks."""
+        raise NotImplementedError
+
+    def list_models(self):
+        """Return the names of the models this backend can serve."""
+        raise NotImplementedError
+
+
+class GeminiBackend(GenerationBackend):
+    """Google Gemini via the google-generativeai package."""
+
+    name = 'gemini'
+    requires_api_key = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured_key = None
+        self._models = {}
+        self._genai = None
+
+    @property
+    def genai(self):
+        """The google.generativeai module, imported on first use."""
+        if self._genai is None:
+            import google.generativeai as genai
+            self._genai = genai
+        return self._genai
+
+    def configure(self, api_key=None, force=False):
+        """Configure the API once per key.
+
+        Args:
+            api_key (str): Gemini API key
+            force (bool): Reconfigure even if already configured with this key
+        """
+        with self._lock:
+            if api_key == self._configured_key and not force:
+                return
+            print(f"Configuring Gemini API with key: {api_key[:5]}...{api_key[-4:]}")
+            self.genai.configure(api_key=api_key)
+            self._configured_key = api_key
+            # Model handles are bound to the previous configuration
+            self._models.clear()
+
+    def get_model(self, model_name):
+        """Return a reusable GenerativeModel handle for a model name."""
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self.genai.GenerativeModel(model_name)
+                self._models[model_name] = model
+            return model
+
+    def generate(self, model_name, prompt_text, generation_config=None):
+        model = self.get_model(model_name)
+        if generation_config:
+            response = model.generate_content(prompt_text, generation_config=generation_config)
+        else:
+            response = model.generate_content(prompt_text)
+        return response.text
+
+    def stream(self, model_name, prompt_text, generation_config=None):
+        model = self.get_model(model_name)
+        if generation_config:
+            response = model.generate_content(prompt_text, stream=True,
+                                              generation_config=generation_config)
+        else:
+            response = model.generate_content(prompt_text, stream=True)
+        for chunk in response:
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text (e.g. safety metadata only) are skipped
+                continue
+            if text:
+                yield text
+
+    def list_models(self):
+        return [model.name for model in self.genai.list_models()]
+
+
+class MockApiError(Exception):
+    """Error raised by the mock backend, carrying an HTTP-style status code."""
+
+    def __init__(self, code, message):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+
+class MockBackend(GenerationBackend):
+    """Deterministic offline backend with configurable latency, token rate and errors.
+
+    The generated text depends only on the prompt and model name: it reproduces the
+    ``#``/``##`` headings found in the prompt followed by filler paragraphs, so
+    downstream code that parses sections behaves as it would with real output.
+    """
+
+    name = 'mock'
+
+    DEFAULT_MODELS = [
+        'models/gemini-2.5-flash-preview-05-20',
+        'models/gemini-1.5-flash',
+        'models/gemini-1.5-pro',
+        'models/gemini-pro',
+    ]
+
+    _WORDS = (
+        "project design audience interactive animation prototype testing feedback "
+        "skills timeline users visual sound code research industry portfolio "
+        "develop build explore create improve plan review folio experience"
+    ).split()
+
+    def __init__(self, latency=0.5, tokens_per_second=200.0, error_rate=0.0,
+                 error_code=503, failing_models=None, models=None, seed=0,
+                 words_per_section=60, model_latencies=None, fail_after_chunks=None):
+        """Initialise the mock.
+
+        Args:
+            latency (float): Seconds before the first token
+            tokens_per_second (float): Output rate after the first token (0 = instant)
+            error_rate (float): Probability (0-1) that a call raises MockApiError
+            error_code (int): Status code of injected errors (503 and 429 are retried)
+            failing_models (list, optional): Models that always fail with a 404
+            models (list, optional): Names returned by list_models()
+            seed (int): Seed for error injection
+            words_per_section (int): Filler words generated under each heading
+            model_latencies (dict, optional): Per-model overrides of ``latency``,
+                e.g. to simulate a slow preferred model
+            fail_after_chunks (int, optional): Streams raise MockApiError (with
+                ``error_code``) after this many chunks, to simulate a dropped connection
+        """
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.failing_models = set(failing_models or [])
+        self.models = list(models or self.DEFAULT_MODELS)
+        self.words_per_section = words_per_section
+        self.model_latencies = {
+            name.split('/')[-1]: value for name, value in (model_latencies or {}).items()
+        }
+        self.fail_after_chunks = fail_after_chunks
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _check_call(self, model_name):
+        with self._lock:
+            self.calls += 1
+            inject_error = self.error_rate and self._rng.random() < self.error_rate
+        short_name = model_name.split('/')[-1]
+        if any(short_name == m.split('/')[-1] for m in self.failing_models):
+            raise MockApiError(404, f"Model {model_name} is not available")
+        if inject_error:
+            raise MockApiError(self.error_code, "Injected mock error")
+
+    def render(self, model_name, prompt_text):
+        """Return the deterministic text for a prompt."""
+        digest = hashlib.sha256(f"{model_name}\n{prompt_text}".encode('utf-8')).digest()
+        rng = random.Random(digest)
+        headings = [line.strip() for line in prompt_text.splitlines()
+                    if re.match(r'^#{1,2} (Statement of Intent|\d+\.\d+ )', line.strip())]
+        if not headings:
+            headings = ["# Generated Text"]
+        sections = []
+        for heading in headings:
+            words = [rng.choice(self._WORDS) for _ in range(self.words_per_section)]
+            sections.append(f"{heading}\n\n{' '.join(words).capitalize()}.")
+        return "\n\n".join(sections) + "\n"
+
+    def _latency_for(self, model_name):
+        return self.model_latencies.get(model_name.split('/')[-1], self.latency)
+
+    def _tokens(self, text):
+        return re.findall(r'\S+\s*|\s+', text)
+
+    def generate(self, model_name, prompt_text, generation_config=None):
+        self._check_call(model_name)
+        text = self.render(model_name, prompt_text)
+        delay = self._latency_for(model_name)
+        if self.tokens_per_second:
+            delay += len(self._tokens(text)) / self.tokens_per_second
+        time.sleep(delay)
+        return text
+
+    def stream(self, model_name, prompt_text, generation_config=None):
+        self._check_call(model_name)
+        text = self.render(model_name, prompt_text)
+        time.sleep(self._latency_for(model_name))
+        tokens = self._tokens(text)
+        # Emit a handful of tokens per chunk like the real API does
+        chunk_size = 8
+        for count, i in enumerate(range(0, len(tokens), chunk_size)):
+            if self.fail_after_chunks is not None and count >= self.fail_after_chunks:
+                raise MockApiError(self.error_code, "Injected mock error mid-stream")
+            chunk = tokens[i:i + chunk_size]
+            if i and self.tokens_per_second:
+                time.sleep(len(chunk) / self.tokens_per_second)
+            yield ''.join(chunk)
+
+    def list_models(self):
+        return list(self.models)
+
+
+def mock_backend_from_env():
+    """Build a MockBackend from the PORTFOLIO_MOCK_* settings."""
+    return MockBackend(**get_settings().mock_backend)
+
+
+_BACKEND_FACTORIES = {
+    'gemini': GeminiBackend,
+    'mock': mock_backend_from_env,
+}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide generation backend, creating it on first use."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            # Settings load .env, so a PORTFOLIO_BACKEND set there is honoured
+            name = get_settings().generation_backend or 'gemini'
+            if name not in _BACKEND_FACTORIES:
+                raise ValueError(
+                    f"Unknown PORTFOLIO_BACKEND '{name}'. "
+                    f"Choose one of: {', '.join(sorted(_BACKEND_FACTORIES))}"
+                )
+            _backend = _BACKEND_FACTORIES[name]()
+        return _backend
+
+
+def set_backend(backend):
+    """Replace the process-wide generation backend.
+
+    Args:
+        backend (GenerationBackend or str): Backend instance, or 'gemini' / 'mock'
+
+    Returns:
+        GenerationBackend: The backend now in use
+    """
+    global _backend
+    if isinstance(backend, str):
+        backend = _BACKEND_FACTORIES[backend]()
+    with _backend_lock:
+        _backend = backend
+    return backend
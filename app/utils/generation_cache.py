@@ -0,0 +1,182 @@
+"""
+Content-addressed on-disk cache for Gemini generations.
+
+Entries are keyed by a hash of the prompt text, the resolved model name and the
+generation parameters, so re-sending an identical prompt (for example when a
+student re-runs "Save and generate" without editing anything) is served from disk
+instead of paying for another model call.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.app_config import CACHE_DIR
+
+GENERATION_CACHE_DIR = CACHE_DIR / 'generations'
+
+# Eviction defaults
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # 50 MB
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60   # 30 days
+
+# Setting this environment variable to a truthy value bypasses the cache everywhere
+CACHE_DISABLE_ENV = 'PORTFOLIO_DISABLE_CACHE'
+
+
+def make_cache_key(prompt_text, model_name, params=None, backend='gemini'):
+    """Return the cache key for a prompt/model/parameters combination.
+
+    Args:
+        prompt_text (str): The prompt sent to the model
+        model_name (str): Resolved model name
+        params (dict, optional): Generation parameters (temperature, etc.)
+        backend (str): Name of the generation backend serving the model
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps(
+        {'prompt': prompt_text, 'model': model_name, 'params': params or {},
+         'backend': backend},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def cache_disabled_by_env():
+    """Check whether the cache has been switched off via the environment."""
+    return os.getenv(CACHE_DISABLE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class GenerationCache:
+    """Persistent cache of generated text with size and age based eviction."""
+
+    def __init__(self, cache_dir=None, max_entries=DEFAULT_MAX_ENTRIES,
+                 max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        """Initialise the cache.
+
+        Args:
+            cache_dir (Path, optional): Directory for cache entries
+            max_entries (int): Maximum number of entries kept on disk
+            max_bytes (int): Maximum total size of the entries in bytes
+            max_age (float): Maximum entry age in seconds
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else GENERATION_CACHE_DIR
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _entry_path(self, key):
+        return self.cache_dir / f'{key}.json'
+
+    def get(self, key):
+        """Return the cached text for a key, or None on a miss."""
+        path = self._entry_path(key)
+        try:
+            age = time.time() - path.stat().st_mtime
+            if age > self.max_age:
+                path.unlink()
+                with self._lock:
+                    self.misses += 1
+                    self.evictions += 1
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                text = json.load(f)['text']
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text, model_name=None):
+        """Store generated text under a key and evict old entries if needed."""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(f'.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'model': model_name, 'created': time.time(), 'text': text}, f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.writes += 1
+        self.evict()
+
+    def evict(self):
+        """Remove expired entries, then the oldest ones until within the size limits.
+
+        Returns:
+            int: Number of entries removed
+        """
+        try:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.json'):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        entries.sort()  # oldest first
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, path in entries:
+            over_limits = (len(entries) - removed > self.max_entries
+                           or total_bytes > self.max_bytes)
+            if now - mtime <= self.max_age and not over_limits:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed += 1
+            total_bytes -= size
+
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob('*.json'):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return the hit/miss counters as a dict."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+            }
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """Return the process-wide generation cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GenerationCache()
+        return _default_cache
@@ -0,0 +1,223 @@
+"""
+Hedged requests for tail latency.
+
+If the preferred model hasn't produced its first token within a threshold, a duplicate
+request is sent to a fallback model. Whichever request produces text first wins and
+the other is cancelled. A hedge budget caps how many requests may be duplicated, so
+hedging can't double the load on the API.
+"""
+
+import itertools
+import threading
+import time
+
+from app.utils.resilience import call_with_retry, get_circuit_breaker
+
+# Default seconds to wait for the preferred model's first token before hedging
+DEFAULT_HEDGE_AFTER = 8.0
+# At most this fraction of requests (plus a burst of one) may be hedged
+DEFAULT_MAX_HEDGE_RATIO = 0.2
+
+
+class RequestHedger:
+    """Hedge budget and win/loss counters shared by all hedged requests."""
+
+    def __init__(self, max_hedge_ratio=DEFAULT_MAX_HEDGE_RATIO, burst=1):
+        """Initialise the hedger.
+
+        Args:
+            max_hedge_ratio (float): Maximum fraction of requests that may be hedged
+            burst (int): Hedges allowed before the ratio applies
+        """
+        self.max_hedge_ratio = max_hedge_ratio
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_denied = 0
+        self.primary_wins = 0
+        self.hedge_wins = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def allow_hedge(self):
+        """Reserve a hedge if the budget allows one."""
+        with self._lock:
+            if self.hedges < self.burst + self.max_hedge_ratio * self.requests:
+                self.hedges += 1
+                return True
+            self.hedges_denied += 1
+            return False
+
+    def record_winner(self, hedged, hedge_won):
+        with self._lock:
+            if hedge_won:
+                self.hedge_wins += 1
+            elif hedged:
+                self.primary_wins += 1
+
+    def stats(self):
+        """Return the hedge counters as a dict."""
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges': self.hedges,
+                'hedges_denied': self.hedges_denied,
+                'primary_wins': self.primary_wins,
+                'hedge_wins': self.hedge_wins,
+            }
+
+
+class _Attempt(threading.Thread):
+    """Streams one request in the background and reports its first token."""
+
+    def __init__(self, label, backend, model_name, prompt_text, generation_config,
+                 condition, on_first_token, log=print):
+        super().__init__(name=f"hedge-{label}", daemon=True)
+        self.label = label
+        self.backend = backend
+        self.model_name = model_name
+        self.prompt_text = prompt_text
+        self.generation_config = generation_config
+        self.condition = condition
+        self.on_first_token = on_first_token
+        self.log = log
+        self.cancelled = threading.Event()
+        self.first_token_at = None
+        self.parts = []
+        self.error = None
+        self.finished = False
+        self.retry_stats = {}
+
+    def run(self):
+        def start_stream():
+            chunks = iter(self.backend.stream(self.model_name, self.prompt_text,
+                                              self.generation_config))
+            return next(chunks, None), chunks
+
+        try:
+            first_chunk, chunks = call_with_retry(
+                start_stream,
+                breaker=get_circuit_breaker(f"{self.backend.name}:{self.model_name}"),
+                stats=self.retry_stats,
+                log=self.log
+            )
+            if first_chunk is not None:
+                chunks = itertools.chain([first_chunk], chunks)
+            for text in chunks:
+                if self.cancelled.is_set():
+                    break
+                if self.first_token_at is None:
+                    self.first_token_at = time.perf_counter()
+                    self.on_first_token(self)
+                self.parts.append(text)
+        except Exception as e:
+            self.error = e
+        finally:
+            with self.condition:
+                self.finished = True
+                self.condition.notify_all()
+
+    @property
+    def text(self):
+        return ''.join(self.parts)
+
+
+def hedged_generate(backend, primary_model, hedge_model, prompt_text, generation_config=None,
+                    hedge_after=DEFAULT_HEDGE_AFTER, hedger=None, stats=None, log=print):
+    """Generate text, hedging to a second model if the first is slow to start.
+
+    Args:
+        backend (GenerationBackend): Backend serving both models
+        primary_model (str): Preferred model
+        hedge_model (str): Model the duplicate request is sent to
+        prompt_text (str): The prompt
+        generation_config (dict, optional): Generation parameters
+        hedge_after (float): Seconds to wait for the primary's first token
+        hedger (RequestHedger, optional): Budget and counters. Defaults to get_hedger().
+        stats (dict, optional): Filled with 'model', 'hedged', 'hedge_won' and retry counters
+        log (callable): Receives the hedging message. Defaults to print.
+
+    Returns:
+        str: Generated text from the winning request
+    """
+    hedger = hedger or get_hedger()
+    stats = stats if stats is not None else {}
+    hedger.record_request()
+
+    condition = threading.Condition()
+    state = {'winner': None}
+
+    def on_first_token(attempt):
+        with condition:
+            if state['winner'] is None:
+                state['winner'] = attempt
+            condition.notify_all()
+
+    primary = _Attempt('primary', backend, primary_model, prompt_text, generation_config,
+                       condition, on_first_token, log)
+    attempts = [primary]
+    primary.start()
+
+    with condition:
+        condition.wait_for(lambda: state['winner'] is not None or primary.finished,
+                           timeout=hedge_after)
+        primary_started = state['winner'] is not None or primary.finished
+
+    hedged = False
+    if not primary_started and hedge_model and hedge_model != primary_model:
+        if hedger.allow_hedge():
+            hedged = True
+            log(f"No response from {primary_model} after {hedge_after:.1f}s; "
+                f"hedging with {hedge_model}")
+            secondary = _Attempt('hedge', backend, hedge_model, prompt_text, generation_config,
+                                 condition, on_first_token, log)
+            attempts.append(secondary)
+            secondary.start()
+
+    with condition:
+        condition.wait_for(
+            lambda: state['winner'] is not None or all(a.finished for a in attempts)
+        )
+        winner = state['winner']
+
+    # Cancel the losing request; its thread stops at the next chunk
+    for attempt in attempts:
+        if attempt is not winner:
+            attempt.cancelled.set()
+
+    if winner is None:
+        # Nobody produced text: report the primary's error if it had one
+        errors = [a.error for a in attempts if a.error is not None]
+        if errors:
+            raise errors[0]
+        winner = primary
+    winner.join()
+
+    hedge_won = hedged and winner.label == 'hedge'
+    hedger.record_winner(hedged, hedge_won)
+    stats['model'] = winner.model_name
+    stats['hedged'] = hedged
+    stats['hedge_won'] = hedge_won
+    for attempt in attempts:
+        for key, value in attempt.retry_stats.items():
+            stats[key] = stats.get(key, 0) + value
+
+    if winner.error is not None:
+        raise winner.error
+    return winner.text
+
+
+_default_hedger = None
+_default_hedger_lock = threading.Lock()
+
+
+def get_hedger():
+    """Return the process-wide request hedger."""
+    global _default_hedger
+    with _default_hedger_lock:
+        if _default_hedger is None:
+            _default_hedger = RequestHedger()
+        return _default_hedger
@@ -0,0 +1,181 @@
+"""
+Migration between the flat and sharded storage layouts.
+
+The migration runs online: the new layout is recorded first, so anything saved
+while it runs already goes to the new place, and every reader accepts both
+layouts, so files that haven't been moved yet are still found. Files are moved
+with renames, one at a time; a file that already exists at the destination (a
+newer save made during the migration) is left where it is and reported.
+"""
+
+import os
+from pathlib import Path
+
+from app.app_config import (
+    GENERATED_DIR, LAYOUT_SHARDED, RESPONSES_DIR, get_storage_layout, iter_student_dirs,
+    layout_dirs, mark_sharded, set_storage_layout, student_generated_dir,
+    student_responses_dir
+)
+from app.utils.response_catalog import read_metadata
+
+
+def _new_result():
+    return {'responses_moved': 0, 'statements_moved': 0, 'skipped': [], 'conflicts': []}
+
+
+def _remove_empty_shards(root, layout, student_dirs=()):
+    """Remove shard directories left empty by the migration (deepest first).
+
+    Once a root migrated to the flat layout has no shards left its SHARD_MARKER
+    is removed too, so its one-character student directories aren't taken for
+    shards. student_dirs are the flat student directories, which don't count.
+    """
+    shards = [path for path in layout_dirs(root) if path != Path(root)]
+    for path in sorted(shards, key=lambda p: len(p.parts), reverse=True):
+        try:
+            path.rmdir()
+        except OSError:
+            pass  # not empty
+    student_dirs = set(student_dirs)
+    if layout != LAYOUT_SHARDED and not any(path.exists() and path not in student_dirs
+                                            for path in shards):
+        mark_sharded(root, False)
+
+
+def _move(source, destination, result, dry_run):
+    """Rename one file or directory unless the destination is taken."""
+    if destination.exists():
+        result['conflicts'].append(source)
+        return False
+    if not dry_run:
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.rename(source, destination)
+        except FileNotFoundError:
+            return False  # removed meanwhile
+    return True
+
+
+def migrate_responses(layout, root=None, dry_run=False, result=None):
+    """Move responses files into a layout.
+
+    Files without a student ID (the old flat format) can't be sharded and stay in
+    the root directory.
+
+    Args:
+        layout (str): Target layout
+        root (Path, optional): Responses root. Defaults to RESPONSES_DIR.
+        dry_run (bool): Only report what would be moved
+        result (dict, optional): Migration result to add to
+
+    Returns:
+        dict: 'responses_moved', 'statements_moved' (counts), 'skipped' and
+            'conflicts' (lists of paths)
+    """
+    root = Path(root) if root else RESPONSES_DIR
+    result = result if result is not None else _new_result()
+    if not dry_run and layout == LAYOUT_SHARDED:
+        mark_sharded(root)
+    for directory in layout_dirs(root):
+        for path in sorted(directory.glob('*.json')):
+            try:
+                entry = read_metadata(path)
+            except FileNotFoundError:
+                continue
+            if entry['student_id'] is None:
+                if directory != root:
+                    # Only files with a student ID are sharded, so this one goes back
+                    if _move(path, root / path.name, result, dry_run):
+                        result['responses_moved'] += 1
+                elif layout == LAYOUT_SHARDED:
+                    result['skipped'].append(path)
+                continue
+            destination = student_responses_dir(entry['student_id'], root, layout) / path.name
+            if destination != path and _move(path, destination, result, dry_run):
+                result['responses_moved'] += 1
+    if not dry_run:
+        _remove_empty_shards(root, layout)
+    return result
+
+
+def migrate_statements(layout, root=None, dry_run=False, result=None, students=None):
+    """Move student statement directories into a layout.
+
+    A student whose directory already exists at the destination has their files
+    moved across one by one.
+
+    Args:
+        layout (str): Target layout
+        root (Path, optional): Generated statements root. Defaults to GENERATED_DIR.
+        dry_run (bool): Only report what would be moved
+        result (dict, optional): Migration result to add to
+        students (list, optional): (student_id, path) pairs to move, listed before
+            the root was marked as sharded. Defaults to iter_student_dirs(root).
+
+    Returns:
+        dict: See migrate_responses
+    """
+    root = Path(root) if root else GENERATED_DIR
+    result = result if result is not None else _new_result()
+    # Listed first: once the root is marked, a flat student 'a' looks like a shard
+    students = sorted(iter_student_dirs(root)) if students is None else sorted(students)
+    if not dry_run and layout == LAYOUT_SHARDED:
+        mark_sharded(root)
+    for student_id, path in students:
+        path = Path(path)
+        destination = student_generated_dir(student_id, root, layout)
+        if destination == path:
+            continue
+        if path in destination.parents and not dry_run:
+            # A flat student 'a' whose shard is a/...: move it aside first
+            aside = path.with_name(f'.{path.name}.migrating')
+            os.rename(path, aside)
+            path = aside
+        if not destination.exists():
+            if _move(path, destination, result, dry_run):
+                result['statements_moved'] += 1
+            continue
+        # Both exist: a statement was generated in the new place during the migration
+        moved = [_move(child, destination / child.name, result, dry_run)
+                 for child in sorted(path.iterdir())]
+        if all(moved):
+            result['statements_moved'] += 1
+            if not dry_run:
+                try:
+                    path.rmdir()
+                except OSError:
+                    pass
+    if not dry_run:
+        _remove_empty_shards(root, layout, [student_generated_dir(student_id, root, layout)
+                                            for student_id, _ in students])
+    return result
+
+
+def migrate_layout(layout, responses_root=None, generated_root=None, dry_run=False):
+    """Switch the storage layout and move the existing files into it.
+
+    Args:
+        layout (str): LAYOUT_FLAT or LAYOUT_SHARDED
+        responses_root (Path, optional): Responses root. Defaults to RESPONSES_DIR.
+        generated_root (Path, optional): Generated statements root. Defaults to
+            GENERATED_DIR.
+        dry_run (bool): Only report what would be moved
+
+    Returns:
+        dict: 'layout', 'previous_layout', 'responses_moved', 'statements_moved',
+            'skipped' and 'conflicts'
+    """
+    previous = get_storage_layout()
+    students = sorted(iter_student_dirs(generated_root))
+    if not dry_run:
+        if LAYOUT_SHARDED in (layout, previous):
+            # Keep the shards readable until they have all been moved
+            for root in (responses_root or RESPONSES_DIR, generated_root or GENERATED_DIR):
+                mark_sharded(root)
+        # New saves go to the new layout from here on
+        set_storage_layout(layout)
+    result = _new_result()
+    result.update(layout=layout, previous_layout=previous)
+    migrate_responses(layout, responses_root, dry_run, result)
+    migrate_statements(layout, generated_root, dry_run, result, students)
+    return result
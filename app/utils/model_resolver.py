@@ -0,0 +1,178 @@
+"""
+Persisted model-resolution cache.
+
+Remembers which fallback model was picked from ``genai.list_models()`` and which
+models have recently failed, in a small JSON state file, so that once the preferred
+model is retired every generation doesn't pay for a failed call plus a model listing.
+
+The state file is shared by every process: it is re-read whenever another process
+has changed it, and a missing or corrupt file is treated as empty.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.app_config import CACHE_DIR
+
+MODEL_STATE_FILE = CACHE_DIR / 'model_state.json'
+
+# How long a resolved fallback model is trusted before list_models() is called again
+DEFAULT_RESOLUTION_TTL = 24 * 60 * 60  # 24 hours
+# How long a failing model is skipped before it is tried again
+DEFAULT_FAILURE_TTL = 60 * 60  # 1 hour
+
+
+class ModelResolver:
+    """Caches the resolved fallback model and recently failing models on disk."""
+
+    def __init__(self, state_file=None, resolution_ttl=DEFAULT_RESOLUTION_TTL,
+                 failure_ttl=DEFAULT_FAILURE_TTL):
+        """Initialise the resolver.
+
+        Args:
+            state_file (Path, optional): JSON file the state is persisted to
+            resolution_ttl (float): Seconds a resolved fallback model stays valid
+            failure_ttl (float): Seconds a failing model is skipped
+        """
+        self.state_file = Path(state_file) if state_file else MODEL_STATE_FILE
+        self.resolution_ttl = resolution_ttl
+        self.failure_ttl = failure_ttl
+        self._lock = threading.Lock()
+        self._state = None
+        self._signature = None
+
+    def _stat_signature(self):
+        # Every save replaces the file, so the inode changes even within one mtime tick
+        try:
+            st = self.state_file.stat()
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        """Return the state, re-reading the file if it changed since it was last read."""
+        signature = self._stat_signature()
+        if self._state is None or signature != self._signature:
+            try:
+                with open(self.state_file, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            if not isinstance(state, dict):
+                state = {}
+            for key in ('resolved', 'failed'):
+                if not isinstance(state.get(key), dict):
+                    state[key] = {}
+            self._state = state
+            self._signature = signature
+        return self._state
+
+    def _save(self):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        # A temporary file per process and thread, so concurrent saves don't collide
+        tmp_path = self.state_file.with_name(
+            f'.{self.state_file.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.state_file)
+        self._signature = self._stat_signature()
+
+    def is_failing(self, model_name):
+        """Check whether a model failed within the failure TTL."""
+        with self._lock:
+            failed_at = self._load()['failed'].get(model_name)
+        if not isinstance(failed_at, (int, float)):
+            return False
+        return time.time() - failed_at < self.failure_ttl
+
+    def mark_failed(self, model_name):
+        """Remember that a model failed so it is skipped until the TTL expires."""
+        with self._lock:
+            state = self._load()
+            state['failed'][model_name] = time.time()
+            # A failing model must not stay the resolved fallback either
+            if state['resolved'].get('model') == model_name:
+                state['resolved'] = {}
+            self._save()
+
+    def mark_ok(self, model_name):
+        """Forget a previous failure for a model that has worked again."""
+        with self._lock:
+            state = self._load()
+            if state['failed'].pop(model_name, None) is not None:
+                self._save()
+
+    def resolve_fallback(self, fallback_models, list_models, default=None, log=print):
+        """Return the first available fallback model, using the cached choice if fresh.
+
+        Args:
+            fallback_models (list): Model name fragments in order of preference
+            list_models (callable): Returns the names of the available models
+            default (str, optional): Model to use if no fallback is available
+            log (callable): Receives the list of available models. Defaults to print.
+
+        Returns:
+            str: Name of the model to use
+        """
+        with self._lock:
+            resolved = self._load()['resolved']
+            resolved_at = resolved.get('resolved_at')
+            if (resolved.get('model') and isinstance(resolved_at, (int, float))
+                    and time.time() - resolved_at < self.resolution_ttl):
+                return resolved['model']
+
+        available_models = list_models()
+        log(f"Available models: {available_models}")
+
+        model_name = default
+        for fallback in fallback_models:
+            matches = [m for m in available_models
+                       if fallback in m and not self.is_failing(m)]
+            if matches:
+                model_name = matches[0]
+                break
+
+        if model_name:
+            with self._lock:
+                self._load()['resolved'] = {'model': model_name, 'resolved_at': time.time()}
+                self._save()
+        return model_name
+
+    def refresh(self):
+        """Forget the resolved model and all recorded failures."""
+        with self._lock:
+            self._state = {'resolved': {}, 'failed': {}}
+            try:
+                self.state_file.unlink()
+            except FileNotFoundError:
+                pass
+            self._signature = None
+
+    def describe(self):
+        """Return a copy of the current state for display."""
+        with self._lock:
+            return json.loads(json.dumps(self._load()))
+
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def get_model_resolver(backend_name='gemini'):
+    """Return the process-wide model resolver for a generation backend.
+
+    Args:
+        backend_name (str): Backend name; each backend keeps its own state file
+    """
+    with _resolvers_lock:
+        resolver = _resolvers.get(backend_name)
+        if resolver is None:
+            state_file = MODEL_STATE_FILE
+            if backend_name != 'gemini':
+                state_file = CACHE_DIR / f'model_state_{backend_name}.json'
+            resolver = ModelResolver(state_file)
+            _resolvers[backend_name] = resolver
+        return resolver
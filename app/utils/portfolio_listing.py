@@ -0,0 +1,192 @@
+"""
+Listing of the generated student portfolios.
+
+Each student's statement count and latest statement are cached in
+``CACHE_DIR/portfolio_index.json`` keyed on the student directory's mtime, which
+changes whenever a statement is added, renamed or removed. Listing reads the
+student directories with one ``os.scandir`` of the generated tree (and of each
+shard directory in the sharded layout), sorts the names, and then only looks
+inside the directories of the rows it actually yields, so a page of an archive
+of thousands of students costs a stat per row.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from app.app_config import CACHE_DIR, GENERATED_DIR, iter_student_dirs
+from app.utils.answer_journal import write_json_atomic
+from app.utils.response_catalog import MTIME_SETTLE_NS
+
+PORTFOLIO_INDEX_FILE = CACHE_DIR / 'portfolio_index.json'
+
+# Bump when the cached row layout changes
+PORTFOLIO_INDEX_VERSION = 1
+
+# Matches both 'statement_of_intent_<ts>.md' and '<title>_statement_of_intent_<ts>.md'
+STATEMENT_PATTERN = re.compile(
+    r'^(?:(?P<title>.+)_)?statement_of_intent_(?P<timestamp>\d{8}_\d{6})\.md$'
+)
+
+
+def is_statement_file(name):
+    """Check whether a file name is a generated statement (either naming scheme)."""
+    return STATEMENT_PATTERN.match(name) is not None
+
+
+def scan_student_dir(path):
+    """Count a student's statements and find the latest one.
+
+    The latest statement is the one with the newest timestamp in its name; the
+    file mtime breaks ties.
+
+    Args:
+        path (str or Path): Student directory
+
+    Returns:
+        dict: 'statements' (count) and 'latest' (file name or None)
+    """
+    count = 0
+    latest_key, latest = None, None
+    with os.scandir(path) as it:
+        for entry in it:
+            match = STATEMENT_PATTERN.match(entry.name)
+            if match is None or not entry.is_file():
+                continue
+            count += 1
+            key = (match.group('timestamp'), entry.stat().st_mtime_ns)
+            if latest_key is None or key > latest_key:
+                latest_key, latest = key, entry.name
+    return {'statements': count, 'latest': latest}
+
+
+class PortfolioIndex:
+    """Cached per-student statement counts for the generated statements tree."""
+
+    def __init__(self, generated_dir=None, index_file=None):
+        """Initialise the index.
+
+        Args:
+            generated_dir (Path, optional): Generated statements directory.
+                Defaults to GENERATED_DIR.
+            index_file (Path, optional): Where the cache is kept. Defaults to
+                PORTFOLIO_INDEX_FILE.
+        """
+        self.generated_dir = Path(generated_dir) if generated_dir else GENERATED_DIR
+        self.index_file = Path(index_file) if index_file else PORTFOLIO_INDEX_FILE
+        self._lock = threading.Lock()
+        self._rows = None
+        self._dirty = False
+        #: Number of student directories scanned, for diagnostics
+        self.dir_scans = 0
+
+    def _load(self):
+        if self._rows is not None:
+            return
+        self._rows = {}
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (isinstance(index, dict) and index.get('version') == PORTFOLIO_INDEX_VERSION
+                and index.get('directory') == str(self.generated_dir)):
+            self._rows = index['students']
+
+    def save(self):
+        """Write the cache if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                self.index_file.parent.mkdir(parents=True, exist_ok=True)
+                write_json_atomic(self.index_file, {
+                    'version': PORTFOLIO_INDEX_VERSION,
+                    'directory': str(self.generated_dir),
+                    'students': self._rows,
+                }, indent=None)
+                self._dirty = False
+            except OSError as e:
+                print(f"Warning: could not write portfolio index: {e}")
+
+    def student_dirs(self):
+        """Return (student_id, path) for every student directory in either layout,
+        sorted by ID (newest first)."""
+        dirs = list(iter_student_dirs(self.generated_dir))
+        dirs.sort(reverse=True)
+        return dirs
+
+    def row(self, student_id, path):
+        """Return the listing row for one student directory, using the cache if it's current.
+
+        Returns:
+            dict: 'id', 'statements', 'latest' and 'path' (str), or None if
+                the directory has gone
+        """
+        with self._lock:
+            self._load()
+        return self._row(student_id, path)
+
+    def _row(self, student_id, path):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        cached = self._rows.get(student_id)
+        if cached is None or cached['mtime_ns'] != mtime_ns or cached['path'] != path:
+            try:
+                counts = scan_student_dir(path)
+            except FileNotFoundError:
+                return None
+            self.dir_scans += 1
+            # A directory changed within the last moment may change again in the same tick
+            settled = time.time_ns() - mtime_ns > MTIME_SETTLE_NS
+            cached = dict(counts, path=path, mtime_ns=mtime_ns if settled else None)
+            with self._lock:
+                self._rows[student_id] = cached
+                self._dirty = True
+        return {'id': student_id, 'statements': cached['statements'],
+                'latest': cached['latest'], 'path': path}
+
+    def iter_rows(self, offset=0, limit=None):
+        """Yield listing rows sorted by student ID (newest first).
+
+        Only the directories of the rows yielded are looked at, and the cache is
+        saved when the generator finishes.
+
+        Args:
+            offset (int): Number of rows to skip
+            limit (int, optional): Maximum number of rows
+        """
+        dirs = self.student_dirs()
+        end = None if limit is None else offset + limit
+        with self._lock:
+            self._load()
+        try:
+            for student_id, path in dirs[offset:end]:
+                row = self._row(student_id, path)
+                if row is not None:
+                    yield row
+        finally:
+            self.save()
+
+    def count(self):
+        """Return the number of student directories."""
+        return len(self.student_dirs())
+
+
+_portfolio_index = None
+_portfolio_index_lock = threading.Lock()
+
+
+def get_portfolio_index():
+    """Return the process-wide index of GENERATED_DIR."""
+    global _portfolio_index
+    if _portfolio_index is None:
+        with _portfolio_index_lock:
+            if _portfolio_index is None:
+                _portfolio_index = PortfolioIndex()
+    return _portfolio_index
@@ -0,0 +1,194 @@
+"""
+Compiled cache of the questionnaire questions.
+
+The questions are parsed from ``QS_STATEMENT_OF_INTENT.md`` in a single pass and
+the result is stored in ``CACHE_DIR/questions.json`` together with the source
+file's modification time, size and content hash. Later starts load the question
+list from the cache instead of parsing the markdown again, and within a process
+the list is only re-checked with a ``stat`` of the source file.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from app.app_config import BASE_DIR, CACHE_DIR, QUESTIONS_FILE
+
+QUESTIONS_CACHE_FILE = CACHE_DIR / 'questions.json'
+
+# Bump when parse_questions() changes so old cache files are ignored
+CACHE_FORMAT = 1
+
+# Words that mark a bold line as a question
+QUESTION_WORDS = ('What', 'How', 'Why', 'Describe')
+
+# How many lines above a question its ### title may be
+TITLE_WINDOW = 9
+
+
+def parse_questions(content):
+    """Parse questions from the questionnaire markdown in a single pass.
+
+    A question is a bold line containing a question mark and one of
+    QUESTION_WORDS. It takes its section from the current ``##`` header and its
+    title from the ``###`` header just above it (within TITLE_WINDOW lines).
+
+    Args:
+        content (str): Markdown text
+
+    Returns:
+        list: Question dicts with 'section', 'title', 'text', 'id' and 'required'
+    """
+    questions = []
+    current_section = "Introduction"
+    title, title_line = "", None
+
+    for i, line in enumerate(content.split('\n')):
+        if line[:1] == '#':
+            if line.startswith('## '):
+                current_section = line.replace('## ', '').strip()
+                continue
+            if line.startswith('### '):
+                title, title_line = line.replace('### ', '').strip(), i
+                continue
+
+        if '?' in line and '**' in line and any(q in line for q in QUESTION_WORDS):
+            number = len(questions) + 1
+            recent = title_line is not None and i - title_line <= TITLE_WINDOW
+            questions.append({
+                'section': current_section,
+                'title': title if recent and title else f"Question {number}",
+                'text': line.strip().replace('**', ''),
+                'id': f"q{number}",
+                'required': True
+            })
+    return questions
+
+
+def default_questions_file():
+    """Return the questionnaire markdown, falling back to its old location."""
+    if QUESTIONS_FILE.exists():
+        return QUESTIONS_FILE
+    return BASE_DIR / 'QS_STATEMENT_OF_INTENT.md'
+
+
+class QuestionCache:
+    """Parses the questionnaire once and keeps the result on disk and in memory."""
+
+    def __init__(self, questions_file=None, cache_file=None):
+        """Initialise the cache.
+
+        Args:
+            questions_file (Path, optional): Questionnaire markdown. Defaults to
+                default_questions_file().
+            cache_file (Path, optional): Compiled cache file. Defaults to
+                QUESTIONS_CACHE_FILE.
+        """
+        self.questions_file = Path(questions_file) if questions_file else None
+        self.cache_file = Path(cache_file) if cache_file else QUESTIONS_CACHE_FILE
+        self._lock = threading.Lock()
+        self._questions = None
+        self._signature = None
+        #: Number of times the markdown has been parsed
+        self.parses = 0
+        #: Number of times the question list was loaded from the cache file
+        self.disk_hits = 0
+
+    def _read_cache_file(self):
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or entry.get('format') != CACHE_FORMAT:
+            return None
+        return entry
+
+    def _write_cache_file(self, source, signature, digest, questions):
+        entry = {
+            'format': CACHE_FORMAT,
+            'source': str(source),
+            'mtime_ns': signature[0],
+            'size': signature[1],
+            'sha256': digest,
+            'questions': questions,
+        }
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_file.with_suffix(f'.{threading.get_ident()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            print(f"Warning: could not write question cache: {e}")
+
+    def _load(self, source, signature):
+        """Load the questions for a source file from the cache file or by parsing it."""
+        entry = self._read_cache_file()
+        if entry is not None and entry.get('source') == str(source):
+            if (entry.get('mtime_ns'), entry.get('size')) == signature:
+                self.disk_hits += 1
+                return entry['questions']
+
+        with open(source, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry.get('source') == str(source) \
+                and entry.get('sha256') == digest:
+            # Touched but not edited: keep the parsed questions, record the new mtime
+            questions = entry['questions']
+            self.disk_hits += 1
+        else:
+            questions = parse_questions(data.decode('utf-8'))
+            self.parses += 1
+        self._write_cache_file(source, signature, digest, questions)
+        return questions
+
+    def get(self):
+        """Return the questions, parsing the markdown only if it changed.
+
+        Returns:
+            list: Fresh copies of the question dicts, safe for the caller to change
+
+        Raises:
+            FileNotFoundError: If the questionnaire markdown doesn't exist
+        """
+        source = self.questions_file or default_questions_file()
+        stat = os.stat(source)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if (source, signature) != self._signature:
+                self._questions = self._load(source, signature)
+                self._signature = (source, signature)
+            return [dict(question) for question in self._questions]
+
+    def invalidate(self):
+        """Forget the questions and remove the cache file so they are parsed again."""
+        with self._lock:
+            self._questions = None
+            self._signature = None
+            try:
+                self.cache_file.unlink()
+            except FileNotFoundError:
+                pass
+
+
+_question_cache = None
+_question_cache_lock = threading.Lock()
+
+
+def get_question_cache():
+    """Return the process-wide question cache."""
+    global _question_cache
+    if _question_cache is None:
+        with _question_cache_lock:
+            if _question_cache is None:
+                _question_cache = QuestionCache()
+    return _question_cache
+
+
+def get_questions():
+    """Return the questionnaire questions from the shared cache."""
+    return get_question_cache().get()
@@ -0,0 +1,260 @@
+"""
+Retry and circuit-breaker helpers for calls to the generation API.
+
+Transient errors (rate limits, overloaded or unavailable backends, timeouts) are
+retried with exponential backoff and full jitter, honouring ``Retry-After`` when the
+server sends one. A circuit breaker per model stops a batch from hammering an
+endpoint that is clearly down.
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+# HTTP status codes worth retrying
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# google.api_core exception class names and the status codes they stand for
+_STATUS_BY_EXCEPTION_NAME = {
+    'TooManyRequests': 429,
+    'ResourceExhausted': 429,
+    'InternalServerError': 500,
+    'BadGateway': 502,
+    'ServiceUnavailable': 503,
+    'GatewayTimeout': 504,
+    'DeadlineExceeded': 504,
+    'NotFound': 404,
+}
+
+# Phrases in an API error that mean the model itself can't serve requests
+_MODEL_UNAVAILABLE_PHRASES = ('not found', 'not supported', 'unsupported', 'not available')
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+    def __init__(self, name, retry_in):
+        super().__init__(
+            f"{name} is unavailable after repeated failures; "
+            f"not retrying for another {retry_in:.0f}s"
+        )
+        self.name = name
+        self.retry_in = retry_in
+
+
+def get_status_code(error):
+    """Return the HTTP status code carried by an API exception, if any."""
+    for attr in ('code', 'status_code'):
+        code = getattr(error, attr, None)
+        if isinstance(code, int):
+            return code
+        # google.api_core uses enum-like codes on some versions
+        if hasattr(code, 'value') and isinstance(code.value, int):
+            return code.value
+    response = getattr(error, 'response', None)
+    code = getattr(response, 'status_code', None) or getattr(response, 'status', None)
+    if isinstance(code, int):
+        return code
+    return _STATUS_BY_EXCEPTION_NAME.get(type(error).__name__)
+
+
+def is_transient(error):
+    """Check whether an error is worth retrying."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    return get_status_code(error) in TRANSIENT_STATUS_CODES
+
+
+def is_model_unavailable(error):
+    """Check whether an error means the model doesn't exist or can't serve the request.
+
+    Only these errors say anything about the model; rate limits, outages, blocked
+    prompts and similar errors don't, and must not get the model skipped.
+    """
+    if isinstance(error, CircuitOpenError) or is_transient(error):
+        return False
+    if get_status_code(error) == 404:
+        return True
+    message = str(error).lower()
+    return 'model' in message and any(phrase in message
+                                      for phrase in _MODEL_UNAVAILABLE_PHRASES)
+
+
+def get_retry_after(error):
+    """Return the server's Retry-After hint in seconds, or None."""
+    value = getattr(error, 'retry_after', None)
+    if value is None:
+        response = getattr(error, 'response', None)
+        headers = getattr(response, 'headers', None) or {}
+        try:
+            value = headers.get('Retry-After') or headers.get('retry-after')
+        except AttributeError:
+            value = None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, parsedate_to_datetime(str(value)).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """Bounded retries with exponential backoff and full jitter."""
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=30.0, max_retry_after=60.0):
+        """Initialise the policy.
+
+        Args:
+            max_attempts (int): Total attempts including the first call
+            base_delay (float): Backoff before the first retry, in seconds
+            max_delay (float): Upper bound for a computed backoff, in seconds
+            max_retry_after (float): Upper bound for a server Retry-After hint, in seconds
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def compute_delay(self, retry_number, retry_after=None):
+        """Return the delay before a retry.
+
+        Args:
+            retry_number (int): 1 for the first retry, 2 for the second, ...
+            retry_after (float, optional): Server Retry-After hint in seconds
+
+        Returns:
+            float: Delay in seconds
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+
+class CircuitBreaker:
+    """Fails fast after repeated transient failures, then probes again after a cool-down."""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60.0):
+        """Initialise the breaker.
+
+        Args:
+            name (str): Name used in error messages (usually the model name)
+            failure_threshold (int): Consecutive transient failures that open the circuit
+            reset_timeout (float): Seconds the circuit stays open before a probe call
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise CircuitOpenError if calls should not be made right now."""
+        with self._lock:
+            if self.state == self.OPEN:
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(self.name, remaining)
+                # Let a single probe call through
+                self.state = self.HALF_OPEN
+            elif self.state == self.HALF_OPEN:
+                # A probe is already in flight
+                raise CircuitOpenError(self.name, self.reset_timeout)
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def record_other(self):
+        """Record a call that failed for a non-transient reason."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                # The backend answered, so it is reachable again
+                self.state = self.CLOSED
+                self.failures = 0
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name):
+    """Return the process-wide circuit breaker for a model or backend name."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name)
+            _breakers[name] = breaker
+        return breaker
+
+
+def call_with_retry(func, policy=None, breaker=None, stats=None, sleep=time.sleep, log=print):
+    """Call ``func`` with retries for transient errors.
+
+    Args:
+        func (callable): Zero-argument callable making the API request
+        policy (RetryPolicy, optional): Retry policy. Defaults to DEFAULT_RETRY_POLICY.
+        breaker (CircuitBreaker, optional): Circuit breaker guarding the backend
+        stats (dict, optional): 'attempts', 'retries' and 'backoff_time' are added to
+            any values already present, so one dict can collect totals across calls
+        sleep (callable): Sleep function, replaceable in tests
+        log (callable): Receives the retry messages. Defaults to print.
+
+    Returns:
+        The return value of ``func``
+    """
+    policy = policy or DEFAULT_RETRY_POLICY
+    stats = stats if stats is not None else {}
+    for key in ('attempts', 'retries', 'backoff_time'):
+        stats.setdefault(key, 0)
+
+    for attempt in range(1, policy.max_attempts + 1):
+        if breaker is not None:
+            breaker.before_call()
+        stats['attempts'] += 1
+        try:
+            result = func()
+        except Exception as e:
+            transient = is_transient(e)
+            if breaker is not None:
+                if transient:
+                    breaker.record_failure()
+                else:
+                    breaker.record_other()
+            if not transient or attempt == policy.max_attempts:
+                raise
+            delay = policy.compute_delay(attempt, get_retry_after(e))
+            log(f"Transient error ({e}); retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1} of {policy.max_attempts})")
+            stats['retries'] += 1
+            stats['backoff_time'] += delay
+            sleep(delay)
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
@@ -0,0 +1,371 @@
+"""
+Persistent catalog of the responses files.
+
+Listing and loading responses only needs each file's student ID, project title,
+timestamp and size, so that metadata is kept in a compact index
+(``CACHE_DIR/response_catalog.json``) instead of opening and parsing every file
+for every menu. The index is refreshed incrementally: a directory whose mtime
+hasn't changed isn't read at all, otherwise it is scanned once and only files
+whose mtime or size changed are parsed again. Shard directories of the sharded
+layout are followed, each with its own mtime, so both layouts are catalogued.
+
+The catalog also indexes the files by student ID, so finding a student's latest
+responses is an exact dictionary lookup rather than a glob over the directory.
+"""
+
+import fnmatch
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from app.app_config import CACHE_DIR, RESPONSES_DIR, SHARD_LEVELS, is_shard_name, uses_shards
+from app.utils.answer_journal import write_json_atomic
+
+RESPONSE_CATALOG_FILE = CACHE_DIR / 'response_catalog.json'
+
+# Bump when the entry layout changes so old index files are rebuilt
+CATALOG_VERSION = 3
+
+# Responses file formats
+FORMAT_UNREADABLE = 0
+FORMAT_FLAT = 1      # just a dict of responses
+FORMAT_METADATA = 2  # {'student_id', 'project_title', 'timestamp', 'responses'}
+
+# A directory mtime this recent may still change within the same clock tick, so
+# it isn't trusted to skip the next scan
+MTIME_SETTLE_NS = 2 * 10**9
+
+
+def catalog_index_file(responses_dir):
+    """Return the default index file for a responses directory.
+
+    RESPONSES_DIR uses RESPONSE_CATALOG_FILE; any other directory gets its own file
+    named after a hash of its resolved path, so cataloguing it never overwrites the
+    main index.
+
+    Args:
+        responses_dir (Path): Directory of responses files
+
+    Returns:
+        Path: The index file
+    """
+    resolved = Path(responses_dir).resolve()
+    if resolved == RESPONSES_DIR.resolve():
+        return RESPONSE_CATALOG_FILE
+    digest = hashlib.sha256(str(resolved).encode('utf-8')).hexdigest()[:12]
+    return CACHE_DIR / f'response_catalog_{digest}.json'
+
+
+def parse_responses_data(data):
+    """Split the contents of a responses file into its metadata and answers.
+
+    This is the one place that knows both formats: the current one with metadata
+    around a 'responses' dict, and the old one that is just the dict of answers.
+
+    Args:
+        data: Decoded JSON of a responses file
+
+    Returns:
+        dict: 'student_id', 'project_title', 'timestamp' (None if unknown),
+            'responses' and 'format'
+    """
+    if isinstance(data, dict) and isinstance(data.get('responses'), dict):
+        return {
+            'student_id': data.get('student_id'),
+            'project_title': data.get('project_title'),
+            'timestamp': data.get('timestamp'),
+            'responses': data['responses'],
+            'format': FORMAT_METADATA,
+        }
+    return {
+        'student_id': None,
+        'project_title': None,
+        'timestamp': None,
+        'responses': data if isinstance(data, dict) else {},
+        'format': FORMAT_FLAT if isinstance(data, dict) else FORMAT_UNREADABLE,
+    }
+
+
+def read_metadata(path, stat=None):
+    """Read the catalog entry for one responses file.
+
+    Args:
+        path (Path): Responses file
+        stat (os.stat_result, optional): The file's stat, if already known
+
+    Returns:
+        dict: 'name', 'student_id', 'project_title', 'timestamp', 'size',
+            'mtime_ns' and 'format'
+    """
+    stat = stat or os.stat(path)
+    entry = {
+        'name': Path(path).name,
+        'student_id': None,
+        'project_title': None,
+        'timestamp': None,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'format': FORMAT_FLAT,
+    }
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        entry['format'] = FORMAT_UNREADABLE
+        return entry
+    record = parse_responses_data(data)
+    entry.update(
+        student_id=record['student_id'],
+        project_title=record['project_title'],
+        timestamp=record['timestamp'],
+        format=record['format'],
+    )
+    return entry
+
+
+class ResponseCatalog:
+    """Index of the responses files in a directory, kept up to date incrementally."""
+
+    def __init__(self, responses_dir=None, index_file=None, pattern='*.json'):
+        """Initialise the catalog.
+
+        Args:
+            responses_dir (Path, optional): Directory of responses files. Defaults
+                to RESPONSES_DIR.
+            index_file (Path, optional): Where the index is kept. Defaults to
+                catalog_index_file(responses_dir).
+            pattern (str): Glob pattern for responses files
+        """
+        self.responses_dir = Path(responses_dir) if responses_dir else RESPONSES_DIR
+        self.index_file = (Path(index_file) if index_file
+                           else catalog_index_file(self.responses_dir))
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        # Relative directory ('' for the root, 'a/b' for a shard) ->
+        # {'mtime_ns', 'subdirs', 'files': {name: entry}}
+        self._dirs = None
+        self._sorted = None  # (entry, path) pairs, newest first
+        self._paths = {}  # relative path -> Path, so Paths aren't rebuilt on every listing
+        self._by_student = None  # student_id -> [path], newest first
+        #: Number of directory scans and of files parsed, for diagnostics
+        self.scans = 0
+        self.parses = 0
+
+    def _read_index(self):
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (isinstance(index, dict) and index.get('version') == CATALOG_VERSION
+                and index.get('directory') == str(self.responses_dir)
+                and index.get('pattern') == self.pattern):
+            self._dirs = index['dirs']
+
+    def _write_index(self):
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            write_json_atomic(self.index_file, {
+                'version': CATALOG_VERSION,
+                'directory': str(self.responses_dir),
+                'pattern': self.pattern,
+                'dirs': self._dirs,
+            }, indent=None)
+        except OSError as e:
+            print(f"Warning: could not write response catalog: {e}")
+
+    def _reset(self):
+        self._dirs = {}
+        self._sorted = self._by_student = None
+
+    def _forget(self, rel):
+        """Drop a directory that has gone, and everything below it."""
+        prefix = rel + '/'
+        for key in [key for key in self._dirs if key == rel or key.startswith(prefix)]:
+            del self._dirs[key]
+
+    def _scan(self, rel, path, depth, dir_mtime_ns):
+        """Rescan one directory, parsing only new and changed files."""
+        old = self._dirs.get(rel)
+        old_files = old['files'] if old else {}
+        files, subdirs = {}, []
+        shards = depth < SHARD_LEVELS and uses_shards(self.responses_dir)
+        with os.scandir(path) as it:
+            for dir_entry in it:
+                name = dir_entry.name
+                try:
+                    if shards and is_shard_name(name) and dir_entry.is_dir():
+                        subdirs.append(name)
+                        continue
+                    if not fnmatch.fnmatch(name, self.pattern) or not dir_entry.is_file():
+                        continue
+                    stat = dir_entry.stat()
+                except FileNotFoundError:
+                    continue
+                entry = old_files.get(name)
+                if (entry is None or entry['mtime_ns'] != stat.st_mtime_ns
+                        or entry['size'] != stat.st_size):
+                    entry = read_metadata(dir_entry.path, stat)
+                    self.parses += 1
+                files[name] = entry
+        self.scans += 1
+        for name in (old['subdirs'] if old else ()):
+            if name not in subdirs:
+                self._forget(f'{rel}/{name}' if rel else name)
+        settled = time.time_ns() - dir_mtime_ns > MTIME_SETTLE_NS
+        self._dirs[rel] = {'mtime_ns': dir_mtime_ns if settled else None,
+                           'subdirs': subdirs, 'files': files}
+
+    def _refresh_dir(self, rel, depth, full):
+        """Refresh a directory and its shard subdirectories; returns True if anything changed."""
+        path = os.path.join(self.responses_dir, rel) if rel else self.responses_dir
+        try:
+            dir_mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            changed = rel in self._dirs
+            self._forget(rel)
+            return changed
+        known = self._dirs.get(rel)
+        changed = full or known is None or known['mtime_ns'] != dir_mtime_ns
+        if changed:
+            try:
+                self._scan(rel, path, depth, dir_mtime_ns)
+            except FileNotFoundError:
+                self._forget(rel)
+                return True
+        for name in self._dirs[rel]['subdirs']:
+            if self._refresh_dir(f'{rel}/{name}' if rel else name, depth + 1, full):
+                changed = True
+        return changed
+
+    def refresh(self, full=False):
+        """Bring the index up to date with the directory.
+
+        Args:
+            full (bool): Check every file even if the directory mtimes are unchanged
+                (files edited in place don't change them)
+        """
+        with self._lock:
+            if self._dirs is None:
+                self._read_index()
+            if not os.path.isdir(self.responses_dir):
+                self._reset()
+                return
+            if self._dirs is None:
+                self._dirs = {}
+            if self._refresh_dir('', 0, full):
+                self._sorted = self._by_student = None
+                self._write_index()
+
+    def rebuild(self):
+        """Forget the index and parse every responses file again."""
+        with self._lock:
+            self._reset()
+        self.refresh(full=True)
+
+    def record(self, path):
+        """Update the entry for a responses file that has just been written.
+
+        Args:
+            path (Path): The responses file (in the catalog's directory or a shard of it)
+        """
+        path = Path(path)
+        try:
+            rel = path.parent.relative_to(self.responses_dir).as_posix()
+        except ValueError:
+            return
+        rel = '' if rel == '.' else rel
+        with self._lock:
+            if self._dirs is None:
+                self._read_index()
+            if self._dirs is None:
+                return
+            known = self._dirs.get(rel)
+            if known is None:
+                # A new shard directory: rescan the way down to it on the next refresh
+                parts = rel.split('/')
+                for depth in range(len(parts)):
+                    ancestor = self._dirs.get('/'.join(parts[:depth]))
+                    if ancestor is not None:
+                        ancestor['mtime_ns'] = None
+                return
+            known['files'][path.name] = read_metadata(path)
+            self._sorted = self._by_student = None
+            self.parses += 1
+            self._write_index()
+
+    def _sorted_pairs(self):
+        """(entry, path) pairs, newest first; call with the lock held."""
+        if self._sorted is None:
+            pairs = []
+            for rel, directory in self._dirs.items():
+                for name, entry in directory['files'].items():
+                    key = f'{rel}/{name}' if rel else name
+                    path = self._paths.get(key)
+                    if path is None:
+                        path = self._paths[key] = self.responses_dir / key
+                    pairs.append((entry, path))
+            pairs.sort(key=lambda pair: pair[0]['mtime_ns'], reverse=True)
+            self._sorted = pairs
+        return self._sorted
+
+    def entries(self):
+        """Return the catalog entries, newest first.
+
+        Returns:
+            list: Entry dicts (see read_metadata) with the file's Path under 'file'
+        """
+        self.refresh()
+        with self._lock:
+            sorted_pairs = self._sorted_pairs()
+        return [dict(entry, file=path) for entry, path in sorted_pairs]
+
+    def versions(self, student_id):
+        """Return every responses file saved for a student ID, newest first.
+
+        Args:
+            student_id (str): Exact student ID
+
+        Returns:
+            list: Paths of the student's responses files
+        """
+        self.refresh()
+        with self._lock:
+            if self._by_student is None:
+                by_student = {}
+                for entry, path in self._sorted_pairs():
+                    if entry['student_id'] is not None:
+                        by_student.setdefault(str(entry['student_id']), []).append(path)
+                self._by_student = by_student
+            return list(self._by_student.get(student_id, ()))
+
+    def latest(self, student_id):
+        """Return the newest responses file for a student ID, or None."""
+        versions = self.versions(student_id)
+        return versions[0] if versions else None
+
+    def search(self, text):
+        """Find responses files whose student ID or file name contains some text.
+
+        Returns:
+            list: Entry dicts as returned by entries(), newest first
+        """
+        return [entry for entry in self.entries()
+                if text in entry['name'] or text in str(entry['student_id'] or '')]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_response_catalog():
+    """Return the process-wide catalog of RESPONSES_DIR."""
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = ResponseCatalog()
+    return _catalog
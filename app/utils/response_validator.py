@@ -0,0 +1,187 @@
+"""
+Compiled validation of student responses against the schema.
+
+The schema is compiled once into a flat field index with option sets, so a set of
+responses is checked for missing required fields, wrong types, unknown options and
+over-long answers in a single pass. This makes it cheap to validate every stored
+responses record (see validate_storage).
+
+The schema names its fields (``project_title``, ``project_type``, ...) while the
+questionnaire stores answers as ``q1``..``qN``; ``FIELD_QUESTION_IDS`` maps between
+the two so either kind of responses can be validated.
+"""
+
+import fnmatch
+import threading
+
+from app.utils.schema_registry import get_schema_registry
+
+# Schema field id -> questionnaire question id (None if the questionnaire doesn't ask it)
+FIELD_QUESTION_IDS = {
+    'project_title': 'q1',
+    'project_type': 'q2',
+    'problem_opportunity': 'q3',
+    'technologies': 'q4',
+    'learning_goals': 'q7',
+    'target_audience': 'q10',
+    'challenges': 'q19',
+    'timeline': None,
+    'milestones': None,
+}
+
+
+def is_question_id(field_id):
+    """Check whether an id is a questionnaire id like 'q12'."""
+    return field_id[:1] == 'q' and field_id[1:].isdigit()
+
+
+class _Field:
+    """One compiled schema field."""
+
+    __slots__ = ('id', 'question_id', 'type', 'required', 'options', 'max_length')
+
+    def __init__(self, field):
+        self.id = field['id']
+        self.question_id = FIELD_QUESTION_IDS.get(self.id)
+        self.type = field.get('type', 'text')
+        self.required = bool(field.get('required', False))
+        options = field.get('options')
+        self.options = frozenset(options) if options else None
+        # Only limits the schema declares are enforced
+        self.max_length = field.get('max_length')
+
+
+def _error(field_id, code, message):
+    return {'field': field_id, 'code': code, 'message': message}
+
+
+class ResponseValidator:
+    """Validates responses against a schema compiled into a field index."""
+
+    def __init__(self, schema):
+        """Compile a schema.
+
+        Args:
+            schema (Mapping): Parsed schema with 'sections' of 'fields'
+        """
+        self.fields = tuple(
+            _Field(field)
+            for section in schema.get('sections', ())
+            for field in section.get('fields', ())
+        )
+        self.field_index = {field.id: field for field in self.fields}
+        self.question_index = {field.question_id: field for field in self.fields
+                               if field.question_id}
+
+    def to_question_ids(self, responses):
+        """Rename schema field ids to questionnaire ids; other keys are kept."""
+        renamed = {}
+        for key, value in responses.items():
+            field = self.field_index.get(key)
+            renamed[field.question_id if field and field.question_id else key] = value
+        return renamed
+
+    def to_field_ids(self, responses):
+        """Rename questionnaire ids to schema field ids; other keys are kept."""
+        renamed = {}
+        for key, value in responses.items():
+            field = self.question_index.get(key)
+            renamed[field.id if field else key] = value
+        return renamed
+
+    def validate(self, responses):
+        """Check responses in one pass over the field index.
+
+        Responses may be keyed by schema field ids or by questionnaire ids. Answers
+        from the questionnaire are free text, so allowed options are only enforced
+        for responses keyed by field ids, and fields the questionnaire doesn't ask
+        are not required from them.
+
+        Args:
+            responses (dict): Student responses
+
+        Returns:
+            list: Error dicts with 'field', 'code' ('missing', 'type', 'option' or
+                'length') and 'message'; empty if the responses are valid
+        """
+        if not isinstance(responses, dict):
+            return [_error(None, 'type', "Responses must be a JSON object")]
+
+        by_question = any(is_question_id(key) for key in responses)
+        errors = []
+        for field in self.fields:
+            key = field.id
+            if by_question:
+                if not field.question_id:
+                    continue
+                key = field.question_id
+            value = responses.get(key)
+
+            if value is None or value == '' or value == [] or value == ():
+                if field.required:
+                    errors.append(_error(key, 'missing', f"Missing required field: {key}"))
+                continue
+
+            is_list = isinstance(value, (list, tuple))
+            if field.type == 'multiselect' and (is_list or not by_question):
+                if not is_list or not all(
+                        isinstance(item, str) for item in value):
+                    errors.append(_error(key, 'type', f"{key} must be a list of strings"))
+                elif field.options is not None and not by_question:
+                    unknown = [item for item in value if item not in field.options]
+                    if unknown:
+                        errors.append(_error(key, 'option',
+                                             f"{key} has unknown options: {', '.join(unknown)}"))
+                continue
+
+            if not isinstance(value, str):
+                errors.append(_error(key, 'type', f"{key} must be text"))
+                continue
+            if (field.type == 'select' and not by_question and field.options is not None
+                    and value not in field.options):
+                errors.append(_error(key, 'option', f"{key} has an unknown option: {value}"))
+            if field.max_length is not None and len(value) > field.max_length:
+                errors.append(_error(key, 'length',
+                                     f"{key} is longer than {field.max_length} characters"))
+        return errors
+
+    def validate_storage(self, storage, pattern='*.json'):
+        """Validate every responses record in a storage backend.
+
+        Args:
+            storage (StorageBackend): Backend to check (see app.utils.storage)
+            pattern (str): Glob pattern for record names
+
+        Returns:
+            dict: Record ref -> list of error dicts, for every record checked
+        """
+        entries = sorted((entry for entry in storage.list_responses()
+                          if fnmatch.fnmatch(entry['name'], pattern)),
+                         key=lambda entry: entry['name'])
+        results = {}
+        for entry in entries:
+            try:
+                responses = storage.load_responses(entry['ref'])['responses']
+            except (OSError, ValueError) as e:
+                results[entry['ref']] = [_error(None, 'file',
+                                                f"Could not read {entry['name']}: {e}")]
+                continue
+            results[entry['ref']] = self.validate(responses)
+        return results
+
+
+_validator = None
+_validator_version = None
+_validator_lock = threading.Lock()
+
+
+def get_response_validator():
+    """Return a validator for the current schema, recompiling it if the schema changed."""
+    global _validator, _validator_version
+    registry = get_schema_registry()
+    schema = registry.get()
+    with _validator_lock:
+        if _validator is None or _validator_version != registry.version:
+            _validator = ResponseValidator(schema)
+            _validator_version = registry.version
+        return _validator
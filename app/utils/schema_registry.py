@@ -0,0 +1,96 @@
+"""
+Shared cache of the Statement of Intent schema.
+
+Every loader asks the registry for the schema instead of opening
+``statement_intent_schema.json`` itself. The file is parsed once and only parsed
+again when its modification time or size changes, so batch runs don't re-read
+it for every student. The schema is handed out as a read-only view so one caller
+can't change what the others see.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+from app.app_config import STATEMENT_SCHEMA
+
+
+def freeze(value):
+    """Return a read-only copy of parsed JSON (dicts become mappingproxies, lists tuples)."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class SchemaRegistry:
+    """Parses a schema file once and reloads it when the file changes."""
+
+    def __init__(self, schema_file=None):
+        """Initialise the registry.
+
+        Args:
+            schema_file (Path, optional): Schema file. Defaults to STATEMENT_SCHEMA.
+        """
+        self.schema_file = Path(schema_file) if schema_file else STATEMENT_SCHEMA
+        self._lock = threading.Lock()
+        self._schema = None
+        self._signature = None
+        #: Number of times the file has been parsed
+        self.loads = 0
+        #: Incremented whenever a changed schema is loaded, for callers that
+        #: derive their own data from the schema
+        self.version = 0
+
+    def get(self):
+        """Return the schema, parsing the file only if it changed.
+
+        Returns:
+            mappingproxy: Read-only view of the schema
+
+        Raises:
+            FileNotFoundError: If the schema file doesn't exist
+            json.JSONDecodeError: If the schema file isn't valid JSON
+        """
+        stat = os.stat(self.schema_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if signature != self._signature:
+                with open(self.schema_file, 'r', encoding='utf-8') as f:
+                    schema = freeze(json.load(f))
+                self._schema = schema
+                self._signature = signature
+                self.loads += 1
+                self.version += 1
+            return self._schema
+
+    def invalidate(self):
+        """Force the next get() to parse the file again."""
+        with self._lock:
+            self._signature = None
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_schema_registry(schema_file=None):
+    """Return the process-wide registry for a schema file (STATEMENT_SCHEMA by default)."""
+    path = Path(schema_file) if schema_file else STATEMENT_SCHEMA
+    registry = _registries.get(path)
+    if registry is not None:
+        return registry
+    with _registries_lock:
+        registry = _registries.get(path)
+        if registry is None:
+            registry = SchemaRegistry(path)
+            _registries[path] = registry
+        return registry
+
+
+def get_schema(schema_file=None):
+    """Return the read-only schema from the shared registry."""
+    return get_schema_registry(schema_file).get()
@@ -0,0 +1,301 @@
+"""
+Section-parallel generation of Statements of Intent.
+
+The statement has eight independent sections. Generating each one with its own,
+smaller prompt and running the calls concurrently cuts the wall-clock time of a
+single statement to roughly that of its slowest section. A fixed student persona is
+written into every section prompt so that the sections read as one document, and
+the results are stitched together in template order regardless of which call
+finished first.
+
+Each section's inputs are fingerprinted and stored with the generated statements
+(see app.utils.storage), so after an answer is edited only the sections that
+depend on it are regenerated and spliced into the latest statement.
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.utils.file_naming import statement_filename
+from app.utils.gemini_utils import generate_statement
+from app.utils.generate_statement_prompt import (
+    choose_persona, choose_styles, generate_section_prompts, section_fingerprint,
+    section_heading, section_numbers, statement_header
+)
+from app.utils.storage import get_storage
+
+# Concurrent calls per statement; one per section by default
+DEFAULT_SECTION_WORKERS = 8
+
+
+def _generate_one(section, use_cache, hedge_after, verbose):
+    stats = {}
+    start = time.perf_counter()
+    text = generate_statement(section['prompt'], use_cache=use_cache, stats=stats,
+                              hedge_after=hedge_after, verbose=verbose)
+    stats['latency'] = time.perf_counter() - start
+    return text, stats
+
+
+def generate_sections(student_responses, workers=DEFAULT_SECTION_WORKERS, use_cache=True,
+                      hedge_after=None, persona=None, sections=None, stats=None,
+                      selection=None, verbose=True):
+    """Generate statement sections concurrently.
+
+    Args:
+        student_responses (dict): Student responses
+        workers (int): Number of concurrent section generations
+        use_cache (bool): Set to False to bypass the generation cache
+        hedge_after (float, optional): Hedge to a fallback model after this many seconds
+        persona (dict, optional): Persona shared by all sections (see choose_persona)
+        sections (list, optional): Section numbers to generate. Defaults to all.
+        stats (dict, optional): Filled with per-section stats under 'sections', the
+            summed 'retries' and 'backoff_time', the 'styles' used and the estimated
+            'input_tokens' of all section prompts
+        selection (dict, optional): Style selection (see choose_styles)
+        verbose (bool): Print progress and error messages (see generate_statement)
+
+    Returns:
+        dict: Section number -> generated text
+
+    Raises:
+        Exception: The error of the first section (in document order) that failed,
+            once every section has finished
+    """
+    stats = stats if stats is not None else {}
+    persona = persona or choose_persona(student_responses)
+    selection = selection or choose_styles(student_responses)
+    stats['styles'] = selection
+    section_prompts = generate_section_prompts(student_responses, persona, sections, selection)
+    stats['input_tokens'] = sum(section['input_tokens'] for section in section_prompts)
+
+    workers = max(1, min(int(workers), len(section_prompts) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (section['number'], executor.submit(_generate_one, section, use_cache, hedge_after,
+                                             verbose))
+            for section in section_prompts
+        ]
+
+    texts = {}
+    errors = []
+    section_stats = stats.setdefault('sections', {})
+    for number, future in futures:
+        try:
+            texts[number], section_stats[number] = future.result()
+        except Exception as e:
+            errors.append((number, e))
+
+    stats['retries'] = sum(s.get('retries', 0) for s in section_stats.values())
+    stats['backoff_time'] = sum(s.get('backoff_time', 0.0) for s in section_stats.values())
+    models = {s.get('model') for s in section_stats.values() if s.get('model')}
+    if models:
+        stats['model'] = ', '.join(sorted(models))
+
+    if errors:
+        number, error = errors[0]
+        if verbose:
+            print(f"Error generating section {number}: {error}")
+        raise error
+    return texts
+
+
+def clean_section(number, text):
+    """Normalise one generated section so it starts with its canonical heading.
+
+    Code fences and document titles the model added are removed, and the
+    heading is added if the model left it out.
+    """
+    lines = text.strip().splitlines()
+    lines = [line for line in lines if not line.strip().startswith('```')]
+    while lines and (not lines[0].strip() or re.match(r'^#\s', lines[0].strip())):
+        lines.pop(0)
+
+    if lines and lines[0].strip().startswith(f'## {number}'):
+        lines[0] = lines[0].strip()
+    else:
+        lines.insert(0, section_heading(number))
+        lines.insert(1, '')
+    return '\n'.join(lines).strip()
+
+
+def stitch_sections(project_title, sections):
+    """Join generated sections into one statement in template order.
+
+    Args:
+        project_title (str): Project title for the document heading
+        sections (dict): Section number -> generated text
+
+    Returns:
+        str: Markdown statement
+    """
+    parts = [f"# Statement of Intent: {project_title or 'Untitled Project'}"]
+    for number in section_numbers():
+        if number in sections:
+            parts.append(clean_section(number, sections[number]))
+    return '\n\n'.join(parts) + '\n'
+
+
+def generate_statement_by_sections(student_responses, project_title=None,
+                                   workers=DEFAULT_SECTION_WORKERS, use_cache=True,
+                                   hedge_after=None, stats=None, selection=None, verbose=True):
+    """Generate a complete statement by generating its sections in parallel.
+
+    Args:
+        student_responses (dict): Student responses
+        project_title (str, optional): Title for the document heading. Defaults to q1.
+        workers (int): Number of concurrent section generations
+        use_cache (bool): Set to False to bypass the generation cache
+        hedge_after (float, optional): Hedge to a fallback model after this many seconds
+        stats (dict, optional): Filled as by generate_sections()
+        selection (dict, optional): Style selection (see choose_styles)
+        verbose (bool): Print progress and error messages (see generate_statement)
+
+    Returns:
+        str: The stitched statement
+    """
+    project_title = project_title or student_responses.get('q1')
+    texts = generate_sections(student_responses, workers=workers, use_cache=use_cache,
+                              hedge_after=hedge_after, stats=stats, selection=selection,
+                              verbose=verbose)
+    return stitch_sections(project_title, texts)
+
+
+def section_fingerprints(student_responses, persona=None, selection=None):
+    """Return the fingerprint of every section for a set of responses.
+
+    Returns:
+        dict: Section number -> fingerprint
+    """
+    persona = persona or choose_persona(student_responses)
+    selection = selection or choose_styles(student_responses)
+    return {number: section_fingerprint(student_responses, number, persona, selection)
+            for number in section_numbers()}
+
+
+def load_section_state(student_id, storage=None):
+    """Load a student's section state, or None if there is none.
+
+    Args:
+        student_id (str): Student ID
+        storage (StorageBackend, optional): Defaults to get_storage()
+    """
+    return (storage or get_storage()).load_section_state(student_id)
+
+
+def save_section_state(student_id, statement_name, fingerprints, styles=None, storage=None):
+    """Record which inputs the sections of a statement were generated from.
+
+    Args:
+        student_id (str): Student ID
+        statement_name (str): Name of the statement the fingerprints belong to
+        fingerprints (dict): Section number -> fingerprint
+        styles (dict, optional): The style selection the statement was generated with
+        storage (StorageBackend, optional): Defaults to get_storage()
+    """
+    (storage or get_storage()).save_section_state(student_id, {
+        'statement_file': statement_name,
+        'updated': datetime.now().isoformat(),
+        'sections': fingerprints,
+        'styles': styles,
+    })
+
+
+def split_sections(text):
+    """Split a statement into its numbered sections.
+
+    Returns:
+        dict: Section number -> section text, starting with its heading
+    """
+    sections = {}
+    current = None
+    for line in text.splitlines():
+        match = re.match(r'^##\s+(\d+\.\d+)\b', line.strip())
+        if match:
+            current = match.group(1)
+            sections[current] = []
+        if current is not None:
+            sections[current].append(line)
+    return {number: '\n'.join(lines).strip() for number, lines in sections.items()}
+
+
+def find_latest_statement(student_id, storage=None):
+    """Return the statement the section state refers to, else the newest statement.
+
+    Returns:
+        tuple: (name, text), or None if the student has no statement
+    """
+    storage = storage or get_storage()
+    state = storage.load_section_state(student_id)
+    if state and state.get('statement_file'):
+        latest = storage.load_statement(student_id, state['statement_file'])
+        if latest:
+            return latest
+    return storage.load_statement(student_id)
+
+
+def changed_sections(student_responses, student_id, persona=None, storage=None):
+    """Return the sections whose inputs differ from those of the latest statement.
+
+    Sections are also reported as changed if there is no recorded state or the
+    latest statement is missing them.
+    """
+    storage = storage or get_storage()
+    fingerprints = section_fingerprints(student_responses, persona)
+    state = storage.load_section_state(student_id) or {}
+    recorded = state.get('sections', {})
+    latest = find_latest_statement(student_id, storage)
+    existing = split_sections(latest[1]) if latest else {}
+    return [number for number in section_numbers()
+            if recorded.get(number) != fingerprints[number] or number not in existing]
+
+
+def regenerate_changed_sections(student_responses, student_id, project_title=None,
+                                workers=DEFAULT_SECTION_WORKERS, use_cache=True, stats=None,
+                                storage=None):
+    """Regenerate only the sections whose answers changed and splice them in.
+
+    The unchanged sections are copied from the latest statement, and the result
+    is saved as a new timestamped statement so earlier versions are kept.
+
+    Args:
+        student_responses (dict): Student responses
+        student_id (str): Student ID the statements are saved under
+        project_title (str, optional): Title for the document heading. Defaults to q1.
+        workers (int): Number of concurrent section generations
+        use_cache (bool): Set to False to bypass the generation cache
+        stats (dict, optional): Filled as by generate_sections(), plus 'regenerated'
+        storage (StorageBackend, optional): Defaults to get_storage()
+
+    Returns:
+        The new statement's ref (see StorageBackend.save_statement), or None if no
+        section changed
+    """
+    stats = stats if stats is not None else {}
+    storage = storage or get_storage()
+    project_title = project_title or student_responses.get('q1')
+    persona = choose_persona(student_responses)
+    selection = choose_styles(student_responses)
+
+    changed = changed_sections(student_responses, student_id, persona, storage)
+    stats['regenerated'] = changed
+    if not changed:
+        return None
+
+    latest = find_latest_statement(student_id, storage)
+    sections = split_sections(latest[1]) if latest else {}
+    sections.update(generate_sections(student_responses, workers=workers, use_cache=use_cache,
+                                      persona=persona, sections=changed, stats=stats,
+                                      selection=selection))
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    name = statement_filename(project_title, timestamp)
+    output_ref = storage.save_statement(
+        student_id, name,
+        statement_header(student_responses, selection) + stitch_sections(project_title, sections))
+    save_section_state(student_id, name,
+                       section_fingerprints(student_responses, persona, selection), selection,
+                       storage)
+    return output_ref
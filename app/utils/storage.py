@@ -0,0 +1,584 @@
+"""
+Pluggable storage for responses and generated statements.
+
+Saving, loading, listing and renaming responses and statements go through a
+``StorageBackend`` so the rest of the application doesn't deal with file paths
+or responses formats. Records are identified by a *ref*: a ``Path`` for the
+filesystem backend and the record name for the SQLite backend.
+
+- ``files`` (default): JSON and Markdown files under ``app/data``, in the flat or
+  sharded layout, with the response catalog for listing.
+- ``sqlite``: one SQLite database (``app/data/portfolio.db``) in WAL mode, with
+  indexed student ID and timestamp columns and every save in a transaction.
+
+Both also keep each student's section state (see app.utils.section_generation).
+
+Select the backend with the ``PORTFOLIO_STORAGE`` setting (environment or .env;
+``files`` or ``sqlite``; ``PORTFOLIO_DATABASE`` sets the database file) or with
+``set_storage()``.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from app.app_config import (
+    DATABASE_FILE, GENERATED_DIR, RESPONSES_DIR, find_student_generated_dir,
+    iter_student_dirs, student_responses_dir
+)
+from app.settings import get_settings
+from app.utils.answer_journal import write_json_atomic
+from app.utils.portfolio_listing import STATEMENT_PATTERN, get_portfolio_index
+from app.utils.response_catalog import (
+    FORMAT_METADATA, ResponseCatalog, get_response_catalog, parse_responses_data
+)
+
+# Per-student file of the files backend recording the section fingerprints of
+# the latest statement
+SECTION_STATE_FILE = 'section_state.json'
+
+
+class StorageBackend:
+    """Interface every storage backend implements."""
+
+    #: Short name used in PORTFOLIO_STORAGE
+    name = 'base'
+
+    def responses_ref(self, student_id, name):
+        """Return the ref a responses record with this name is saved under."""
+        raise NotImplementedError
+
+    def find_responses(self, name):
+        """Find a responses record by name (or, for files, by path).
+
+        Returns:
+            The record's ref, or None
+        """
+        raise NotImplementedError
+
+    def responses_exists(self, ref):
+        """Check whether a responses record exists."""
+        raise NotImplementedError
+
+    def save_responses(self, student_id, project_title, responses, name):
+        """Save a student's responses, replacing any record with the same name.
+
+        Args:
+            student_id (str): Student ID
+            project_title (str): Project title
+            responses (dict): Question id -> answer
+            name (str): Record name, e.g. '<title>_<student_id>.json'
+
+        Returns:
+            The saved record's ref
+        """
+        raise NotImplementedError
+
+    def load_responses(self, ref):
+        """Load a responses record.
+
+        Returns:
+            dict: 'ref', 'student_id', 'project_title', 'timestamp', 'responses'
+                and 'format' (see parse_responses_data)
+
+        Raises:
+            FileNotFoundError: If there is no such record
+        """
+        raise NotImplementedError
+
+    def list_responses(self):
+        """Return every responses record, newest first.
+
+        Returns:
+            list: Dicts with 'ref', 'name', 'student_id', 'project_title',
+                'timestamp', 'size' and 'format'
+        """
+        raise NotImplementedError
+
+    def latest_responses(self, student_id):
+        """Return the ref of a student's newest responses record, or None."""
+        raise NotImplementedError
+
+    def search_responses(self, text):
+        """Return the records whose student ID or name contains some text, newest first."""
+        return [entry for entry in self.list_responses()
+                if text in entry['name'] or text in str(entry['student_id'] or '')]
+
+    def rename_responses(self, ref, new_name, project_title=None):
+        """Rename a responses record, recording a project title if it has none.
+
+        Returns:
+            The record's new ref
+        """
+        raise NotImplementedError
+
+    def save_statement(self, student_id, name, text):
+        """Save a generated statement.
+
+        Returns:
+            The saved statement's ref
+        """
+        raise NotImplementedError
+
+    def list_statements(self):
+        """Return (student_id, name) for every generated statement."""
+        raise NotImplementedError
+
+    def list_portfolios(self, offset=0, limit=None):
+        """Return one listing row per student with statements, by student ID (newest first).
+
+        The latest statement is the one with the newest timestamp in its name.
+
+        Args:
+            offset (int): Number of rows to skip
+            limit (int, optional): Maximum number of rows
+
+        Returns:
+            list: Dicts with 'id', 'statements' (count) and 'latest' (name)
+        """
+        rows = {}
+        for order, (student_id, name) in enumerate(self.list_statements()):
+            match = STATEMENT_PATTERN.match(name)
+            key = (match.group('timestamp') if match else '', order)
+            row = rows.setdefault(student_id, {'id': student_id, 'statements': 0,
+                                               'latest': None, 'key': None})
+            row['statements'] += 1
+            if row['key'] is None or key > row['key']:
+                row['key'], row['latest'] = key, name
+        end = None if limit is None else offset + limit
+        return [{'id': row['id'], 'statements': row['statements'], 'latest': row['latest']}
+                for row in sorted(rows.values(), key=lambda row: row['id'], reverse=True)
+                [offset:end]]
+
+    def count_portfolios(self):
+        """Return the number of rows list_portfolios() would return without a limit."""
+        return len({student_id for student_id, _ in self.list_statements()})
+
+    def read_statement(self, student_id, name):
+        """Return the text of a generated statement."""
+        raise NotImplementedError
+
+    def load_statement(self, student_id, name=None):
+        """Load a student's statement, or their newest one if no name is given.
+
+        Returns:
+            tuple: (name, text), or None if there is no such statement
+        """
+        raise NotImplementedError
+
+    def rename_statement(self, student_id, name, new_name):
+        """Rename a generated statement."""
+        raise NotImplementedError
+
+    def load_section_state(self, student_id):
+        """Return a student's section state (a dict), or None if there is none."""
+        raise NotImplementedError
+
+    def save_section_state(self, student_id, state):
+        """Replace a student's section state."""
+        raise NotImplementedError
+
+
+class FileStorage(StorageBackend):
+    """JSON responses files and Markdown statements under the data directory."""
+
+    name = 'files'
+
+    def __init__(self, responses_dir=None, generated_dir=None, catalog=None):
+        """Initialise the backend.
+
+        Args:
+            responses_dir (Path, optional): Responses root. Defaults to RESPONSES_DIR.
+            generated_dir (Path, optional): Statements root. Defaults to GENERATED_DIR.
+            catalog (ResponseCatalog, optional): Catalog of responses_dir. Defaults
+                to the process-wide catalog for RESPONSES_DIR.
+        """
+        self.responses_dir = Path(responses_dir) if responses_dir else RESPONSES_DIR
+        self.generated_dir = Path(generated_dir) if generated_dir else GENERATED_DIR
+        if catalog is None:
+            catalog = (get_response_catalog() if self.responses_dir == RESPONSES_DIR
+                       else ResponseCatalog(self.responses_dir))
+        self.catalog = catalog
+
+    def responses_ref(self, student_id, name):
+        return student_responses_dir(student_id, self.responses_dir) / name
+
+    def find_responses(self, name):
+        path = Path(name)
+        # A bare name is looked for in the responses directory first
+        candidates = (self.responses_dir / path.name, path) if path.parent == Path('.') else (path,)
+        for candidate in candidates:
+            if candidate.is_file():
+                return candidate
+        # Saved in a shard of the sharded layout
+        for entry in self.catalog.entries():
+            if entry['name'] == path.name:
+                return entry['file']
+        return None
+
+    def responses_exists(self, ref):
+        return Path(ref).is_file()
+
+    def save_responses(self, student_id, project_title, responses, name):
+        path = self.responses_ref(student_id, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(path, {
+            'student_id': student_id,
+            'project_title': project_title,
+            'timestamp': datetime.now().isoformat(),
+            'responses': responses
+        })
+        self.catalog.record(path)
+        return path
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_responses(self, ref):
+        path = Path(ref)
+        record = parse_responses_data(self._read(path))
+        record['ref'] = path
+        return record
+
+    def list_responses(self):
+        return [dict(entry, ref=entry['file']) for entry in self.catalog.entries()]
+
+    def latest_responses(self, student_id):
+        return self.catalog.latest(student_id)
+
+    def search_responses(self, text):
+        return [dict(entry, ref=entry['file']) for entry in self.catalog.search(text)]
+
+    def rename_responses(self, ref, new_name, project_title=None):
+        path = Path(ref)
+        data = self._read(path)
+        if project_title and isinstance(data, dict) and 'project_title' not in data:
+            data['project_title'] = project_title
+            write_json_atomic(path, data)
+        new_path = path.parent / new_name
+        if new_path != path:
+            os.rename(path, new_path)
+        return new_path
+
+    def save_statement(self, student_id, name, text):
+        output_dir = find_student_generated_dir(student_id, self.generated_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        output_file = output_dir / name
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return output_file
+
+    def list_statements(self):
+        statements = []
+        for student_id, path in iter_student_dirs(self.generated_dir):
+            try:
+                with os.scandir(path) as it:
+                    statements.extend((student_id, entry.name) for entry in it
+                                      if STATEMENT_PATTERN.match(entry.name) and entry.is_file())
+            except FileNotFoundError:
+                continue
+        return statements
+
+    def list_portfolios(self, offset=0, limit=None):
+        if self.generated_dir != GENERATED_DIR:
+            return super().list_portfolios(offset, limit)
+        # The cached index only looks inside the directories on the page; it also
+        # lists students whose directory has no statements yet
+        return [{'id': row['id'], 'statements': row['statements'], 'latest': row['latest']}
+                for row in get_portfolio_index().iter_rows(offset, limit)]
+
+    def count_portfolios(self):
+        if self.generated_dir != GENERATED_DIR:
+            return super().count_portfolios()
+        return get_portfolio_index().count()
+
+    def read_statement(self, student_id, name):
+        path = find_student_generated_dir(student_id, self.generated_dir) / name
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def load_statement(self, student_id, name=None):
+        output_dir = find_student_generated_dir(student_id, self.generated_dir)
+        if name is None:
+            statements = sorted((path for path in output_dir.glob('*.md')
+                                 if STATEMENT_PATTERN.match(path.name)),
+                                key=lambda path: (path.stat().st_mtime, path.name))
+            if not statements:
+                return None
+            name = statements[-1].name
+        try:
+            return name, self.read_statement(student_id, name)
+        except FileNotFoundError:
+            return None
+
+    def rename_statement(self, student_id, name, new_name):
+        output_dir = find_student_generated_dir(student_id, self.generated_dir)
+        os.rename(output_dir / name, output_dir / new_name)
+
+    def load_section_state(self, student_id):
+        path = find_student_generated_dir(student_id, self.generated_dir) / SECTION_STATE_FILE
+        try:
+            return self._read(path)
+        except (OSError, ValueError):
+            return None
+
+    def save_section_state(self, student_id, state):
+        output_dir = find_student_generated_dir(student_id, self.generated_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        write_json_atomic(output_dir / SECTION_STATE_FILE, state)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    student_id TEXT,
+    project_title TEXT,
+    timestamp TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_student ON responses (student_id, timestamp);
+CREATE INDEX IF NOT EXISTS responses_timestamp ON responses (timestamp);
+CREATE TABLE IF NOT EXISTS statements (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    text TEXT NOT NULL,
+    UNIQUE (student_id, name)
+);
+CREATE INDEX IF NOT EXISTS statements_student ON statements (student_id, timestamp);
+CREATE TABLE IF NOT EXISTS section_state (
+    student_id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStorage(StorageBackend):
+    """Responses and statements in a single SQLite database."""
+
+    name = 'sqlite'
+
+    def __init__(self, path=None, wal=True, timeout=30.0):
+        """Initialise the backend; the database is opened on first use.
+
+        Args:
+            path (Path, optional): Database file. Defaults to DATABASE_FILE.
+            wal (bool): Use write-ahead logging, so readers never wait for a save.
+                WAL needs every process on the same machine; turn it off for a
+                database shared between machines over a network drive.
+            timeout (float): Seconds to wait for another process's save
+        """
+        self.path = Path(path) if path else DATABASE_FILE
+        self.wal = wal
+        self.timeout = timeout
+        self._lock = threading.RLock()
+        self._conn = None
+
+    @property
+    def conn(self):
+        """The database connection, opened and migrated on first use."""
+        with self._lock:
+            if self._conn is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                # Autocommit mode; writes open their own transactions in _write()
+                conn = sqlite3.connect(str(self.path), timeout=self.timeout,
+                                       isolation_level=None, check_same_thread=False)
+                conn.row_factory = sqlite3.Row
+                conn.execute(f"PRAGMA journal_mode={'WAL' if self.wal else 'DELETE'}")
+                conn.execute("PRAGMA synchronous=NORMAL" if self.wal else "PRAGMA synchronous=FULL")
+                conn.executescript(SQLITE_SCHEMA)
+                self._conn = conn
+            return self._conn
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    @contextmanager
+    def _write(self):
+        """Run statements in one transaction, taking the write lock up front."""
+        with self._lock:
+            conn = self.conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _name(ref):
+        return ref.name if isinstance(ref, Path) else str(ref)
+
+    def responses_ref(self, student_id, name):
+        return name
+
+    def find_responses(self, name):
+        name = Path(name).name
+        return name if self.responses_exists(name) else None
+
+    def responses_exists(self, ref):
+        return bool(self._query("SELECT 1 FROM responses WHERE name = ?", (self._name(ref),)))
+
+    def save_responses(self, student_id, project_title, responses, name):
+        data = json.dumps(responses)
+        with self._write() as conn:
+            conn.execute("DELETE FROM responses WHERE name = ?", (name,))
+            conn.execute(
+                "INSERT INTO responses (name, student_id, project_title, timestamp, data) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (name, student_id, project_title, datetime.now().isoformat(), data))
+        return name
+
+    def load_responses(self, ref):
+        name = self._name(ref)
+        rows = self._query(
+            "SELECT student_id, project_title, timestamp, data FROM responses WHERE name = ?",
+            (name,))
+        if not rows:
+            raise FileNotFoundError(f"No responses named {name} in {self.path}")
+        row = rows[0]
+        return {'ref': name, 'student_id': row['student_id'],
+                'project_title': row['project_title'], 'timestamp': row['timestamp'],
+                'responses': json.loads(row['data']), 'format': FORMAT_METADATA}
+
+    def _entries(self, where='', params=()):
+        rows = self._query(
+            "SELECT name, student_id, project_title, timestamp, length(data) AS size "
+            f"FROM responses {where} ORDER BY timestamp DESC, id DESC", params)
+        return [{'ref': row['name'], 'name': row['name'], 'student_id': row['student_id'],
+                 'project_title': row['project_title'], 'timestamp': row['timestamp'],
+                 'size': row['size'], 'format': FORMAT_METADATA} for row in rows]
+
+    def list_responses(self):
+        return self._entries()
+
+    def latest_responses(self, student_id):
+        rows = self._query("SELECT name FROM responses WHERE student_id = ? "
+                           "ORDER BY timestamp DESC, id DESC LIMIT 1", (student_id,))
+        return rows[0]['name'] if rows else None
+
+    def search_responses(self, text):
+        # instr() rather than LIKE, so '%' and '_' in the text match literally
+        return self._entries("WHERE instr(name, ?) > 0 OR instr(student_id, ?) > 0",
+                             (text, text))
+
+    def rename_responses(self, ref, new_name, project_title=None):
+        with self._write() as conn:
+            if project_title:
+                conn.execute("UPDATE responses SET project_title = ? "
+                             "WHERE name = ? AND project_title IS NULL",
+                             (project_title, self._name(ref)))
+            conn.execute("UPDATE responses SET name = ? WHERE name = ?",
+                         (new_name, self._name(ref)))
+        return new_name
+
+    def save_statement(self, student_id, name, text):
+        match = STATEMENT_PATTERN.match(name)
+        if match:
+            timestamp = match.group('timestamp')
+        else:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        with self._write() as conn:
+            conn.execute("DELETE FROM statements WHERE student_id = ? AND name = ?",
+                         (student_id, name))
+            conn.execute("INSERT INTO statements (student_id, name, timestamp, text) "
+                         "VALUES (?, ?, ?, ?)", (student_id, name, timestamp, text))
+        return name
+
+    def list_statements(self):
+        rows = self._query("SELECT student_id, name FROM statements "
+                           "ORDER BY student_id, timestamp")
+        return [(row['student_id'], row['name']) for row in rows]
+
+    def read_statement(self, student_id, name):
+        rows = self._query("SELECT text FROM statements WHERE student_id = ? AND name = ?",
+                           (student_id, name))
+        if not rows:
+            raise FileNotFoundError(f"No statement {name} for {student_id} in {self.path}")
+        return rows[0]['text']
+
+    def load_statement(self, student_id, name=None):
+        if name is None:
+            rows = self._query("SELECT name, text FROM statements WHERE student_id = ? "
+                               "ORDER BY timestamp DESC, id DESC LIMIT 1", (student_id,))
+        else:
+            rows = self._query("SELECT name, text FROM statements "
+                               "WHERE student_id = ? AND name = ?", (student_id, name))
+        return (rows[0]['name'], rows[0]['text']) if rows else None
+
+    def rename_statement(self, student_id, name, new_name):
+        with self._write() as conn:
+            conn.execute("UPDATE statements SET name = ? WHERE student_id = ? AND name = ?",
+                         (new_name, student_id, name))
+
+    def load_section_state(self, student_id):
+        rows = self._query("SELECT data FROM section_state WHERE student_id = ?", (student_id,))
+        return json.loads(rows[0]['data']) if rows else None
+
+    def save_section_state(self, student_id, state):
+        with self._write() as conn:
+            conn.execute("INSERT OR REPLACE INTO section_state (student_id, data) VALUES (?, ?)",
+                         (student_id, json.dumps(state)))
+
+
+def sqlite_storage_from_env():
+    """Build an SQLiteStorage from the PORTFOLIO_DATABASE and PORTFOLIO_SQLITE_WAL settings."""
+    settings = get_settings()
+    return SQLiteStorage(path=settings.database_file, wal=settings.sqlite_wal)
+
+
+_STORAGE_FACTORIES = {
+    'files': FileStorage,
+    'sqlite': sqlite_storage_from_env,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    """Return the process-wide storage backend, creating it on first use."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            name = get_settings().storage_backend or 'files'
+            if name not in _STORAGE_FACTORIES:
+                raise ValueError(
+                    f"Unknown PORTFOLIO_STORAGE '{name}'. "
+                    f"Choose one of: {', '.join(sorted(_STORAGE_FACTORIES))}"
+                )
+            _storage = _STORAGE_FACTORIES[name]()
+        return _storage
+
+
+def set_storage(storage):
+    """Replace the process-wide storage backend.
+
+    Args:
+        storage (StorageBackend or str): Backend instance, or 'files' / 'sqlite'
+
+    Returns:
+        StorageBackend: The backend now in use
+    """
+    global _storage
+    if isinstance(storage, str):
+        storage = _STORAGE_FACTORIES[storage]()
+    with _storage_lock:
+        _storage = storage
+    return storage
@@ -0,0 +1,93 @@
+"""
+Terminal rendering for the questionnaire.
+
+The question panel is redrawn in place with ANSI escape sequences: the cursor is
+moved home, every line is written over the previous frame and cleared to its end,
+and whatever is left below is cleared. The whole frame goes out in one write, so
+there is no blank flash between questions and no ``cls``/``clear`` process is
+spawned. Terminals that can't interpret ANSI (``TERM=dumb``, pipes, old Windows
+consoles) get the plain text with a separator line instead.
+"""
+
+import os
+import sys
+
+CURSOR_HOME = '\x1b[H'
+CLEAR_LINE = '\x1b[K'
+CLEAR_BELOW = '\x1b[J'
+
+PROGRESS_WIDTH = 30
+
+
+def _enable_windows_ansi():
+    """Turn on ANSI processing in the Windows console; returns False if unavailable."""
+    try:
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)  # STD_OUTPUT_HANDLE
+        mode = ctypes.c_uint32()
+        if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            return False
+        # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+        return bool(kernel32.SetConsoleMode(handle, mode.value | 0x0004))
+    except (AttributeError, OSError):
+        return False
+
+
+def supports_ansi(stream=None):
+    """Check whether a stream is a terminal that understands ANSI escape sequences."""
+    stream = stream or sys.stdout
+    if os.getenv('TERM', '').lower() == 'dumb':
+        return False
+    try:
+        if not stream.isatty():
+            return False
+    except (AttributeError, ValueError):
+        return False
+    if os.name == 'nt':
+        return _enable_windows_ansi()
+    return True
+
+
+def progress_bar(done, total, width=PROGRESS_WIDTH):
+    """Return a text progress bar such as ``[#########-----] 18/28``.
+
+    Args:
+        done (int): Completed items
+        total (int): Total items
+        width (int): Number of characters between the brackets
+    """
+    filled = width * done // total if total else width
+    return f"[{'#' * filled}{'-' * (width - filled)}] {done}/{total}"
+
+
+class TerminalRenderer:
+    """Draws full-screen frames, in place on ANSI terminals."""
+
+    def __init__(self, stream=None, ansi=None):
+        """Initialise the renderer.
+
+        Args:
+            stream (file, optional): Output stream. Defaults to sys.stdout.
+            ansi (bool, optional): Force ANSI on or off. Detected on the first
+                frame if not given.
+        """
+        self.stream = stream
+        self.ansi = ansi
+
+    def render(self, lines):
+        """Replace the previous frame with these lines.
+
+        Args:
+            lines (list): Lines of text (embedded newlines start new rows)
+        """
+        stream = self.stream or sys.stdout
+        if self.ansi is None:
+            self.ansi = supports_ansi(stream)
+        rows = [row for line in lines for row in str(line).split('\n')]
+        if self.ansi:
+            frame = CURSOR_HOME + ''.join(f"{row}{CLEAR_LINE}\n" for row in rows) + CLEAR_BELOW
+        else:
+            frame = '\n' + '=' * 50 + '\n' + ''.join(f"{row}\n" for row in rows)
+        stream.write(frame)
+        stream.flush()
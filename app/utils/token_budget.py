@@ -0,0 +1,180 @@
+"""
+Offline prompt token estimation and budgeting.
+
+Estimates how many input tokens a prompt will use without calling the API, and
+trims the student responses embedded in a prompt when it would exceed the token
+budget for the model. The trimming policy runs in order and stops as soon as the
+prompt fits:
+
+1. Compact the responses JSON (no indentation)
+2. Drop empty answers
+3. Keep only the answers the sections being generated refer to
+4. Truncate the longest answers
+"""
+
+import functools
+import json
+import re
+
+from app.settings import get_settings
+
+# Input token limits of the models the app falls back through
+MODEL_INPUT_LIMITS = {
+    'gemini-2.5-flash': 1048576,
+    'gemini-1.5-flash': 1048576,
+    'gemini-1.5-pro': 2097152,
+    'gemini-pro': 30720,
+}
+
+# Marker appended to answers shortened by the truncation step
+TRUNCATION_MARKER = " [...]"
+
+# Each match is one token: letters in chunks of up to six, digits in chunks of up to
+# three, and single punctuation marks, symbols, newlines or runs of indentation
+_TOKEN_PATTERN = re.compile(r"[A-Za-z]{1,6}|\d{1,3}|[^\sA-Za-z\d]|\n| {2,}")
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in a piece of text.
+
+    Words count as one token plus one for every further six letters, digits count
+    per three, and every punctuation mark, symbol, newline or run of indentation
+    counts as one. This tracks SentencePiece-style tokenizers closely enough for
+    budgeting English prose and JSON.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+@functools.lru_cache(maxsize=4096)
+def estimate_static_tokens(text):
+    """estimate_tokens() for text that doesn't change between prompts, memoised."""
+    return estimate_tokens(text)
+
+
+def get_token_budget(model_name=None):
+    """Return the prompt token budget for a model.
+
+    The budget is the PORTFOLIO_TOKEN_BUDGET setting (or DEFAULT_TOKEN_BUDGET if
+    it is unset or not an integer), capped by the model's input limit when the
+    model is known.
+
+    Args:
+        model_name (str, optional): Model the prompt is for
+
+    Returns:
+        int: Maximum estimated input tokens
+    """
+    budget = get_settings().token_budget
+    if model_name:
+        matches = [name for name in MODEL_INPUT_LIMITS if name in model_name]
+        if matches:
+            budget = min(budget, MODEL_INPUT_LIMITS[max(matches, key=len)])
+    return budget
+
+
+def _is_empty(value):
+    if isinstance(value, str):
+        return not value.strip()
+    return value is None or value == [] or value == {}
+
+
+def _truncate(responses, max_chars):
+    return {
+        key: value[:max_chars].rstrip() + TRUNCATION_MARKER
+        if isinstance(value, str) and len(value) > max_chars else value
+        for key, value in responses.items()
+    }
+
+
+def fit_responses(student_responses, fixed_tokens, budget, question_ids=None, count=True,
+                  inline=()):
+    """Serialise responses for a prompt, trimming them until the prompt fits the budget.
+
+    Args:
+        student_responses (dict): Student responses
+        fixed_tokens (int): Estimated tokens of the rest of the prompt
+        budget (int): Maximum estimated tokens for the whole prompt
+        question_ids (iterable, optional): The questions the prompt refers to,
+            used by the "referenced only" step
+        count (bool): Set to False to skip estimating responses that clearly fit;
+            their token count is then returned as None
+        inline (iterable): Questions whose answers the prompt also quotes outside the
+            responses JSON. The quotes are counted against the budget and are trimmed
+            with the JSON, so the caller should quote the answers from the returned text.
+
+    Returns:
+        tuple: (responses JSON text, estimated tokens of that text and the inline
+            quotes, list of the trimming steps applied)
+    """
+    inline = tuple(inline)
+
+    def serialise(responses, compact):
+        if compact:
+            return json.dumps(responses, separators=(',', ':'))
+        return json.dumps(responses, indent=2)
+
+    def measure(responses, text):
+        return estimate_tokens(text) + sum(estimate_tokens(str(responses.get(key, '')))
+                                           for key in inline)
+
+    text = serialise(student_responses, compact=False)
+    # Every token covers at least one character, so short text always fits
+    inline_chars = sum(len(str(student_responses.get(key, ''))) for key in inline)
+    if not count and fixed_tokens + len(text) + inline_chars <= budget:
+        return text, None, []
+    tokens = measure(student_responses, text)
+    steps = []
+    if fixed_tokens + tokens <= budget:
+        return text, tokens, steps
+
+    responses = student_responses
+    trims = [
+        ('compact_json', lambda r: r),
+        ('drop_empty', lambda r: {k: v for k, v in r.items() if not _is_empty(v)}),
+    ]
+    if question_ids is not None:
+        # Quoted answers are referenced by definition
+        referenced = set(question_ids).union(inline)
+        trims.append(('referenced_only',
+                      lambda r: {k: v for k, v in r.items() if k in referenced}))
+
+    for step, trim in trims:
+        trimmed = trim(responses)
+        if step != 'compact_json' and len(trimmed) == len(responses):
+            continue
+        responses = trimmed
+        steps.append(step)
+        text = serialise(responses, compact=True)
+        tokens = measure(responses, text)
+        if fixed_tokens + tokens <= budget:
+            return text, tokens, steps
+
+    # Truncate answers to the longest length that fits (binary search on characters)
+    longest = max((len(v) for v in responses.values() if isinstance(v, str)), default=0)
+    low, high = 0, longest
+    best = None
+    while low <= high:
+        max_chars = (low + high) // 2
+        truncated = _truncate(responses, max_chars)
+        candidate = serialise(truncated, compact=True)
+        candidate_tokens = measure(truncated, candidate)
+        if fixed_tokens + candidate_tokens <= budget:
+            best = (candidate, candidate_tokens)
+            low = max_chars + 1
+        else:
+            high = max_chars - 1
+    if best is not None:
+        steps.append('truncate')
+        return best[0], best[1], steps
+
+    # Even empty answers don't fit; send the shortest version and let the caller see it
+    steps.append('over_budget')
+    truncated = _truncate(responses, 0)
+    text = serialise(truncated, compact=True)
+    return text, measure(truncated, text), steps
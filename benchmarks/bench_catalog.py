@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark for listing responses files.
+
+Compares the previous listing, which parsed every responses file, with the
+response catalog on a cold start, an unchanged directory and a directory with
+one new file.
+
+Usage:
+    python benchmarks/bench_catalog.py --files 20000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.response_catalog import ResponseCatalog
+
+def parse_every_file(responses_dir):
+    """The previous list_response_files: json.load and stat every file."""
+    responses = []
+    for response_file in responses_dir.glob('*.json'):
+        if response_file.is_file():
+            with open(response_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            responses.append({'file': response_file, 'student_id': data.get('student_id'),
+                              'size': response_file.stat().st_size})
+    return responses
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:9.1f} ms  ({len(result)} files)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Responses listing benchmark")
+    parser.add_argument('--files', type=int, default=20000)
+    args = parser.parse_args()
+
+    answer = "A fairly long answer to a questionnaire question. " * 20
+    with tempfile.TemporaryDirectory() as tmp:
+        responses_dir = Path(tmp) / 'responses'
+        responses_dir.mkdir()
+        for i in range(args.files):
+            student_id = f"2025{i:08d}"
+            with open(responses_dir / f"project_{student_id}.json", 'w', encoding='utf-8') as f:
+                json.dump({'student_id': student_id, 'project_title': 'Project',
+                           'timestamp': '2025-01-01T09:00:00',
+                           'responses': {f'q{q}': answer for q in range(1, 29)}}, f)
+        # Backdate the directory so the catalog trusts its mtime straight away
+        past = time.time() - 60
+        os.utime(responses_dir, (past, past))
+        index_file = Path(tmp) / 'catalog.json'
+
+        timed("parse every file", lambda: parse_every_file(responses_dir))
+        timed("catalog, cold", lambda: ResponseCatalog(responses_dir, index_file).entries())
+        catalog = ResponseCatalog(responses_dir, index_file)
+        timed("catalog, new process", catalog.entries)
+        timed("catalog, unchanged", catalog.entries)
+        with open(responses_dir / "project_new.json", 'w', encoding='utf-8') as f:
+            json.dump({'student_id': 'new', 'responses': {}}, f)
+        timed("catalog, one new file", catalog.entries)
+
+if __name__ == "__main__":
+    main()
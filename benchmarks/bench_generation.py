@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark for the generation pipeline.
+
+Runs the batch and streaming paths against the deterministic mock backend, so
+throughput and latency can be measured without network access or an API key.
+
+Usage:
+    python benchmarks/bench_generation.py --students 40 --latency 0.5 --token-rate 400
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Never serve benchmark runs from the generation cache
+os.environ['PORTFOLIO_DISABLE_CACHE'] = '1'
+
+from app.utils.batch_generation import run_batch
+from app.utils.gemini_utils import stream_statement
+from app.utils.generation_backends import MockBackend, set_backend
+from app.utils.generate_statement_prompt import generate_prompt, get_mock_student_responses
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.storage import FileStorage
+
+def write_synthetic_responses(directory, count):
+    """Write `count` responses files based on the mock student responses."""
+    base = get_mock_student_responses()
+    paths = []
+    for i in range(count):
+        student_id = f"bench_{i:05d}"
+        responses = dict(base, q1=f"{base['q1']} {i}")
+        path = Path(directory) / f"bench_project_{student_id}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'student_id': student_id, 'project_title': responses['q1'],
+                       'responses': responses}, f)
+        paths.append(path)
+    return paths
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+def quiet():
+    """Keep per-call log lines out of the benchmark output."""
+    return contextlib.redirect_stdout(io.StringIO())
+
+def bench_batch(paths, storage, workers):
+    with quiet():
+        start = time.perf_counter()
+        results = run_batch(paths, workers=workers, storage=storage)
+        wall = time.perf_counter() - start
+    latencies = [r['latency'] for r in results]
+    failed = sum(1 for r in results if not r['ok'])
+    print(f"batch  workers={workers:<3} wall={wall:6.2f}s  "
+          f"throughput={len(paths) / wall:6.2f}/s  "
+          f"p50={percentile(latencies, 50):5.2f}s  p95={percentile(latencies, 95):5.2f}s  "
+          f"failed={failed}")
+
+def bench_stream(output_root, runs):
+    prompt = generate_prompt(get_mock_student_responses())
+    ttfts, totals = [], []
+    with quiet():
+        for i in range(runs):
+            stats = {}
+            stream_statement(prompt + f"\n<!-- run {i} -->", Path(output_root) / f"stream_{i}.md",
+                             echo=False, stats=stats)
+            ttfts.append(stats['time_to_first_token'])
+            totals.append(stats['total_time'])
+    print(f"stream runs={runs:<6} time-to-first-token={statistics.mean(ttfts):5.2f}s  "
+          f"complete={statistics.mean(totals):5.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline generation benchmark")
+    parser.add_argument('--students', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16])
+    parser.add_argument('--latency', type=float, default=0.5,
+                        help='Mock time to first token in seconds')
+    parser.add_argument('--token-rate', type=float, default=400,
+                        help='Mock output tokens per second')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Probability of an injected 503 per call')
+    parser.add_argument('--stream-runs', type=int, default=3)
+    args = parser.parse_args()
+
+    set_backend(MockBackend(latency=args.latency, tokens_per_second=args.token_rate,
+                            error_rate=args.error_rate))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        responses_dir = Path(tmp) / 'responses'
+        output_root = Path(tmp) / 'generated'
+        responses_dir.mkdir()
+        output_root.mkdir()
+        paths = write_synthetic_responses(responses_dir, args.students)
+        storage = FileStorage(responses_dir, output_root,
+                              ResponseCatalog(responses_dir, Path(tmp) / 'catalog.json'))
+
+        for workers in args.workers:
+            bench_batch(paths, storage, workers)
+        bench_stream(output_root, args.stream_runs)
+
+if __name__ == "__main__":
+    main()
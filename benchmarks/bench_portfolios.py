@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark for listing student portfolios.
+
+Compares the previous listing, which globbed every student directory, with the
+portfolio index on a cold start, a warm cache and a single page.
+
+Usage:
+    python benchmarks/bench_portfolios.py --students 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.portfolio_listing import PortfolioIndex
+
+def glob_every_dir(generated_dir):
+    """The previous list_student_portfolios: glob each student directory."""
+    students = []
+    for student_dir in generated_dir.glob('*'):
+        if student_dir.is_dir():
+            statements = list(student_dir.glob('statement_of_intent_*.md'))
+            students.append({'id': student_dir.name, 'statements': len(statements),
+                             'latest': max(statements).name if statements else None})
+    students.sort(key=lambda x: x['id'], reverse=True)
+    return students
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<32} {(time.perf_counter() - start) * 1000:9.1f} ms  ({len(result)} rows)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio listing benchmark")
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--statements', type=int, default=3)
+    args = parser.parse_args()
+
+    past = time.time() - 60
+    with tempfile.TemporaryDirectory() as tmp:
+        generated_dir = Path(tmp) / 'generated'
+        for i in range(args.students):
+            student_dir = generated_dir / f"2025{i:08d}"
+            student_dir.mkdir(parents=True)
+            for s in range(args.statements):
+                name = f"project_statement_of_intent_2025010{s}_090000.md"
+                (student_dir / name).write_text("# Statement of Intent\n", encoding='utf-8')
+            # Backdate the directory so the index trusts its mtime straight away
+            os.utime(student_dir, (past, past))
+        index_file = Path(tmp) / 'portfolio_index.json'
+
+        timed("glob every directory", lambda: glob_every_dir(generated_dir))
+        timed("index, cold", lambda: list(PortfolioIndex(generated_dir, index_file).iter_rows()))
+        index = PortfolioIndex(generated_dir, index_file)
+        timed("index, new process", lambda: list(index.iter_rows()))
+        timed("index, warm", lambda: list(index.iter_rows()))
+        timed("index, one page of 50", lambda: list(index.iter_rows(0, 50)))
+
+if __name__ == "__main__":
+    main()
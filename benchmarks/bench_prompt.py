@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for prompt building.
+
+Compares generate_prompt (compiled template, one chosen STYLE per paragraph)
+against the list-and-join builder it replaced, which sent every STYLE variant,
+and against the legacy prompt generator.
+
+Usage:
+    python benchmarks/bench_prompt.py --number 2000
+"""
+
+import argparse
+import json
+import sys
+import timeit
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils import generate_statement_prompt as prompt_module
+from app.utils import generate_statement_prompt_legacy as legacy_module
+from app.utils.generate_statement_prompt import (
+    generate_prompt, get_mock_student_responses, get_prompt_template
+)
+from app.utils.token_budget import estimate_tokens
+
+def join_builder(student_responses):
+    """The previous generate_prompt body: rebuild the parts list (with every STYLE) per call."""
+    q4 = str(student_responses.get('q4', ''))
+    prompt_parts = list(prompt_module.INSTRUCTION_PARTS)
+    prompt_parts += [
+        prompt_module.RESPONSES_HEADING,
+        json.dumps(student_responses, indent=2),
+        prompt_module.TEMPLATE_HEADING,
+        prompt_module.TITLE_TEMPLATE,
+    ]
+    for _, heading, body in prompt_module.SECTION_TEMPLATES:
+        prompt_parts.append(heading)
+        prompt_parts.extend(line.replace(prompt_module.Q4_SLOT, q4) for line in body)
+    prompt_parts += prompt_module.VARIETY_INSTRUCTIONS
+    prompt_parts += prompt_module.RANDOMIZATION_INSTRUCTIONS
+    prompt_parts += prompt_module.FINAL_REMINDER
+    return "\n".join(prompt_parts)
+
+def bench(label, func, responses, number):
+    best = min(timeit.repeat(lambda: func(responses), number=number, repeat=5))
+    per_call = best / number * 1e6
+    prompt = func(responses)
+    print(f"{label:<32} {per_call:9.1f} us/call  {len(prompt):7d} chars  "
+          f"~{estimate_tokens(prompt):5d} tokens")
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt building microbenchmark")
+    parser.add_argument('--number', type=int, default=2000, help='Calls per timing run')
+    args = parser.parse_args()
+
+    responses = get_mock_student_responses()
+    get_prompt_template()  # compile outside the timed loop
+
+    bench("legacy generate_prompt", legacy_module.generate_prompt, responses, args.number)
+    join = bench("list-and-join builder", join_builder, responses, args.number)
+    compiled = bench("generate_prompt", generate_prompt, responses, args.number)
+    print(f"\ngenerate_prompt is {join / compiled:.1f}x faster than list-and-join; "
+          f"static prefix {len(get_prompt_template().static_prefix)} chars")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark for loading the questionnaire questions.
+
+Compares the single-pass parser with the previous parser, which scanned back up
+to 10 lines for every question's title, and times loading the questions from the
+compiled cache file and from the in-process cache.
+
+Usage:
+    python benchmarks/bench_questions.py --number 2000
+"""
+
+import argparse
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.question_cache import QuestionCache, default_questions_file, parse_questions
+
+def scan_back_parser(content):
+    """The previous InteractiveQuestionnaire.parse_questions loop."""
+    questions = []
+    lines = content.split('\n')
+    current_section = "Introduction"
+    question_count = 0
+    for i, line in enumerate(lines):
+        if line.startswith('## '):
+            current_section = line.replace('## ', '').strip()
+            continue
+        if '**' in line and '?' in line and any(q in line for q in ['What', 'How', 'Why', 'Describe']):
+            question_count += 1
+            title = ""
+            for j in range(i-1, max(0, i-10), -1):
+                if lines[j].startswith('### '):
+                    title = lines[j].replace('### ', '').strip()
+                    break
+            questions.append({
+                'section': current_section,
+                'title': title or f"Question {question_count}",
+                'text': line.strip().replace('**', ''),
+                'id': f"q{question_count}",
+                'required': True
+            })
+    return questions
+
+def bench(label, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    per_call = best / number * 1e6
+    print(f"{label:<32} {per_call:9.1f} us/call")
+    return per_call
+
+def main():
+    parser = argparse.ArgumentParser(description="Question loading benchmark")
+    parser.add_argument('--number', type=int, default=2000, help='Calls per timing run')
+    args = parser.parse_args()
+
+    questions_file = default_questions_file()
+    content = questions_file.read_text(encoding='utf-8')
+    assert scan_back_parser(content) == parse_questions(content)
+    print(f"{len(parse_questions(content))} questions in {questions_file.name}\n")
+
+    bench("scan-back parser", lambda: scan_back_parser(content), args.number)
+    bench("single-pass parser", lambda: parse_questions(content), args.number)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = Path(tmp) / 'questions.json'
+        QuestionCache(questions_file, cache_file).get()
+        bench("new start (cache file)",
+              lambda: QuestionCache(questions_file, cache_file).get(), args.number)
+        cache = QuestionCache(questions_file, cache_file)
+        cache.get()
+        bench("same process (stat only)", cache.get, args.number)
+
+if __name__ == "__main__":
+    main()
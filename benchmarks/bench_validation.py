@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark for response validation.
+
+Validates synthetic responses with the compiled validator and with the previous
+approach of loading the schema and walking its sections for every validation.
+
+Usage:
+    python benchmarks/bench_validation.py --responses 10000 --files 1000
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.app_config import STATEMENT_SCHEMA
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.response_validator import get_response_validator
+from app.utils.storage import FileStorage
+
+def walk_schema_validate(responses):
+    """The previous validate_responses: parse the schema and walk it on every call."""
+    with open(STATEMENT_SCHEMA, 'r', encoding='utf-8') as f:
+        schema = json.load(f)
+    errors = []
+    for section in schema.get('sections', []):
+        for field in section.get('fields', []):
+            field_id = field.get('id')
+            if field.get('required', False) and field_id not in responses:
+                errors.append(f"Missing required field: {field_id}")
+    return errors
+
+def synthetic_responses(count, seed=0):
+    """Build a mix of schema-keyed and questionnaire-keyed responses, some invalid."""
+    rng = random.Random(seed)
+    validator = get_response_validator()
+    named = {
+        'project_title': "Project", 'project_type': "Game",
+        'problem_opportunity': "A problem", 'target_audience': "Students",
+        'technologies': ["Python"], 'learning_goals': "Coding",
+        'timeline': "A year", 'milestones': "Many", 'challenges': "Time",
+    }
+    responses = []
+    for i in range(count):
+        item = dict(named, project_title=f"Project {i}")
+        if rng.random() < 0.2:
+            item['project_type'] = "Podcast"
+        if rng.random() < 0.2:
+            del item['timeline']
+        if i % 2:
+            item = validator.to_question_ids(item)
+        responses.append(item)
+    return responses
+
+def main():
+    parser = argparse.ArgumentParser(description="Response validation benchmark")
+    parser.add_argument('--responses', type=int, default=10000)
+    parser.add_argument('--files', type=int, default=1000)
+    args = parser.parse_args()
+
+    responses = synthetic_responses(args.responses)
+    validator = get_response_validator()
+
+    start = time.perf_counter()
+    invalid = sum(1 for item in responses if validator.validate(item))
+    compiled = time.perf_counter() - start
+    print(f"compiled validator   {args.responses} responses in {compiled * 1000:7.1f} ms "
+          f"({invalid} invalid)")
+
+    start = time.perf_counter()
+    for item in responses:
+        walk_schema_validate(item)
+    walked = time.perf_counter() - start
+    print(f"schema walk per call {args.responses} responses in {walked * 1000:7.1f} ms "
+          f"(required fields only)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        responses_dir = Path(tmp) / 'responses'
+        responses_dir.mkdir()
+        for i, item in enumerate(responses[:args.files]):
+            with open(responses_dir / f"student_{i:05d}.json", 'w', encoding='utf-8') as f:
+                json.dump({'student_id': f"student_{i:05d}", 'responses': item}, f)
+        storage = FileStorage(responses_dir, Path(tmp) / 'generated',
+                              ResponseCatalog(responses_dir, Path(tmp) / 'catalog.json'))
+        start = time.perf_counter()
+        results = validator.validate_storage(storage)
+        elapsed = time.perf_counter() - start
+    print(f"validate_storage     {len(results)} files in {elapsed * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
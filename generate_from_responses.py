@@ -3,20 +3,20 @@
 Simple script to generate a statement from existing responses without interactive input.
 """
 
-import json
 from pathlib import Path
-from app.utils.generate_statement_prompt import generate_prompt
+from app.utils.generate_statement_prompt import choose_styles, generate_prompt, statement_header
 from app.utils.gemini_utils import configure_gemini, generate_statement
-from app.app_config import RESPONSES_DIR, GENERATED_DIR
+from app.utils.storage import get_storage
 
 def generate_from_file(responses_file='student_responses.json'):
     """Generate a statement from an existing responses file."""
     # Find the responses file
-    responses_path = RESPONSES_DIR / responses_file
-    if not responses_path.exists():
+    storage = get_storage()
+    responses_path = storage.find_responses(responses_file)
+    if responses_path is None:
         # Try looking in the root directory for backward compatibility
-        responses_path = Path(__file__).parent / responses_file
-        if not responses_path.exists():
+        responses_path = storage.find_responses(Path(__file__).parent / responses_file)
+        if responses_path is None:
             print(f"Error: Could not find responses file {responses_file}")
             return
     
@@ -24,23 +24,16 @@ def generate_from_file(responses_file='student_responses.json'):
     
     # Load the responses
     try:
-        with open(responses_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            
-        # Check if it's the new format with metadata
-        if isinstance(data, dict) and 'responses' in data:
-            responses = data['responses']
-            student_id = data.get('student_id', 'unknown')
-        else:
-            # Assume it's the old format (just a dict of responses)
-            responses = data
-            student_id = 'unknown'
+        record = storage.load_responses(responses_path)
+        responses = record['responses']
+        student_id = record['student_id'] or 'unknown'
         
         print(f"Loaded {len(responses)} responses for student {student_id}")
         
         # Generate the prompt
         print("\nGenerating prompt...")
-        prompt = generate_prompt(responses)
+        selection = choose_styles(responses)
+        prompt = generate_prompt(responses, selection=selection)
         
         # Generate the statement
         print("\nGenerating statement using Gemini API...")
@@ -50,13 +43,8 @@ def generate_from_file(responses_file='student_responses.json'):
         from datetime import datetime
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
-        # Create output directory
-        output_dir = GENERATED_DIR / student_id
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        output_file = output_dir / f'statement_of_intent_{timestamp}.md'
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write(statement.text)
+        output_file = storage.save_statement(student_id, f'statement_of_intent_{timestamp}.md',
+                                             statement_header(responses, selection) + statement)
         
         print(f"\nStatement generated and saved to {output_file}")
         
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Test script for the answer journal and crash recovery.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.interactive_questionnaire import InteractiveQuestionnaire
+from app.utils import answer_journal, storage
+from app.utils.answer_journal import AnswerJournal, replay_journal, write_json_atomic
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.storage import FileStorage
+
+def test_journal_replay_and_fsync_batching(tmp_path):
+    """Test that answers replay in order, torn lines are skipped and fsyncs are batched."""
+    path = tmp_path / 'student.jsonl'
+    journal = AnswerJournal(path, fsync_every=3, fsync_interval=3600)
+    for i in range(7):
+        journal.append(f"q{i % 4 + 1}", f"answer {i}")
+    assert (journal.appends, journal.fsyncs) == (7, 2)
+    journal.close()
+    assert journal.fsyncs == 3
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"id": "q9", "respon')
+    assert replay_journal(path) == {
+        'q1': "answer 4", 'q2': "answer 5", 'q3': "answer 6", 'q4': "answer 3",
+    }
+    assert replay_journal(tmp_path / 'missing.jsonl') == {}
+
+    journal.discard()
+    assert not path.exists()
+    print("[OK] Journal replayed with batched fsyncs")
+
+def test_write_json_atomic(tmp_path):
+    """Test that the target is replaced in one step and no temporary file is left."""
+    path = tmp_path / 'responses.json'
+    write_json_atomic(path, {'responses': {'q1': "Old"}})
+    write_json_atomic(path, {'responses': {'q1': "New"}})
+    assert json.loads(path.read_text(encoding='utf-8')) == {'responses': {'q1': "New"}}
+    assert [p.name for p in tmp_path.iterdir()] == ['responses.json']
+
+    with pytest.raises(TypeError):
+        write_json_atomic(path, {'responses': object()})
+    assert json.loads(path.read_text(encoding='utf-8')) == {'responses': {'q1': "New"}}
+    assert [p.name for p in tmp_path.iterdir()] == ['responses.json']
+    print("[OK] JSON written atomically")
+
+def test_unsaved_answers_recovered_on_load(tmp_path, monkeypatch):
+    """Test that answers survive an exit without saving and are compacted on save."""
+    monkeypatch.setattr(answer_journal, 'JOURNALS_DIR', tmp_path / 'journals')
+    monkeypatch.setattr(storage, '_storage', FileStorage(
+        tmp_path, tmp_path / 'generated', ResponseCatalog(tmp_path, tmp_path / 'catalog.json')))
+
+    first = InteractiveQuestionnaire(student_id="journal_student")
+    first.record_response('q1', "Journal Project")
+    first.save_responses()
+    responses_path = first.responses_path
+    assert not (tmp_path / 'journals' / 'journal_student.jsonl').exists()
+
+    first.record_response('q2', "Game")
+    first.journal.close()  # the session ends without saving
+
+    second = InteractiveQuestionnaire()
+    assert second.load_responses_from_file(responses_path)
+    assert second.student_id == "journal_student"
+    assert second.responses == {'q1': "Journal Project", 'q2': "Game"}
+
+    second.save_responses()
+    saved = json.loads(responses_path.read_text(encoding='utf-8'))
+    assert saved['responses'] == {'q1': "Journal Project", 'q2': "Game"}
+    assert not (tmp_path / 'journals' / 'journal_student.jsonl').exists()
+    print("[OK] Unsaved answers recovered on load")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running answer journal tests...\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_journal_replay_and_fsync_batching(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_write_json_atomic(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_unsaved_answers_recovered_on_load(Path(tmp), monkeypatch)
+        monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
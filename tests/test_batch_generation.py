@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent batch generation.
+
+Uses the offline mock backend, so no API key or network access is needed.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.batch_generation import print_batch_result, run_batch
+from app.utils.generate_statement_prompt import get_mock_student_responses
+from app.utils.generation_backends import MockBackend, get_backend, set_backend
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.storage import FileStorage
+
+@pytest.fixture
+def file_storage(tmp_path):
+    """File storage under a temporary directory."""
+    return FileStorage(tmp_path / 'responses', tmp_path / 'generated',
+                       ResponseCatalog(tmp_path / 'responses', tmp_path / 'catalog.json'))
+
+@pytest.fixture
+def mock_backend():
+    """Install a fast mock backend for the duration of a test."""
+    previous = get_backend()
+    backend = set_backend(MockBackend(latency=0.01, tokens_per_second=0))
+    yield backend
+    set_backend(previous)
+
+def test_batch_survives_a_failing_file(mock_backend, file_storage, capsys):
+    """Test that N files give N results and one bad file doesn't stop the rest."""
+    responses = get_mock_student_responses()
+    refs = [file_storage.save_responses(f'batch{i}', responses['q1'], responses,
+                                        f'game_batch{i}.json')
+            for i in range(4)]
+    broken = file_storage.responses_dir / 'broken.json'
+    broken.write_text('{not json', encoding='utf-8')
+    refs.insert(2, broken)
+
+    results = run_batch(refs, workers=3, storage=file_storage, on_result=print_batch_result,
+                        use_cache=False)
+
+    assert len(results) == len(refs)
+    assert sorted(str(r['file']) for r in results) == sorted(str(ref) for ref in refs)
+    failed = [r for r in results if not r['ok']]
+    assert [r['file'] for r in failed] == [broken]
+    assert sorted(student_id for student_id, _ in file_storage.list_statements()) == \
+        [f'batch{i}' for i in range(4)]
+
+    # Only the per-file report lines are printed, one per file
+    lines = capsys.readouterr().out.splitlines()
+    assert len(lines) == len(refs)
+    assert all(line.startswith(('[OK  ]', '[FAIL]')) for line in lines)
+    print("[OK] Batch survives a failing file")
+
+if __name__ == "__main__":
+    print("Running batch generation tests...\n")
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_path = Path(tmp)
+        previous = set_backend(MockBackend(latency=0.01, tokens_per_second=0))
+        try:
+            storage = FileStorage(tmp_path / 'responses', tmp_path / 'generated',
+                                  ResponseCatalog(tmp_path / 'responses',
+                                                  tmp_path / 'catalog.json'))
+            responses = get_mock_student_responses()
+            refs = [storage.save_responses(f'batch{i}', responses['q1'], responses,
+                                           f'game_batch{i}.json')
+                    for i in range(4)]
+            results = run_batch(refs, workers=3, storage=storage, on_result=print_batch_result,
+                                use_cache=False)
+            assert all(r['ok'] for r in results)
+        finally:
+            set_backend(previous)
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Test script for sweeping empty generated directories.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.generated_dirs import sweep_empty_dirs
+
+def test_sweep_removes_only_empty_dirs(tmp_path):
+    """Test that empty (and empty-nested) directories go and everything else stays."""
+    (tmp_path / '20250101_090000').mkdir()
+    (tmp_path / 'nested' / 'empty').mkdir(parents=True)
+    student_dir = tmp_path / 'student_1'
+    student_dir.mkdir()
+    (student_dir / 'statement.md').write_text("Statement", encoding='utf-8')
+    (student_dir / 'drafts').mkdir()
+
+    expected = {tmp_path / '20250101_090000', tmp_path / 'nested' / 'empty',
+                tmp_path / 'nested', student_dir / 'drafts'}
+    assert set(sweep_empty_dirs(tmp_path, dry_run=True)) == expected
+    assert (tmp_path / 'nested' / 'empty').exists()
+
+    assert set(sweep_empty_dirs(tmp_path)) == expected
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['student_1']
+    assert (student_dir / 'statement.md').exists()
+    assert sweep_empty_dirs(tmp_path) == []
+    print("[OK] Only empty directories swept")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running generated directory tests...\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        test_sweep_removes_only_empty_dirs(Path(tmp))
+    print("\n[SUCCESS] All tests passed!")
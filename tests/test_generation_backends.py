@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for the pluggable generation backends.
+
+Uses the offline mock backend, so no API key or network access is needed.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import settings
+from app.settings import Settings
+from app.utils import generation_backends
+from app.utils.gemini_utils import generate_statement, stream_statement
+from app.utils.generation_backends import MockApiError, MockBackend, get_backend, set_backend
+from app.utils.hedging import RequestHedger, hedged_generate
+
+PROMPT = "# Statement of Intent: Test\n\n## 1.1 Introduction\n\n## 1.2 Rationale\n"
+
+@pytest.fixture
+def mock_backend():
+    """Install a fast mock backend for the duration of a test."""
+    previous = get_backend()
+    backend = set_backend(MockBackend(latency=0, tokens_per_second=0))
+    yield backend
+    set_backend(previous)
+
+def test_mock_output_is_deterministic():
+    """Test that the same prompt and model always give the same text."""
+    backend = MockBackend(latency=0, tokens_per_second=0)
+    first = backend.generate('models/gemini-1.5-flash', PROMPT)
+    assert first == backend.generate('models/gemini-1.5-flash', PROMPT)
+    assert ''.join(backend.stream('models/gemini-1.5-flash', PROMPT)) == first
+    assert "## 1.1 Introduction" in first and "## 1.2 Rationale" in first
+    print("[OK] Mock output is deterministic")
+
+def test_mock_error_injection():
+    """Test that injected errors carry a retryable status code."""
+    backend = MockBackend(latency=0, tokens_per_second=0, error_rate=1.0, error_code=429)
+    with pytest.raises(MockApiError) as excinfo:
+        backend.generate('models/gemini-1.5-flash', PROMPT)
+    assert excinfo.value.code == 429
+    print("[OK] Mock errors injected")
+
+def test_generate_statement_uses_active_backend(mock_backend, tmp_path):
+    """Test that the blocking and streaming paths dispatch through the backend."""
+    text = generate_statement(PROMPT, use_cache=False)
+    assert "## 1.1 Introduction" in text
+
+    stats = {}
+    output_file = tmp_path / "statement.md"
+    streamed = stream_statement(PROMPT, output_file, echo=False, use_cache=False, stats=stats)
+    assert output_file.read_text(encoding='utf-8') == streamed
+    assert stats['time_to_first_token'] is not None
+    assert mock_backend.calls == 2
+
+    # A header goes to the file only
+    header = "<!-- statement-of-intent {} -->\n\n"
+    assert stream_statement(PROMPT, output_file, echo=False, use_cache=False,
+                            header=header) == streamed
+    assert output_file.read_text(encoding='utf-8') == header + streamed
+    print("[OK] Generation dispatched through the mock backend")
+
+def test_hedged_request_to_faster_model_wins():
+    """Test that a slow preferred model is hedged and the fallback's answer is used."""
+    backend = MockBackend(latency=0, tokens_per_second=0,
+                          model_latencies={'slow-model': 2.0})
+    hedger = RequestHedger(max_hedge_ratio=0, burst=1)
+    stats = {}
+    text = hedged_generate(backend, 'slow-model', 'fast-model', PROMPT,
+                           hedge_after=0.05, hedger=hedger, stats=stats)
+    assert text == backend.render('fast-model', PROMPT)
+    assert stats['hedged'] and stats['hedge_won']
+
+    # The budget only allows one hedge, so the next slow request is not duplicated
+    backend.model_latencies['slow-model'] = 0.1
+    stats = {}
+    hedged_generate(backend, 'slow-model', 'fast-model', PROMPT,
+                    hedge_after=0.05, hedger=hedger, stats=stats)
+    assert not stats['hedged']
+    assert hedger.stats()['hedges_denied'] == 1
+    print("[OK] Hedged request won and budget enforced")
+
+def test_backend_selected_in_env_file(tmp_path, monkeypatch):
+    """Test that PORTFOLIO_BACKEND and the mock settings are read from the .env file."""
+    for name in ('PORTFOLIO_BACKEND', 'PORTFOLIO_MOCK_LATENCY', 'PORTFOLIO_MOCK_ERROR_CODE'):
+        monkeypatch.delenv(name, raising=False)
+    env_file = tmp_path / '.env'
+    env_file.write_text("PORTFOLIO_BACKEND=mock\nPORTFOLIO_MOCK_LATENCY=0\n"
+                        "PORTFOLIO_MOCK_ERROR_CODE=often\n", encoding='utf-8')
+    monkeypatch.setattr(settings, '_settings', Settings(env_file))
+    monkeypatch.setattr(generation_backends, '_backend', None)
+
+    backend = get_backend()
+    assert isinstance(backend, MockBackend)
+    assert backend.latency == 0.0
+    # A malformed number falls back to its default
+    assert backend.error_code == 503
+    print("[OK] Backend selected in .env")
+
+if __name__ == "__main__":
+    print("Running backend tests...\n")
+    test_mock_output_is_deterministic()
+    test_mock_error_injection()
+    test_hedged_request_to_faster_model_wins()
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_backend_selected_in_env_file(Path(tmp), monkeypatch)
+        monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
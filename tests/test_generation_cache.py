@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk generation cache.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.generation_cache import GenerationCache, make_cache_key
+
+def test_cache_key_depends_on_prompt_model_and_params():
+    """Test that every part of the request changes the key."""
+    base = make_cache_key("prompt", "model-a", {"temperature": 0.5})
+    assert base == make_cache_key("prompt", "model-a", {"temperature": 0.5})
+    assert base != make_cache_key("prompt!", "model-a", {"temperature": 0.5})
+    assert base != make_cache_key("prompt", "model-b", {"temperature": 0.5})
+    assert base != make_cache_key("prompt", "model-a", {"temperature": 0.9})
+    print("[OK] Cache keys are content-addressed")
+
+def test_cache_hit_and_miss_counters(tmp_path):
+    """Test that hits and misses are counted."""
+    cache = GenerationCache(cache_dir=tmp_path)
+    key = make_cache_key("prompt", "model-a")
+    assert cache.get(key) is None
+    cache.put(key, "statement text", "model-a")
+    assert cache.get(key) == "statement text"
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'writes': 1, 'evictions': 0}
+    print("[OK] Cache counters are correct")
+
+def test_cache_evicts_oldest_entries(tmp_path):
+    """Test that the entry limit evicts the oldest entries first."""
+    cache = GenerationCache(cache_dir=tmp_path, max_entries=2)
+    keys = [make_cache_key(f"prompt {i}", "model-a") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, f"text {i}")
+        # Make the write order visible in the mtimes
+        os.utime(tmp_path / f'{key}.json', (time.time() - 10 + i, time.time() - 10 + i))
+    cache.evict()
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == "text 2"
+    print("[OK] Oldest entries evicted")
+
+def test_cache_expires_old_entries(tmp_path):
+    """Test that entries older than max_age are treated as misses."""
+    cache = GenerationCache(cache_dir=tmp_path, max_age=60)
+    key = make_cache_key("prompt", "model-a")
+    cache.put(key, "stale text")
+    old = time.time() - 120
+    os.utime(tmp_path / f'{key}.json', (old, old))
+    assert cache.get(key) is None
+    assert not (tmp_path / f'{key}.json').exists()
+    print("[OK] Expired entries removed")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running cache tests...\n")
+    test_cache_key_depends_on_prompt_model_and_params()
+    test_cache_hit_and_miss_counters(Path(tempfile.mkdtemp()))
+    test_cache_evicts_oldest_entries(Path(tempfile.mkdtemp()))
+    test_cache_expires_old_entries(Path(tempfile.mkdtemp()))
+    print("\n[SUCCESS] All tests passed!")
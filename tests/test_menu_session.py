@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the iterative main menu session.
+"""
+
+import builtins
+import gc
+import sys
+import weakref
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import app.__main__ as app_main
+from app.__main__ import MenuSession
+
+def stack_depth():
+    frame, depth = sys._getframe(1), 0
+    while frame is not None:
+        frame, depth = frame.f_back, depth + 1
+    return depth
+
+def feed_input(monkeypatch, answers):
+    answers = iter(answers)
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': next(answers))
+
+def test_menu_round_trips_keep_stack_flat(monkeypatch):
+    """Test that returning to the menu hundreds of times doesn't deepen the stack."""
+    depths = []
+    monkeypatch.setattr(app_main, 'list_response_files', lambda: depths.append(stack_depth()))
+    monkeypatch.setattr(app_main, 'list_student_portfolios', lambda *args: None)
+    feed_input(monkeypatch, ['3', ''] * 300 + ['4'])
+
+    MenuSession().run()
+    assert len(depths) == 300
+    assert len(set(depths)) == 1
+    print("[OK] Stack stays flat over menu round trips")
+
+def test_questionnaires_released_between_runs(monkeypatch):
+    """Test that each questionnaire is dropped when the student returns to the menu."""
+    created = []
+
+    class FakeQuestionnaire:
+        def __init__(self, student_id=None):
+            created.append(weakref.ref(self))
+
+        def run(self):
+            return True  # "Press ENTER to return to the main menu"
+
+    monkeypatch.setattr(app_main, 'InteractiveQuestionnaire', FakeQuestionnaire)
+    feed_input(monkeypatch, ['1'] * 50 + ['4'])
+
+    session = MenuSession()
+    session.run()
+    gc.collect()
+    assert len(created) == 50
+    assert session.questionnaire is None
+    assert all(ref() is None for ref in created)
+    print("[OK] Questionnaires released between runs")
+
+if __name__ == "__main__":
+    print("Running menu session tests...\n")
+    for test in (test_menu_round_trips_keep_stack_flat, test_questionnaires_released_between_runs):
+        monkeypatch = pytest.MonkeyPatch()
+        test(monkeypatch)
+        monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test script for the persisted model-resolution cache.
+
+Uses the offline mock backend, so no API key or network access is needed.
+"""
+
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils import model_resolver
+from app.utils.gemini_utils import PREFERRED_MODEL, generate_statement
+from app.utils.generation_backends import MockApiError, MockBackend, get_backend, set_backend
+from app.utils.model_resolver import ModelResolver
+
+MODELS = ['models/gemini-1.5-flash', 'models/gemini-1.5-pro']
+PROMPT = "# Statement of Intent: Test\n\n## 1.1 Introduction\n"
+
+def counting_list_models():
+    """Return a list_models callable that counts its calls."""
+    calls = []
+
+    def list_models():
+        calls.append(1)
+        return list(MODELS)
+    return list_models, calls
+
+def test_failure_ttl_and_mark_ok(tmp_path):
+    """Test that a failure is skipped until it expires or the model works again."""
+    state_file = tmp_path / 'model_state.json'
+    resolver = ModelResolver(state_file)
+    resolver.mark_failed('models/gemini-1.5-flash')
+    assert resolver.is_failing('models/gemini-1.5-flash')
+    assert not resolver.is_failing('models/gemini-1.5-pro')
+
+    resolver.mark_ok('models/gemini-1.5-flash')
+    assert not resolver.is_failing('models/gemini-1.5-flash')
+
+    # A failure older than the TTL is tried again
+    resolver.mark_failed('models/gemini-1.5-flash')
+    state = json.loads(state_file.read_text(encoding='utf-8'))
+    state['failed']['models/gemini-1.5-flash'] = time.time() - 2 * 60 * 60
+    state_file.write_text(json.dumps(state), encoding='utf-8')
+    assert not ModelResolver(state_file).is_failing('models/gemini-1.5-flash')
+    print("[OK] Failure TTL and mark_ok")
+
+def test_resolution_ttl_and_refresh(tmp_path):
+    """Test that the resolved fallback is reused until it expires or is refreshed."""
+    state_file = tmp_path / 'model_state.json'
+    list_models, calls = counting_list_models()
+    resolver = ModelResolver(state_file)
+    assert resolver.resolve_fallback(['gemini-1.5-flash'], list_models) == MODELS[0]
+    assert resolver.resolve_fallback(['gemini-1.5-flash'], list_models) == MODELS[0]
+    assert len(calls) == 1
+    # Another process reuses the persisted choice
+    assert ModelResolver(state_file).resolve_fallback(['gemini-1.5-flash'], list_models) == MODELS[0]
+    assert len(calls) == 1
+
+    expired = ModelResolver(state_file, resolution_ttl=0)
+    expired.resolve_fallback(['gemini-1.5-flash'], list_models)
+    assert len(calls) == 2
+
+    # A failing fallback is dropped and the next one chosen
+    resolver.mark_failed(MODELS[0])
+    assert resolver.resolve_fallback(['gemini-1.5-flash', 'gemini-1.5-pro'],
+                                     list_models) == MODELS[1]
+
+    resolver.refresh()
+    assert not state_file.exists()
+    assert resolver.describe() == {'resolved': {}, 'failed': {}}
+    assert not resolver.is_failing(MODELS[0])
+    resolver.resolve_fallback(['gemini-1.5-flash'], list_models)
+    assert len(calls) == 4
+    print("[OK] Resolution TTL and refresh")
+
+@pytest.mark.parametrize('content', [
+    '{"failed": {"models/gemini-1.5-fl',
+    '[]',
+    '{"failed": [], "resolved": "models/gemini-1.5-flash"}',
+    '{"failed": {"models/gemini-1.5-flash": "yesterday"}, '
+    '"resolved": {"model": "models/gemini-1.5-pro", "resolved_at": null}}',
+])
+def test_corrupt_state_file(tmp_path, content):
+    """Test that a corrupt state file is treated as empty and then repaired."""
+    state_file = tmp_path / 'model_state.json'
+    state_file.write_text(content, encoding='utf-8')
+    list_models, calls = counting_list_models()
+    resolver = ModelResolver(state_file)
+    assert not resolver.is_failing('models/gemini-1.5-flash')
+    assert resolver.resolve_fallback(['gemini-1.5-flash'], list_models) == MODELS[0]
+    assert len(calls) == 1
+    resolver.mark_failed('models/gemini-1.5-pro')
+    state = json.loads(state_file.read_text(encoding='utf-8'))
+    assert 'models/gemini-1.5-pro' in state['failed']
+    print("[OK] Corrupt state file recovered")
+
+def test_state_shared_between_processes(tmp_path):
+    """Test that resolvers on one state file see each other's changes."""
+    state_file = tmp_path / 'model_state.json'
+    first, second = ModelResolver(state_file), ModelResolver(state_file)
+    assert not second.is_failing(PREFERRED_MODEL)
+
+    first.mark_failed(PREFERRED_MODEL)
+    assert second.is_failing(PREFERRED_MODEL)
+    # A change made by one resolver isn't lost when the other saves
+    second.mark_failed('models/gemini-1.5-pro')
+    second.mark_ok(PREFERRED_MODEL)
+    assert not first.is_failing(PREFERRED_MODEL)
+    assert first.is_failing('models/gemini-1.5-pro')
+
+    # Concurrent saves never leave a torn or missing state file behind
+    errors = []
+
+    def hammer(resolver, model_name):
+        try:
+            for _ in range(50):
+                resolver.mark_failed(model_name)
+                resolver.mark_ok(model_name)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer, args=(resolver, f'model-{i}'))
+               for i, resolver in enumerate([first, second, first, second])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    json.loads(state_file.read_text(encoding='utf-8'))
+    assert not list(tmp_path.glob('*.tmp'))
+    print("[OK] State shared between processes")
+
+def test_only_missing_models_are_skipped(tmp_path, monkeypatch):
+    """Test that only a 'model not found' error gets the preferred model skipped."""
+    resolver = ModelResolver(tmp_path / 'model_state_mock.json')
+    monkeypatch.setattr(model_resolver, '_resolvers', {'mock': resolver})
+    previous = get_backend()
+    set_backend(MockBackend(latency=0, tokens_per_second=0, error_rate=1.0, error_code=400))
+    try:
+        # A rejected prompt says nothing about the model
+        with pytest.raises(MockApiError):
+            generate_statement(PROMPT, use_cache=False)
+        assert not resolver.is_failing(PREFERRED_MODEL)
+
+        set_backend(MockBackend(latency=0, tokens_per_second=0,
+                                failing_models=[PREFERRED_MODEL]))
+        stats = {}
+        generate_statement(PROMPT, use_cache=False, stats=stats)
+        assert resolver.is_failing(PREFERRED_MODEL)
+        assert stats['model'] == 'models/gemini-1.5-flash'
+
+        # Once the failure has expired and the preferred model works, it is forgotten
+        state = json.loads(resolver.state_file.read_text(encoding='utf-8'))
+        state['failed'][PREFERRED_MODEL] = time.time() - 2 * 60 * 60
+        resolver.state_file.write_text(json.dumps(state), encoding='utf-8')
+        set_backend(MockBackend(latency=0, tokens_per_second=0))
+        generate_statement(PROMPT, use_cache=False, stats=stats)
+        assert stats['model'] == PREFERRED_MODEL
+        assert PREFERRED_MODEL not in resolver.describe()['failed']
+    finally:
+        set_backend(previous)
+    print("[OK] Only missing models are skipped")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running model resolver tests...\n")
+    for test in (test_failure_ttl_and_mark_ok, test_resolution_ttl_and_refresh,
+                 test_state_shared_between_processes):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        test_corrupt_state_file(Path(tmp), '[]')
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_only_missing_models_are_skipped(Path(tmp), monkeypatch)
+        monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
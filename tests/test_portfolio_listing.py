@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached portfolio listing.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.portfolio_listing import PortfolioIndex, is_statement_file, scan_student_dir
+
+def write_statement(path, age=0):
+    path.write_text("# Statement of Intent\n", encoding='utf-8')
+    if age:
+        past = time.time() - age
+        os.utime(path, (past, past))
+
+def settle(directory):
+    """Backdate a directory's mtime so the index trusts it."""
+    past = time.time() - 60
+    os.utime(directory, (past, past))
+
+def test_both_naming_schemes():
+    """Test that statements are recognised with and without a project title prefix."""
+    assert is_statement_file('statement_of_intent_20250527_080906.md')
+    assert is_statement_file('monkey_magic_arcade_statement_of_intent_20250527_080906.md')
+    assert not is_statement_file('statement_of_intent_draft.md')
+    assert not is_statement_file('notes.md')
+    print("[OK] Both naming schemes recognised")
+
+def test_latest_is_newest_timestamp(tmp_path):
+    """Test that the latest statement is chosen by timestamp, not by file name."""
+    student_dir = tmp_path / '20250101_090000'
+    student_dir.mkdir()
+    # By name 'zebra_...' sorts last, but it's the oldest statement
+    write_statement(student_dir / 'zebra_statement_of_intent_20250101_090000.md', age=30)
+    write_statement(student_dir / 'arcade_statement_of_intent_20250301_090000.md', age=20)
+    write_statement(student_dir / 'statement_of_intent_20250201_090000.md', age=10)
+    (student_dir / 'notes.txt').write_text("notes", encoding='utf-8')
+
+    counts = scan_student_dir(student_dir)
+    assert counts == {'statements': 3, 'latest': 'arcade_statement_of_intent_20250301_090000.md'}
+    print("[OK] Latest statement chosen by timestamp")
+
+def test_rows_cached_by_directory_mtime(tmp_path):
+    """Test that unchanged student directories aren't scanned again, even after a restart."""
+    generated_dir = tmp_path / 'generated'
+    for i in range(5):
+        student_dir = generated_dir / f'2025010{i}_090000'
+        student_dir.mkdir(parents=True)
+        write_statement(student_dir / f'statement_of_intent_2025010{i}_090000.md')
+        settle(student_dir)
+    (generated_dir / 'empty_student').mkdir()
+    index_file = tmp_path / 'index.json'
+
+    index = PortfolioIndex(generated_dir, index_file)
+    rows = list(index.iter_rows())
+    assert [row['id'] for row in rows][:2] == ['empty_student', '20250104_090000']
+    assert rows[0]['statements'] == 0 and rows[0]['latest'] is None
+    assert index.dir_scans == 6
+
+    restarted = PortfolioIndex(generated_dir, index_file)
+    assert [row['statements'] for row in restarted.iter_rows()] == [0, 1, 1, 1, 1, 1]
+    # The empty directory was created just now so it's checked again
+    assert restarted.dir_scans == 1
+
+    student_dir = generated_dir / '20250102_090000'
+    write_statement(student_dir / 'game_statement_of_intent_20250105_090000.md')
+    row = next(r for r in restarted.iter_rows() if r['id'] == '20250102_090000')
+    assert row['statements'] == 2
+    assert row['latest'] == 'game_statement_of_intent_20250105_090000.md'
+    print("[OK] Rows cached by directory mtime")
+
+def test_paging_only_reads_requested_rows(tmp_path):
+    """Test that a page only looks inside the directories it shows."""
+    generated_dir = tmp_path / 'generated'
+    for i in range(10):
+        (generated_dir / f'student_{i:02d}').mkdir(parents=True)
+
+    index = PortfolioIndex(generated_dir, tmp_path / 'index.json')
+    page = list(index.iter_rows(offset=3, limit=3))
+    assert [row['id'] for row in page] == ['student_06', 'student_05', 'student_04']
+    assert index.dir_scans == 3
+    assert index.count() == 10
+    assert list(PortfolioIndex(tmp_path / 'missing', tmp_path / 'other.json').iter_rows()) == []
+    print("[OK] Paging reads only the requested rows")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running portfolio listing tests...\n")
+    test_both_naming_schemes()
+    for test in (test_latest_is_newest_timestamp, test_rows_cached_by_directory_mtime,
+                 test_paging_only_reads_requested_rows):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled prompt template.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.generate_statement_prompt import (
+    SECTION_BLOCKS, PromptTemplate, choose_persona, choose_styles, generate_prompt,
+    get_mock_student_responses, get_prompt_template, persona_seed, read_statement_header, slot,
+    statement_header
+)
+from app.utils.token_budget import estimate_tokens
+
+def test_template_slots():
+    """Test that a template renders its named slots in place."""
+    template = PromptTemplate(f"Hello {slot('name')}, you chose {slot('option')}.")
+    assert template.slots == ('name', 'option')
+    assert template.static_prefix == "Hello "
+    assert template.render(name="Sam", option="{braces}") == "Hello Sam, you chose {braces}."
+    print("[OK] Template slots rendered")
+
+def test_static_tokens_counted_once():
+    """Test that the static text is counted when the template is built (no Python 3.8 APIs)."""
+    template = PromptTemplate(f"Static words {slot('name')} and more static words.")
+    assert 'static_tokens' in vars(template)
+    assert template.static_tokens == sum(estimate_tokens(text) for text in template.literals)
+    print("[OK] Static tokens counted once")
+
+def test_prompt_static_prefix_shared_by_students():
+    """Test that every prompt starts with the same static prefix and includes the student's data."""
+    responses = get_mock_student_responses()
+    other = dict(responses, q1="Another Project", q4="Unity, C#")
+    prefix = get_prompt_template().static_prefix
+
+    first, second = generate_prompt(responses), generate_prompt(other)
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert json.dumps(other, indent=2) in second
+    assert "software (`Unity, C#` if available" in second
+    assert "\x00" not in first
+    print("[OK] Static prefix shared by all students")
+
+def test_only_chosen_styles_are_sent():
+    """Test that one STYLE variant per paragraph is chosen reproducibly and sent unmarked."""
+    responses = get_mock_student_responses()
+    selection = choose_styles(responses)
+    assert selection == choose_styles(responses)
+    assert choose_styles(responses, seed=1) == choose_styles(responses, seed=1)
+    assert sorted(selection) == ['1.1', '1.2', '1.3']
+
+    prompt = generate_prompt(responses, selection=selection)
+    assert "STYLE 1:" not in prompt and "RANDOMLY SELECT ONE OF THESE" not in prompt
+    opening = SECTION_BLOCKS['1.1'][0]
+    for style, variant in enumerate(opening['variants'], 1):
+        assert (variant in prompt) == (style == selection['1.1'][0])
+    print("[OK] Only the chosen styles are sent")
+
+def test_statement_header_reproduces_choices():
+    """Test that a statement's header comment is enough to reproduce its styles and persona."""
+    responses = get_mock_student_responses()
+    text = statement_header(responses) + "# Statement of Intent: Test\n"
+    assert text.startswith("<!--") and "\n\n# Statement of Intent: Test" in text
+
+    metadata, body = read_statement_header(text)
+    assert body == "# Statement of Intent: Test\n"
+    assert metadata['seed'] == persona_seed(responses)
+    assert choose_styles(seed=metadata['seed']) == metadata['styles'] == choose_styles(responses)
+    assert choose_persona({}, seed=metadata['seed']) == choose_persona(responses)
+
+    assert read_statement_header("# Statement of Intent: Test\n") == (
+        None, "# Statement of Intent: Test\n")
+    print("[OK] Statement header reproduces the choices")
+
+if __name__ == "__main__":
+    print("Running prompt template tests...\n")
+    test_template_slots()
+    test_static_tokens_counted_once()
+    test_prompt_static_prefix_shared_by_students()
+    test_only_chosen_styles_are_sent()
+    test_statement_header_reproduces_choices()
+    print("\n[SUCCESS] All tests passed!")
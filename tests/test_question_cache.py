@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-pass question parser and the compiled question cache.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.question_cache import QuestionCache, parse_questions
+
+QUESTIONS_MD = """# Statement of Intent Questions
+
+## Project Overview
+
+### Project Title
+**What is the title of your project?**
+
+### Project Type
+Some guidance text.
+**What type of product will you make?**
+
+## Planning
+
+**How will you plan your time?**
+"""
+
+def test_parse_questions_tracks_headers():
+    """Test that sections and titles come from the current ## and ### headers."""
+    questions = parse_questions(QUESTIONS_MD)
+    assert [q['id'] for q in questions] == ['q1', 'q2', 'q3']
+    assert questions[0] == {
+        'section': 'Project Overview', 'title': 'Project Title',
+        'text': 'What is the title of your project?', 'id': 'q1', 'required': True,
+    }
+    assert questions[1]['title'] == 'Project Type'
+    assert questions[2]['section'] == 'Planning'
+    assert questions[2]['title'] == 'Project Type'
+
+    far = QUESTIONS_MD.replace("**How", "\n" * 10 + "**How")
+    assert parse_questions(far)[2]['title'] == 'Question 3'
+    print("[OK] Questions parsed in one pass")
+
+def test_question_cache_reused_until_edited(tmp_path):
+    """Test that the compiled questions are reused across starts until the file is edited."""
+    questions_file = tmp_path / 'questions.md'
+    questions_file.write_text(QUESTIONS_MD, encoding='utf-8')
+    cache_file = tmp_path / 'cache' / 'questions.json'
+
+    first = QuestionCache(questions_file, cache_file)
+    assert len(first.get()) == 3 and first.parses == 1
+    first.get()[0]['title'] = 'Changed by caller'
+    assert first.get()[0]['title'] == 'Project Title' and first.parses == 1
+
+    second = QuestionCache(questions_file, cache_file)
+    assert second.get() == first.get()
+    assert (second.parses, second.disk_hits) == (0, 1)
+
+    stat = questions_file.stat()
+    os.utime(questions_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    third = QuestionCache(questions_file, cache_file)
+    assert len(third.get()) == 3 and (third.parses, third.disk_hits) == (0, 1)
+
+    questions_file.write_text(QUESTIONS_MD + "\n**Why this project?**\n", encoding='utf-8')
+    assert len(third.get()) == 4 and third.parses == 1
+    print("[OK] Question cache reused until the file is edited")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running question cache tests...\n")
+    test_parse_questions_tracks_headers()
+    with tempfile.TemporaryDirectory() as tmp:
+        test_question_cache_reused_until_edited(Path(tmp))
+    print("\n[SUCCESS] All tests passed!")
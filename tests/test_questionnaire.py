@@ -13,7 +13,11 @@ from pathlib import Path
 # Add the project root to the Python path
 sys.path.append(str(Path(__file__).parent.absolute()))
 
+from app.app_config import find_student_generated_dir
 from app.interactive_questionnaire import InteractiveQuestionnaire
+from app.utils import storage
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.storage import FileStorage
 
 def test_questionnaire_initialization():
     """Test that the questionnaire initializes correctly."""
@@ -30,9 +34,25 @@ def test_question_loading():
     assert len(questionnaire.questions) > 0
     print(f"[OK] Loaded {len(questionnaire.questions)} questions")
 
-def test_responses_saving():
+def test_construction_is_lazy():
+    """Test that construction loads nothing and creates no directories."""
+    print("\nTesting lazy construction...")
+    questionnaire = InteractiveQuestionnaire(student_id="test_lazy_construction")
+    output_dir = find_student_generated_dir(questionnaire.student_id)
+    assert questionnaire._questions is None
+    assert not output_dir.exists()
+    assert len(questionnaire.questions) > 0
+    assert not output_dir.exists()
+    print("[OK] Questions loaded on first access, no output directory created")
+
+def test_responses_saving(tmp_path, monkeypatch):
     """Test that responses can be saved."""
     print("\nTesting response saving...")
+    # Save to a temporary directory with its own catalog, not the real responses
+    responses_dir = tmp_path / 'responses'
+    monkeypatch.setattr(storage, '_storage', FileStorage(
+        responses_dir, tmp_path / 'generated',
+        ResponseCatalog(responses_dir, tmp_path / 'catalog.json')))
     test_responses = {
         "project_title": "Test Project",
         "project_description": "A test project description",
@@ -43,17 +63,20 @@ def test_responses_saving():
     questionnaire = InteractiveQuestionnaire()
     questionnaire.responses = test_responses
     
-    # This will save to a temporary file
     questionnaire.save_responses()
     assert questionnaire.responses_path.exists()
+    assert questionnaire.responses_path.parent == responses_dir
     print(f"[OK] Responses saved to {questionnaire.responses_path}")
-    
-    # Clean up
-    questionnaire.responses_path.unlink()
 
 if __name__ == "__main__":
     print("Running tests...\n")
     test_questionnaire_initialization()
     test_question_loading()
-    test_responses_saving()
+    test_construction_is_lazy()
+    import tempfile
+    import pytest
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_responses_saving(Path(tmp), monkeypatch)
+        monkeypatch.undo()
     print("\n[SUCCESS] All tests passed!")
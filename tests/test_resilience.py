@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the retry and circuit-breaker helpers.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.resilience import (
+    CircuitBreaker, CircuitOpenError, RetryPolicy, call_with_retry, get_retry_after
+)
+
+class FakeApiError(Exception):
+    """Stand-in for an API exception carrying an HTTP status code."""
+
+    def __init__(self, code, retry_after=None):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+        self.retry_after = retry_after
+
+def flaky(failures, code=503):
+    """Return a callable that fails `failures` times before succeeding."""
+    calls = {'count': 0}
+
+    def func():
+        calls['count'] += 1
+        if calls['count'] <= failures:
+            raise FakeApiError(code)
+        return "ok"
+    return func
+
+def test_transient_errors_are_retried():
+    """Test that 503s are retried and the counters are reported."""
+    stats = {}
+    delays = []
+    result = call_with_retry(flaky(2), policy=RetryPolicy(max_attempts=4),
+                             stats=stats, sleep=delays.append)
+    assert result == "ok"
+    assert stats['attempts'] == 3
+    assert stats['retries'] == 2
+    assert stats['backoff_time'] == pytest.approx(sum(delays))
+    print("[OK] Transient errors retried")
+
+def test_permanent_errors_are_not_retried():
+    """Test that a 400 fails immediately."""
+    stats = {}
+    with pytest.raises(FakeApiError):
+        call_with_retry(flaky(1, code=400), stats=stats, sleep=lambda d: None)
+    assert stats['attempts'] == 1
+    print("[OK] Permanent errors not retried")
+
+def test_retry_after_is_honoured():
+    """Test that a server Retry-After hint sets a minimum delay."""
+    policy = RetryPolicy(base_delay=0.1, max_delay=0.1)
+    assert get_retry_after(FakeApiError(429, retry_after="7")) == 7.0
+    assert policy.compute_delay(1, retry_after=7.0) == 7.0
+    assert policy.compute_delay(1) <= 0.1
+    print("[OK] Retry-After honoured")
+
+def test_circuit_breaker_fails_fast():
+    """Test that the breaker opens after repeated failures and rejects calls."""
+    breaker = CircuitBreaker("test-model", failure_threshold=2, reset_timeout=60)
+    with pytest.raises(FakeApiError):
+        call_with_retry(flaky(10), policy=RetryPolicy(max_attempts=2),
+                        breaker=breaker, sleep=lambda d: None)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        call_with_retry(flaky(0), breaker=breaker, sleep=lambda d: None)
+    print("[OK] Circuit breaker fails fast")
+
+def test_circuit_breaker_recovers_after_probe():
+    """Test that a successful probe closes the breaker again."""
+    breaker = CircuitBreaker("test-model", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert call_with_retry(flaky(0), breaker=breaker) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    print("[OK] Circuit breaker recovers")
+
+if __name__ == "__main__":
+    print("Running resilience tests...\n")
+    test_transient_errors_are_retried()
+    test_permanent_errors_are_not_retried()
+    test_retry_after_is_honoured()
+    test_circuit_breaker_fails_fast()
+    test_circuit_breaker_recovers_after_probe()
+    print("\n[SUCCESS] All tests passed!")
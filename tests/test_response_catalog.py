@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent response catalog.
+"""
+
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.app_config import RESPONSES_DIR
+from app.utils.response_catalog import (
+    FORMAT_FLAT, FORMAT_METADATA, FORMAT_UNREADABLE, RESPONSE_CATALOG_FILE, ResponseCatalog
+)
+from app.utils.storage import FileStorage
+
+def write_responses(path, data, age=0):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    if age:
+        past = time.time() - age
+        os.utime(path, (past, past))
+
+def settle(directory):
+    """Backdate a directory's mtime so the catalog trusts it."""
+    past = time.time() - 60
+    os.utime(directory, (past, past))
+
+def test_catalog_reads_metadata(tmp_path):
+    """Test that entries carry the metadata of each format, newest first."""
+    responses_dir = tmp_path / 'responses'
+    responses_dir.mkdir()
+    write_responses(responses_dir / 'game_20250101_090000.json',
+                    {'student_id': '20250101_090000', 'project_title': 'Game',
+                     'timestamp': '2025-01-01T09:00:00', 'responses': {'q1': 'Game'}}, age=30)
+    write_responses(responses_dir / 'old.json', {'q1': 'Old'}, age=20)
+    (responses_dir / 'broken.json').write_text("{", encoding='utf-8')
+    (responses_dir / 'notes.txt').write_text("not a responses file", encoding='utf-8')
+
+    entries = ResponseCatalog(responses_dir, tmp_path / 'index.json').entries()
+    assert [e['name'] for e in entries] == ['broken.json', 'old.json',
+                                            'game_20250101_090000.json']
+    assert [e['format'] for e in entries] == [FORMAT_UNREADABLE, FORMAT_FLAT, FORMAT_METADATA]
+    assert entries[2]['student_id'] == '20250101_090000'
+    assert entries[2]['project_title'] == 'Game'
+    assert entries[2]['file'] == responses_dir / 'game_20250101_090000.json'
+    print("[OK] Catalog reads metadata")
+
+def test_catalog_refreshes_incrementally(tmp_path):
+    """Test that unchanged directories aren't scanned and only changed files are parsed."""
+    responses_dir = tmp_path / 'responses'
+    responses_dir.mkdir()
+    for i in range(5):
+        write_responses(responses_dir / f'student_{i}.json',
+                        {'student_id': f'student_{i}', 'responses': {}})
+    settle(responses_dir)
+    index_file = tmp_path / 'index.json'
+
+    catalog = ResponseCatalog(responses_dir, index_file)
+    assert len(catalog.entries()) == 5 and (catalog.scans, catalog.parses) == (1, 5)
+    catalog.entries()
+    assert catalog.scans == 1
+
+    restarted = ResponseCatalog(responses_dir, index_file)
+    assert len(restarted.entries()) == 5 and (restarted.scans, restarted.parses) == (0, 0)
+
+    write_responses(responses_dir / 'student_5.json', {'student_id': 'student_5', 'responses': {}})
+    (responses_dir / 'student_0.json').unlink()
+    names = {e['name'] for e in restarted.entries()}
+    assert 'student_5.json' in names and 'student_0.json' not in names
+    assert (restarted.scans, restarted.parses) == (1, 1)
+
+    write_responses(responses_dir / 'student_1.json', {'student_id': 'renamed', 'responses': {}})
+    restarted.record(responses_dir / 'student_1.json')
+    by_name = {e['name']: e for e in restarted.entries()}
+    assert by_name['student_1.json']['student_id'] == 'renamed'
+    print("[OK] Catalog refreshed incrementally")
+
+def test_student_index_is_exact(tmp_path):
+    """Test that student IDs are looked up exactly, with substring search kept separate."""
+    responses_dir = tmp_path / 'responses'
+    responses_dir.mkdir()
+    write_responses(responses_dir / 'game_20250101_090000.json',
+                    {'student_id': '20250101_090000', 'responses': {}}, age=30)
+    write_responses(responses_dir / 'game_v2_20250101_090000.json',
+                    {'student_id': '20250101_090000', 'responses': {}}, age=10)
+    write_responses(responses_dir / 'film_20250102_100000.json',
+                    {'student_id': '20250102_100000', 'responses': {}}, age=20)
+    index_file = tmp_path / 'index.json'
+
+    catalog = ResponseCatalog(responses_dir, index_file)
+    assert catalog.latest('20250101_090000') == responses_dir / 'game_v2_20250101_090000.json'
+    assert catalog.versions('20250101_090000') == [
+        responses_dir / 'game_v2_20250101_090000.json',
+        responses_dir / 'game_20250101_090000.json',
+    ]
+    assert catalog.latest('2025') is None
+    assert [e['name'] for e in catalog.search('2025')] == [
+        'game_v2_20250101_090000.json', 'film_20250102_100000.json',
+        'game_20250101_090000.json',
+    ]
+
+    write_responses(responses_dir / 'film_20250102_100000.json',
+                    {'student_id': '20250102_100000', 'responses': {}})
+    catalog.record(responses_dir / 'film_20250102_100000.json')
+    assert [e['name'] for e in catalog.search('2025')][0] == 'film_20250102_100000.json'
+
+    index_file.write_text("{}", encoding='utf-8')
+    rebuilt = ResponseCatalog(responses_dir, index_file)
+    rebuilt.rebuild()
+    assert rebuilt.latest('20250102_100000') == responses_dir / 'film_20250102_100000.json'
+    print("[OK] Student IDs looked up exactly")
+
+def test_other_directories_get_their_own_index(tmp_path):
+    """Test that cataloguing another directory never touches the main index file."""
+    assert ResponseCatalog().index_file == RESPONSE_CATALOG_FILE
+    assert ResponseCatalog(RESPONSES_DIR).index_file == RESPONSE_CATALOG_FILE
+
+    first = ResponseCatalog(tmp_path / 'a').index_file
+    second = ResponseCatalog(tmp_path / 'b').index_file
+    assert RESPONSE_CATALOG_FILE not in (first, second)
+    assert first != second
+    assert ResponseCatalog(tmp_path / 'a' / '..' / 'a').index_file == first
+    # As used by `batch --responses-dir`
+    assert FileStorage(tmp_path / 'a').catalog.index_file == first
+    print("[OK] Other directories get their own index")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running response catalog tests...\n")
+    for test in (test_catalog_reads_metadata, test_catalog_refreshes_incrementally,
+                 test_student_index_is_exact, test_other_directories_get_their_own_index):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    print("\n[SUCCESS] All tests passed!")
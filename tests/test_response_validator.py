@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled response validator.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.response_validator import ResponseValidator, get_response_validator
+from app.utils.storage import FileStorage
+
+VALID_NAMED = {
+    'project_title': "Monkey Magic",
+    'project_type': "Game",
+    'problem_opportunity': "Few retro games teach coding.",
+    'target_audience': "Gen X gamers",
+    'technologies': ["Python", "Blender"],
+    'learning_goals': "Shader programming",
+    'timeline': "Term 4 to Term 3",
+    'milestones': "Prototype, beta, release",
+    'challenges': "Performance on a Raspberry Pi",
+}
+
+def codes(errors):
+    return {(error['field'], error['code']) for error in errors}
+
+def test_named_responses_checked_for_types_and_options():
+    """Test required fields, types and options for schema-keyed responses."""
+    validator = get_response_validator()
+    assert validator.validate(VALID_NAMED) == []
+
+    responses = dict(VALID_NAMED, project_type="Podcast", technologies="Python")
+    del responses['timeline']
+    assert codes(validator.validate(responses)) == {
+        ('project_type', 'option'), ('technologies', 'type'), ('timeline', 'missing'),
+    }
+    assert codes(validator.validate(dict(VALID_NAMED, technologies=["Python", "Fortran"]))) == {
+        ('technologies', 'option')
+    }
+    print("[OK] Types and options checked")
+
+def test_only_declared_lengths_enforced():
+    """Test that max_length is checked only for fields whose schema declares it."""
+    validator = ResponseValidator({'sections': [{'fields': [
+        {'id': 'project_title', 'type': 'text', 'max_length': 10},
+        {'id': 'challenges', 'type': 'textarea'},
+    ]}]})
+    assert codes(validator.validate({'project_title': "x" * 11,
+                                     'challenges': "x" * 100000})) == {
+        ('project_title', 'length')
+    }
+    assert validator.validate({'project_title': "x" * 10}) == []
+    # The real schema declares no limits
+    assert get_response_validator().validate(dict(VALID_NAMED, challenges="x" * 100000)) == []
+    print("[OK] Only declared lengths enforced")
+
+def test_question_ids_mapped_to_fields():
+    """Test that questionnaire responses are validated through the id mapping."""
+    validator = get_response_validator()
+    as_questions = validator.to_question_ids(VALID_NAMED)
+    assert as_questions['q1'] == "Monkey Magic" and 'timeline' in as_questions
+    assert validator.to_field_ids(as_questions) == VALID_NAMED
+
+    # Free-text answers from the questionnaire aren't held to the select options
+    responses = {'q1': "Monkey Magic", 'q2': "Video Game", 'q3': "x", 'q4': "Flask",
+                 'q7': "Animation", 'q10': "Gen X", 'q19': "Time"}
+    assert validator.validate(responses) == []
+    del responses['q10']
+    assert codes(validator.validate(responses)) == {('q10', 'missing')}
+    print("[OK] Question ids mapped to schema fields")
+
+def test_validate_storage(tmp_path):
+    """Test that every stored responses file gets its own list of errors."""
+    responses_dir = tmp_path / 'responses'
+    responses_dir.mkdir()
+    (responses_dir / "good.json").write_text(json.dumps({'responses': VALID_NAMED}),
+                                             encoding='utf-8')
+    (responses_dir / "flat.json").write_text(json.dumps({'project_title': "Only a title"}),
+                                             encoding='utf-8')
+    (responses_dir / "broken.json").write_text("{not json", encoding='utf-8')
+    storage = FileStorage(responses_dir, tmp_path / 'generated',
+                          ResponseCatalog(responses_dir, tmp_path / 'catalog.json'))
+
+    results = get_response_validator().validate_storage(storage)
+    by_name = {path.name: errors for path, errors in results.items()}
+    assert by_name['good.json'] == []
+    assert ('project_type', 'missing') in codes(by_name['flat.json'])
+    assert by_name['broken.json'][0]['code'] == 'file'
+    print("[OK] Stored responses validated")
+
+if __name__ == "__main__":
+    print("Running response validator tests...\n")
+    test_named_responses_checked_for_types_and_options()
+    test_only_declared_lengths_enforced()
+    test_question_ids_mapped_to_fields()
+    print("\n[SUCCESS] All tests passed!")
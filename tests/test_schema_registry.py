@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared schema registry.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.app_config import STATEMENT_SCHEMA
+from app.utils.gemini_utils import validate_responses
+from app.utils.schema_registry import SchemaRegistry, get_schema
+
+def test_schema_parsed_once_and_reloaded_on_change(tmp_path):
+    """Test that the schema is only parsed again when the file changes."""
+    schema_file = tmp_path / "schema.json"
+    schema_file.write_text(json.dumps({'sections': []}), encoding='utf-8')
+    registry = SchemaRegistry(schema_file)
+
+    first = registry.get()
+    assert registry.get() is first
+    assert registry.loads == 1
+
+    schema_file.write_text(json.dumps({'sections': [{'id': 'new', 'fields': []}]}),
+                           encoding='utf-8')
+    stat = schema_file.stat()
+    os.utime(schema_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert registry.get()['sections'][0]['id'] == 'new'
+    assert registry.loads == 2
+    print("[OK] Schema parsed once and reloaded on change")
+
+def test_schema_view_is_read_only():
+    """Test that callers can't modify the shared schema."""
+    schema = get_schema()
+    with pytest.raises(TypeError):
+        schema['sections'] = []
+    with pytest.raises(TypeError):
+        schema['sections'][0]['fields'][0]['required'] = False
+    assert get_schema(STATEMENT_SCHEMA) is schema
+    print("[OK] Schema view is read-only")
+
+def test_validate_responses_uses_registry():
+    """Test that validation works without a schema file in the working directory."""
+    is_valid, errors = validate_responses({})
+    assert not is_valid
+    assert "Missing required field: project_title" in errors
+    print("[OK] Validation uses the shared schema")
+
+if __name__ == "__main__":
+    print("Running schema registry tests...\n")
+    test_schema_view_is_read_only()
+    test_validate_responses_uses_registry()
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Test script for section-parallel statement generation.
+
+Uses the offline mock backend, so no API key or network access is needed.
+"""
+
+import builtins
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import interactive_questionnaire
+from app.interactive_questionnaire import InteractiveQuestionnaire
+from app.utils import storage
+from app.utils.batch_generation import generate_for_file
+from app.utils.generate_statement_prompt import (
+    choose_persona, choose_styles, generate_section_prompts, get_mock_student_responses,
+    persona_seed, read_statement_header, section_numbers, sections_for_questions
+)
+from app.utils.generation_backends import MockBackend, get_backend, set_backend
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.section_generation import (
+    generate_statement_by_sections, load_section_state, regenerate_changed_sections,
+    split_sections, stitch_sections
+)
+from app.utils.storage import FileStorage
+
+@pytest.fixture
+def file_storage(tmp_path):
+    """File storage under a temporary directory."""
+    return FileStorage(tmp_path / 'responses', tmp_path / 'generated',
+                       ResponseCatalog(tmp_path / 'responses', tmp_path / 'catalog.json'))
+
+@pytest.fixture
+def mock_backend():
+    """Install a fast mock backend for the duration of a test."""
+    previous = get_backend()
+    backend = set_backend(MockBackend(latency=0, tokens_per_second=0))
+    yield backend
+    set_backend(previous)
+
+def test_section_prompts_share_one_persona():
+    """Test that every section prompt carries the same seeded persona."""
+    responses = get_mock_student_responses()
+    persona = choose_persona(responses)
+    assert persona == choose_persona(responses)
+
+    prompts = generate_section_prompts(responses)
+    assert [p['number'] for p in prompts] == section_numbers()
+    for prompt in prompts:
+        for option in persona.values():
+            assert option in prompt['prompt']
+        assert f"Write ONLY section {prompt['number']}" in prompt['prompt']
+    print("[OK] Section prompts share one persona")
+
+def test_stitching_is_deterministic():
+    """Test that sections are stitched in template order with canonical headings."""
+    sections = {
+        '1.2': "```markdown\n## 1.2 Rationale\n\nBecause.\n```",
+        '1.1': "# Statement of Intent: Stray Title\n\nIntro text without a heading.",
+    }
+    text = stitch_sections("My Project", sections)
+    assert text.startswith("# Statement of Intent: My Project\n\n## 1.1 Introduction")
+    assert text.index("## 1.1") < text.index("## 1.2 Rationale")
+    assert "Stray Title" not in text and "```" not in text
+    print("[OK] Sections stitched in order")
+
+def test_generate_statement_by_sections(mock_backend):
+    """Test that each section is generated by its own call and stitched together."""
+    stats = {}
+    text = generate_statement_by_sections(get_mock_student_responses(), use_cache=False,
+                                          stats=stats)
+    assert mock_backend.calls == len(section_numbers())
+    assert sorted(stats['sections']) == section_numbers()
+    positions = [text.index(f"## {number} ") for number in section_numbers()]
+    assert positions == sorted(positions)
+    print("[OK] Statement generated section by section")
+
+def test_only_changed_sections_are_regenerated(mock_backend, file_storage):
+    """Test that editing one answer regenerates only the sections that use it."""
+    responses = get_mock_student_responses()
+    first = regenerate_changed_sections(responses, 'regen', use_cache=False,
+                                        storage=file_storage)
+    before = split_sections(first.read_text(encoding='utf-8'))
+    assert mock_backend.calls == len(section_numbers())
+
+    assert regenerate_changed_sections(responses, 'regen', use_cache=False,
+                                       storage=file_storage) is None
+    assert load_section_state('regen', file_storage)['styles'] == choose_styles(responses)
+
+    responses['q10'] = "Retro gamers aged 35-55"
+    affected = sections_for_questions(['q10'])
+    assert affected == ['1.3', '1.7']
+    stats = {}
+    second = regenerate_changed_sections(responses, 'regen', use_cache=False, stats=stats,
+                                         storage=file_storage)
+    assert stats['regenerated'] == affected
+    assert mock_backend.calls == len(section_numbers()) + len(affected)
+
+    after = split_sections(second.read_text(encoding='utf-8'))
+    for number in section_numbers():
+        assert (before[number] == after[number]) == (number not in affected)
+    metadata, _ = read_statement_header(second.read_text(encoding='utf-8'))
+    assert metadata == {'seed': persona_seed(responses), 'styles': choose_styles(responses)}
+    print("[OK] Only changed sections regenerated")
+
+@pytest.mark.parametrize('by_section', [False, True])
+def test_batch_statements_record_their_styles(mock_backend, file_storage, by_section):
+    """Test that batch output starts with the seed and style selection it used."""
+    responses = get_mock_student_responses()
+    responses_file = file_storage.save_responses('20250101_090000', None, responses,
+                                                 'game_20250101_090000.json')
+    result = generate_for_file(responses_file, file_storage, use_cache=False,
+                               by_section=by_section)
+    assert result['ok'], result['error']
+    metadata, body = read_statement_header(result['output'].read_text(encoding='utf-8'))
+    assert metadata == {'seed': persona_seed(responses), 'styles': result['styles']}
+    assert body.startswith("# Statement of Intent")
+    print("[OK] Batch statements record their styles")
+
+def test_regeneration_keeps_student_in_questionnaire(mock_backend, file_storage, tmp_path,
+                                                     monkeypatch):
+    """Test that "regenerate changed sections" returns to the questions, not the menu."""
+    monkeypatch.setattr(storage, '_storage', file_storage)
+    monkeypatch.setattr(interactive_questionnaire, 'journal_path',
+                        lambda student_id: tmp_path / f'{student_id}.jsonl')
+    questionnaire = InteractiveQuestionnaire(student_id='regen_student')
+    questionnaire.responses = get_mock_student_responses()
+    results = []
+    regenerate = questionnaire.save_and_regenerate_sections
+    monkeypatch.setattr(questionnaire, 'save_and_regenerate_sections',
+                        lambda: results.append(regenerate()))
+    answers = iter(['8', '', '8', '', '7'])
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': next(answers))
+
+    assert not questionnaire.run()
+    # The first pass writes a statement, the second finds nothing changed
+    assert results == [True, False]
+    assert [student_id for student_id, _ in file_storage.list_statements()] == ['regen_student']
+    print("[OK] Regeneration keeps the student in the questionnaire")
+
+if __name__ == "__main__":
+    print("Running section generation tests...\n")
+    test_section_prompts_share_one_persona()
+    test_stitching_is_deterministic()
+    print("\n[SUCCESS] All tests passed!")
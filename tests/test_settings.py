@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-wide settings.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import settings
+from app.settings import DEFAULT_TOKEN_BUDGET, get_settings, reload_settings
+
+ENV_NAMES = ('PORTFOLIO_BACKEND', 'PORTFOLIO_STORAGE', 'PORTFOLIO_TOKEN_BUDGET')
+
+def unload_settings(tmp_path, monkeypatch):
+    """Unload the settings and point them at an empty .env, counting every load."""
+    for name in ENV_NAMES:
+        # setenv first so that whatever the .env file sets is removed again afterwards
+        monkeypatch.setenv(name, '')
+        monkeypatch.delenv(name)
+    env_file = tmp_path / '.env'
+    env_file.write_text("", encoding='utf-8')
+    monkeypatch.setattr(settings, 'ENV_FILE', env_file)
+    monkeypatch.setattr(settings, '_settings', None)
+
+    loads = []
+
+    class CountingSettings(settings.Settings):
+        def __init__(self, env_file=None):
+            loads.append(env_file or settings.ENV_FILE)
+            super().__init__(env_file)
+
+    monkeypatch.setattr(settings, 'Settings', CountingSettings)
+    return env_file, loads
+
+@pytest.fixture
+def fresh_settings(tmp_path, monkeypatch):
+    """Settings that haven't been loaded yet, as when the program starts."""
+    return unload_settings(tmp_path, monkeypatch)
+
+def test_env_file_read_once(fresh_settings):
+    """Test that get_settings() loads .env once and reuses the instance until a reload."""
+    env_file, loads = fresh_settings
+    env_file.write_text("PORTFOLIO_TOKEN_BUDGET=1234\n", encoding='utf-8')
+
+    first = get_settings()
+    assert first.token_budget == 1234
+    assert get_settings() is first and get_settings() is first
+    assert loads == [env_file]
+
+    reloaded = reload_settings()
+    assert reloaded is not first
+    assert get_settings() is reloaded
+    assert len(loads) == 2
+    print("[OK] .env read once per load")
+
+def test_defaults_without_env_vars(fresh_settings):
+    """Test the defaults used when the variables are set nowhere."""
+    current = get_settings()
+    assert current.generation_backend == 'gemini'
+    assert current.storage_backend == 'files'
+    assert current.token_budget == DEFAULT_TOKEN_BUDGET == 16000
+    print("[OK] Defaults apply when the variables are unset")
+
+if __name__ == "__main__":
+    print("Running settings tests...\n")
+    import tempfile
+    for test in (test_env_file_read_once, test_defaults_without_env_vars):
+        with tempfile.TemporaryDirectory() as tmp:
+            monkeypatch = pytest.MonkeyPatch()
+            test(unload_settings(Path(tmp), monkeypatch))
+            monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
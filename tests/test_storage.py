@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Test script for the file and SQLite storage backends.
+"""
+
+import builtins
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import generate_from_responses
+import rename_files
+from app import interactive_questionnaire, settings
+from app.__main__ import list_student_portfolios, validate_responses_command
+from app.interactive_questionnaire import InteractiveQuestionnaire
+from app.utils import storage
+from app.utils.batch_generation import find_response_files, run_batch
+from app.utils.generate_statement_prompt import (
+    choose_styles, get_mock_student_responses, read_statement_header
+)
+from app.utils.generation_backends import MockBackend, get_backend, set_backend
+from app.utils.response_catalog import FORMAT_FLAT, FORMAT_METADATA, ResponseCatalog
+from app.utils.storage import FileStorage, SQLiteStorage
+
+def file_storage(tmp_path):
+    return FileStorage(tmp_path / 'responses', tmp_path / 'generated',
+                       ResponseCatalog(tmp_path / 'responses', tmp_path / 'catalog.json'))
+
+def check_backend(backend):
+    """Exercise the storage interface the same way for every backend."""
+    first = backend.save_responses('20250101_090000', 'Game', {'q1': 'Game'},
+                                   'game_20250101_090000.json')
+    second = backend.save_responses('20250101_090000', 'Game v2', {'q1': 'Game v2'},
+                                    'game_v2_20250101_090000.json')
+    backend.save_responses('20250102_100000', 'Film', {'q1': 'Film'},
+                           'film_20250102_100000.json')
+
+    assert backend.responses_exists(first)
+    assert backend.find_responses('game_20250101_090000.json') == first
+    assert backend.find_responses('missing.json') is None
+    record = backend.load_responses(second)
+    assert record['ref'] == second and record['format'] == FORMAT_METADATA
+    assert (record['student_id'], record['project_title']) == ('20250101_090000', 'Game v2')
+    assert record['responses'] == {'q1': 'Game v2'}
+    with pytest.raises(FileNotFoundError):
+        backend.load_responses(backend.responses_ref('nobody', 'missing.json'))
+
+    assert backend.latest_responses('20250101_090000') == second
+    assert backend.latest_responses('2025') is None
+    names = [entry['name'] for entry in backend.list_responses()]
+    assert sorted(names) == ['film_20250102_100000.json', 'game_20250101_090000.json',
+                             'game_v2_20250101_090000.json']
+    assert {entry['name'] for entry in backend.search_responses('game')} == {
+        'game_20250101_090000.json', 'game_v2_20250101_090000.json'}
+
+    # Saving under the same name replaces the record
+    backend.save_responses('20250102_100000', 'Film', {'q1': 'Film', 'q2': 'Drama'},
+                           'film_20250102_100000.json')
+    film = backend.latest_responses('20250102_100000')
+    assert backend.load_responses(film)['responses'] == {'q1': 'Film', 'q2': 'Drama'}
+    assert len(backend.list_responses()) == 3
+
+    renamed = backend.rename_responses(first, 'game_v1_20250101_090000.json')
+    assert not backend.responses_exists(first) and backend.responses_exists(renamed)
+
+    backend.save_statement('20250101_090000', 'statement_of_intent_20250101_090000.md',
+                           "# Statement of Intent: Game\n")
+    assert backend.list_statements() == [('20250101_090000',
+                                          'statement_of_intent_20250101_090000.md')]
+    backend.rename_statement('20250101_090000', 'statement_of_intent_20250101_090000.md',
+                             'game_statement_of_intent_20250101_090000.md')
+    assert backend.read_statement('20250101_090000',
+                                  'game_statement_of_intent_20250101_090000.md').startswith(
+        "# Statement of Intent: Game")
+
+    backend.save_statement('20250101_090000', 'game_statement_of_intent_20250103_090000.md',
+                           "# Statement of Intent: Game (newer)\n")
+    assert backend.load_statement('20250101_090000') == (
+        'game_statement_of_intent_20250103_090000.md', "# Statement of Intent: Game (newer)\n")
+    assert backend.load_statement('20250101_090000',
+                                  'game_statement_of_intent_20250101_090000.md')[0] == \
+        'game_statement_of_intent_20250101_090000.md'
+    assert backend.load_statement('20250101_090000', 'missing.md') is None
+    assert backend.list_portfolios() == [{
+        'id': '20250101_090000', 'statements': 2,
+        'latest': 'game_statement_of_intent_20250103_090000.md'}]
+    assert backend.load_statement('nobody') is None
+
+    assert backend.load_section_state('20250101_090000') is None
+    backend.save_section_state('20250101_090000', {'sections': {'1.1': 'abc'}})
+    backend.save_section_state('20250101_090000', {'sections': {'1.1': 'def'}})
+    assert backend.load_section_state('20250101_090000') == {'sections': {'1.1': 'def'}}
+
+def test_file_storage(tmp_path):
+    """Test the file backend, including old flat responses files."""
+    backend = file_storage(tmp_path)
+    check_backend(backend)
+
+    old = tmp_path / 'responses' / 'responses_old.json'
+    old.write_text(json.dumps({'q1': 'Old Game'}), encoding='utf-8')
+    record = backend.load_responses(old)
+    assert record['format'] == FORMAT_FLAT and record['student_id'] is None
+    assert record['responses'] == {'q1': 'Old Game'}
+    assert backend.find_responses(str(old)) == old
+    print("[OK] File storage")
+
+def test_sqlite_storage(tmp_path):
+    """Test the SQLite backend: WAL mode, indexed lookups and transactional saves."""
+    backend = SQLiteStorage(tmp_path / 'portfolio.db')
+    check_backend(backend)
+
+    assert backend.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    plan = ' '.join(row[-1] for row in backend.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT name FROM responses WHERE student_id = ? "
+        "ORDER BY timestamp DESC LIMIT 1", ('x',)))
+    assert 'responses_student' in plan
+
+    # A save that fails part-way leaves the previous record in place
+    film = backend.latest_responses('20250102_100000')
+    with pytest.raises(sqlite3.Error):
+        backend.save_responses('20250102_100000', object(), {'q1': 'Broken'}, film)
+    assert backend.load_responses(film)['responses'] == {'q1': 'Film', 'q2': 'Drama'}
+
+    # A second connection (another process) sees committed saves
+    other = SQLiteStorage(tmp_path / 'portfolio.db')
+    assert other.latest_responses('20250101_090000') == 'game_v2_20250101_090000.json'
+    other.close()
+    backend.close()
+    print("[OK] SQLite storage")
+
+def test_storage_selected_in_env_file(tmp_path, monkeypatch):
+    """Test that PORTFOLIO_STORAGE, PORTFOLIO_DATABASE and PORTFOLIO_SQLITE_WAL work from .env."""
+    for name in ('PORTFOLIO_STORAGE', 'PORTFOLIO_DATABASE', 'PORTFOLIO_SQLITE_WAL'):
+        monkeypatch.delenv(name, raising=False)
+    env_file = tmp_path / '.env'
+    env_file.write_text(f"PORTFOLIO_STORAGE=sqlite\nPORTFOLIO_DATABASE={tmp_path / 'env.db'}\n"
+                        "PORTFOLIO_SQLITE_WAL=0\n", encoding='utf-8')
+    # Nothing has loaded the settings yet, as when the program starts
+    monkeypatch.setattr(settings, 'ENV_FILE', env_file)
+    monkeypatch.setattr(settings, '_settings', None)
+    monkeypatch.setattr(storage, '_storage', None)
+
+    backend = storage.get_storage()
+    assert isinstance(backend, SQLiteStorage) and backend.path == tmp_path / 'env.db'
+    assert backend.conn.execute("PRAGMA journal_mode").fetchone()[0] != 'wal'
+    backend.close()
+    print("[OK] Storage selected in .env")
+
+def test_rename_files_through_storage(tmp_path, monkeypatch):
+    """Test that rename_files.py renames records in the configured backend."""
+    backend = SQLiteStorage(tmp_path / 'portfolio.db')
+    monkeypatch.setattr(storage, '_storage', backend)
+    backend.save_responses('20250101_090000', None, {'q1': 'Monkey Magic'},
+                           'responses_20250101_090000.json')
+    backend.save_statement('20250101_090000', 'statement_of_intent_20250101_091000.md',
+                           "Untitled statement\n")
+
+    rename_files.rename_response_files()
+    rename_files.rename_statement_files()
+
+    assert [entry['name'] for entry in backend.list_responses()] == [
+        'monkey_magic_20250101_090000.json']
+    assert backend.load_responses('monkey_magic_20250101_090000.json')['project_title'] == \
+        'Monkey Magic'
+    assert backend.list_statements() == [
+        ('20250101_090000', 'monkey_magic_statement_of_intent_20250101_091000.md')]
+    backend.close()
+    print("[OK] rename_files.py works through the storage backend")
+
+def test_generate_from_responses_through_storage(tmp_path, monkeypatch):
+    """Test that generate_from_responses.py saves the generated text in the backend."""
+    backend = SQLiteStorage(tmp_path / 'portfolio.db')
+    monkeypatch.setattr(storage, '_storage', backend)
+    monkeypatch.setenv('PORTFOLIO_DISABLE_CACHE', '1')
+    previous = get_backend()
+    set_backend(MockBackend(latency=0, tokens_per_second=0))
+    try:
+        backend.save_responses('20250101_090000', 'Game', {'q1': 'Game'},
+                               'student_responses.json')
+        generate_from_responses.generate_from_file('student_responses.json')
+    finally:
+        set_backend(previous)
+
+    statements = backend.list_statements()
+    assert len(statements) == 1 and statements[0][0] == '20250101_090000'
+    metadata, text = read_statement_header(backend.read_statement(*statements[0]))
+    assert metadata['styles'] == choose_styles({'q1': 'Game'})
+    assert text.startswith("# Statement of Intent")
+    backend.close()
+    print("[OK] generate_from_responses.py saves through the storage backend")
+
+def test_batch_and_questionnaire_through_sqlite(tmp_path, monkeypatch):
+    """Test that batch, validate and the questionnaire keep everything in the database."""
+    backend = SQLiteStorage(tmp_path / 'portfolio.db')
+    monkeypatch.setattr(storage, '_storage', backend)
+    monkeypatch.setattr(interactive_questionnaire, 'journal_path',
+                        lambda student_id: tmp_path / 'journals' / f'{student_id}.jsonl')
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': '')
+    monkeypatch.setenv('PORTFOLIO_DISABLE_CACHE', '1')
+    responses = get_mock_student_responses()
+    for student_id in ('20250101_090000', '20250102_100000'):
+        backend.save_responses(student_id, responses['q1'], responses,
+                               f'game_{student_id}.json')
+    previous = get_backend()
+    mock = set_backend(MockBackend(latency=0, tokens_per_second=0))
+    try:
+        refs = find_response_files()
+        assert refs == ['game_20250101_090000.json', 'game_20250102_100000.json']
+        results = run_batch(refs, workers=2)
+        assert all(result['ok'] for result in results), [r['error'] for r in results]
+        assert sorted(validate_responses_command()) == refs
+
+        questionnaire = InteractiveQuestionnaire(student_id='20250103_110000')
+        questionnaire.responses = dict(responses)
+        assert questionnaire.save_and_generate()
+        calls = mock.calls
+        questionnaire.responses['q10'] = "Retro gamers aged 35-55"
+        assert questionnaire.save_and_regenerate_sections()
+        # Only the sections that use q10 (1.3 and 1.7), found from the stored state
+        assert mock.calls == calls + 2
+    finally:
+        set_backend(previous)
+
+    # The regenerated statement may replace the first one if saved in the same second
+    assert {student_id for student_id, _ in backend.list_statements()} == {
+        '20250101_090000', '20250102_100000', '20250103_110000'}
+    for student_id in ('20250101_090000', '20250102_100000', '20250103_110000'):
+        name, text = backend.load_statement(student_id)
+        assert backend.load_section_state(student_id)['statement_file'] == name
+        assert read_statement_header(text)[0]['styles'] == choose_styles(
+            questionnaire.responses if student_id == '20250103_110000' else responses)
+    assert not list((tmp_path / 'journals').glob('*.md'))
+    backend.close()
+    print("[OK] Batch and questionnaire work through the SQLite backend")
+
+def test_list_portfolios_through_sqlite(tmp_path, monkeypatch):
+    """Test that `list` shows statements saved in the database, a page at a time."""
+    backend = SQLiteStorage(tmp_path / 'portfolio.db')
+    monkeypatch.setattr(storage, '_storage', backend)
+    backend.save_statement('20250101_090000', 'game_statement_of_intent_20250101_091000.md',
+                           "First\n")
+    backend.save_statement('20250101_090000', 'game_statement_of_intent_20250105_091000.md',
+                           "Second\n")
+    backend.save_statement('20250102_100000', 'statement_of_intent_20250102_101000.md',
+                           "Film\n")
+
+    assert list_student_portfolios() == [
+        {'id': '20250102_100000', 'statements': 1,
+         'latest': 'statement_of_intent_20250102_101000.md'},
+        {'id': '20250101_090000', 'statements': 2,
+         'latest': 'game_statement_of_intent_20250105_091000.md'},
+    ]
+    assert [row['id'] for row in list_student_portfolios(page=2, page_size=1)] == [
+        '20250101_090000']
+    assert backend.count_portfolios() == 2
+    backend.close()
+    print("[OK] list shows statements saved in SQLite")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running storage tests...\n")
+    for test in (test_file_storage, test_sqlite_storage):
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_rename_files_through_storage(Path(tmp), monkeypatch)
+        monkeypatch.undo()
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_storage_selected_in_env_file(Path(tmp), monkeypatch)
+        monkeypatch.undo()
+    with tempfile.TemporaryDirectory() as tmp:
+        monkeypatch = pytest.MonkeyPatch()
+        test_generate_from_responses_through_storage(Path(tmp), monkeypatch)
+        monkeypatch.undo()
+    for test in (test_batch_and_questionnaire_through_sqlite,
+                 test_list_portfolios_through_sqlite):
+        with tempfile.TemporaryDirectory() as tmp:
+            monkeypatch = pytest.MonkeyPatch()
+            test(Path(tmp), monkeypatch)
+            monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Test script for the flat and sharded storage layouts and the migration between them.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import app_config, interactive_questionnaire
+from app.app_config import (
+    LAYOUT_FLAT, LAYOUT_SHARDED, find_student_generated_dir, get_storage_layout,
+    iter_student_dirs, shard_parts, student_generated_dir, student_responses_dir
+)
+from app.interactive_questionnaire import InteractiveQuestionnaire
+from app.utils.layout_migration import migrate_layout
+from app.utils import storage
+from app.utils.portfolio_listing import PortfolioIndex
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.storage import FileStorage
+
+def write_responses(responses_dir, student_id, name=None):
+    path = responses_dir / (name or f'game_{student_id}.json')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'student_id': student_id, 'responses': {'q1': 'Game'}}),
+                    encoding='utf-8')
+    return path
+
+def write_statement(student_dir, name='game_statement_of_intent_20250101_090000.md'):
+    student_dir.mkdir(parents=True, exist_ok=True)
+    (student_dir / name).write_text("# Statement of Intent: Game\n", encoding='utf-8')
+
+def test_path_resolution(tmp_path, monkeypatch):
+    """Test that paths resolve per layout and the layout is recorded in LAYOUT_FILE."""
+    monkeypatch.setattr(app_config, 'LAYOUT_FILE', tmp_path / 'layout')
+    assert get_storage_layout() == LAYOUT_FLAT
+    first, second = shard_parts('20250101_090000')
+    assert len(first) == len(second) == 1
+
+    assert student_responses_dir('20250101_090000', tmp_path) == tmp_path
+    assert student_generated_dir('20250101_090000', tmp_path) == tmp_path / '20250101_090000'
+    app_config.set_storage_layout(LAYOUT_SHARDED)
+    assert get_storage_layout() == LAYOUT_SHARDED
+    assert student_responses_dir('20250101_090000', tmp_path) == tmp_path / first / second
+    assert (student_generated_dir('20250101_090000', tmp_path)
+            == tmp_path / first / second / '20250101_090000')
+
+    # An existing flat directory is still found after switching
+    write_statement(tmp_path / 'old_student')
+    assert find_student_generated_dir('old_student', tmp_path) == tmp_path / 'old_student'
+    with pytest.raises(ValueError):
+        app_config.set_storage_layout('nested')
+    print("[OK] Paths resolved per layout")
+
+def test_readers_accept_both_layouts(tmp_path, monkeypatch):
+    """Test that the catalog and portfolio listing see files in either layout."""
+    monkeypatch.setattr(app_config, 'LAYOUT_FILE', tmp_path / 'layout')
+    responses_dir, generated_dir = tmp_path / 'responses', tmp_path / 'generated'
+    write_responses(responses_dir, 'flat_student')
+    write_statement(generated_dir / 'flat_student')
+    app_config.set_storage_layout(LAYOUT_SHARDED)
+    sharded = student_responses_dir('sharded_student', responses_dir, LAYOUT_SHARDED)
+    write_responses(sharded, 'sharded_student')
+    write_statement(student_generated_dir('sharded_student', generated_dir, LAYOUT_SHARDED))
+
+    catalog = ResponseCatalog(responses_dir, tmp_path / 'catalog.json')
+    assert catalog.latest('sharded_student') == sharded / 'game_sharded_student.json'
+    assert catalog.latest('flat_student') == responses_dir / 'game_flat_student.json'
+
+    # A save into a new shard is picked up on the next refresh
+    other = student_responses_dir('other_student', responses_dir, LAYOUT_SHARDED)
+    catalog.record(write_responses(other, 'other_student'))
+    assert catalog.latest('other_student') == other / 'game_other_student.json'
+
+    assert sorted(name for name, _ in iter_student_dirs(generated_dir)) == [
+        'flat_student', 'sharded_student']
+    rows = list(PortfolioIndex(generated_dir, tmp_path / 'index.json').iter_rows())
+    assert [(row['id'], row['statements']) for row in rows] == [
+        ('sharded_student', 1), ('flat_student', 1)]
+    print("[OK] Readers accept both layouts")
+
+def test_migration_round_trip(tmp_path, monkeypatch):
+    """Test migrating to the sharded layout and back, with an old flat file and a conflict."""
+    monkeypatch.setattr(app_config, 'LAYOUT_FILE', tmp_path / 'layout')
+    responses_dir, generated_dir = tmp_path / 'responses', tmp_path / 'generated'
+    for i in range(5):
+        write_responses(responses_dir, f'student_{i}')
+        write_statement(generated_dir / f'student_{i}')
+    (responses_dir / 'old.json').write_text(json.dumps({'q1': 'Old'}), encoding='utf-8')
+    # student_0 already generated a statement in the sharded layout (an earlier,
+    # interrupted migration left the root marked as sharded)
+    app_config.mark_sharded(generated_dir)
+    write_statement(student_generated_dir('student_0', generated_dir, LAYOUT_SHARDED),
+                    'new_statement_of_intent_20250201_090000.md')
+
+    dry = migrate_layout(LAYOUT_SHARDED, responses_dir, generated_dir, dry_run=True)
+    assert (dry['responses_moved'], dry['statements_moved']) == (5, 5)
+    assert get_storage_layout() == LAYOUT_FLAT
+    assert (responses_dir / 'game_student_1.json').exists()
+
+    result = migrate_layout(LAYOUT_SHARDED, responses_dir, generated_dir)
+    assert get_storage_layout() == LAYOUT_SHARDED
+    assert (result['responses_moved'], result['statements_moved']) == (5, 5)
+    assert result['skipped'] == [responses_dir / 'old.json'] and result['conflicts'] == []
+    assert [p.name for p in responses_dir.glob('*.json')] == ['old.json']
+    for i in range(5):
+        assert (student_responses_dir(f'student_{i}', responses_dir)
+                / f'game_student_{i}.json').exists()
+    merged = student_generated_dir('student_0', generated_dir)
+    assert len(list(merged.glob('*.md'))) == 2
+    assert not (generated_dir / 'student_0').exists()
+
+    catalog = ResponseCatalog(responses_dir, tmp_path / 'catalog.json')
+    assert len(catalog.entries()) == 6
+
+    back = migrate_layout(LAYOUT_FLAT, responses_dir, generated_dir)
+    assert (back['responses_moved'], back['statements_moved']) == (5, 5)
+    assert sorted(p.name for p in generated_dir.iterdir()) == [f'student_{i}' for i in range(5)]
+    assert len(list(responses_dir.iterdir())) == 6
+    assert len(catalog.entries()) == 6
+    assert not (generated_dir / app_config.SHARD_MARKER).exists()
+    print("[OK] Migration round trip")
+
+def test_one_character_students_in_flat_layout(tmp_path, monkeypatch):
+    """Test that student directories named like a shard ('a', '7') are found in the flat layout."""
+    monkeypatch.setattr(app_config, 'LAYOUT_FILE', tmp_path / 'layout')
+    responses_dir, generated_dir = tmp_path / 'responses', tmp_path / 'generated'
+    # Student '7' is sharded below its own name (7/9/7)
+    assert shard_parts('7')[0] == '7'
+    for student_id in ('a', '7', 'student_1'):
+        write_responses(responses_dir, student_id)
+        write_statement(generated_dir / student_id)
+    (responses_dir / 'a').mkdir()
+    write_responses(responses_dir / 'a', 'stray', 'game_stray.json')
+
+    assert sorted(name for name, _ in iter_student_dirs(generated_dir)) == [
+        '7', 'a', 'student_1']
+    catalog = ResponseCatalog(responses_dir, tmp_path / 'catalog.json')
+    assert catalog.latest('stray') is None and len(catalog.entries()) == 3
+
+    # The students keep their directories through a migration and back
+    migrate_layout(LAYOUT_SHARDED, responses_dir, generated_dir)
+    assert student_generated_dir('a', generated_dir).is_dir()
+    assert len(list(student_generated_dir('7', generated_dir).glob('*.md'))) == 1
+    migrate_layout(LAYOUT_FLAT, responses_dir, generated_dir)
+    assert sorted(name for name, _ in iter_student_dirs(generated_dir)) == [
+        '7', 'a', 'student_1']
+    assert len(list((generated_dir / 'a').glob('*.md'))) == 1
+    print("[OK] One-character student IDs kept in the flat layout")
+
+def test_questionnaire_saves_in_sharded_layout(tmp_path, monkeypatch):
+    """Test that saves go to the student's shard once the layout is switched."""
+    monkeypatch.setattr(app_config, 'LAYOUT_FILE', tmp_path / 'layout')
+    monkeypatch.setattr(storage, '_storage', FileStorage(
+        tmp_path / 'responses', tmp_path / 'generated',
+        ResponseCatalog(tmp_path / 'responses', tmp_path / 'catalog.json')))
+    monkeypatch.setattr(interactive_questionnaire, 'journal_path',
+                        lambda student_id: tmp_path / 'journals' / f'{student_id}.jsonl')
+    (tmp_path / 'journals').mkdir()
+    app_config.set_storage_layout(LAYOUT_SHARDED)
+
+    questionnaire = InteractiveQuestionnaire(student_id='sharded_student')
+    questionnaire.responses = {'q1': 'Sharded Game'}
+    assert questionnaire.save_responses()
+    shard = student_responses_dir('sharded_student', tmp_path / 'responses')
+    assert questionnaire.responses_path == shard / 'sharded_game_sharded_student.json'
+    assert questionnaire.responses_path.exists()
+    draft = questionnaire.statement_draft_path()
+    draft.write_text("# Statement of Intent: Sharded Game\n", encoding='utf-8')
+    name = 'sharded_game_statement_of_intent_20250101_090000.md'
+    assert questionnaire.save_statement_draft(draft, name) == student_generated_dir(
+        'sharded_student', tmp_path / 'generated') / name
+    assert not draft.exists()
+    print("[OK] Questionnaire saves in the sharded layout")
+
+if __name__ == "__main__":
+    import tempfile
+    print("Running storage layout tests...\n")
+    for test in (test_path_resolution, test_readers_accept_both_layouts,
+                 test_migration_round_trip, test_one_character_students_in_flat_layout,
+                 test_questionnaire_saves_in_sharded_layout):
+        with tempfile.TemporaryDirectory() as tmp:
+            monkeypatch = pytest.MonkeyPatch()
+            test(Path(tmp), monkeypatch)
+            monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for streamed statement drafts.
+
+Uses the offline mock backend, so no API key or network access is needed.
+"""
+
+import builtins
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import interactive_questionnaire
+from app.interactive_questionnaire import INCOMPLETE_MARKER, InteractiveQuestionnaire
+from app.utils import storage
+from app.utils.gemini_utils import stream_statement
+from app.utils.generate_statement_prompt import get_mock_student_responses
+from app.utils.generation_backends import MockApiError, MockBackend, get_backend, set_backend
+from app.utils.response_catalog import ResponseCatalog
+from app.utils.storage import FileStorage
+
+PROMPT = "# Statement of Intent: Test\n\n## 1.1 Introduction\n\n## 1.2 Rationale\n"
+
+class WatchedBackend(MockBackend):
+    """Mock backend that records the output file's contents before each chunk."""
+
+    def __init__(self, output_file, **kwargs):
+        super().__init__(**kwargs)
+        self.output_file = output_file
+        self.seen = []
+
+    def stream(self, model_name, prompt_text, generation_config=None):
+        for chunk in super().stream(model_name, prompt_text, generation_config):
+            self.seen.append(self.output_file.read_text(encoding='utf-8'))
+            yield chunk
+
+@pytest.fixture
+def questionnaire_env(tmp_path, monkeypatch):
+    """Questionnaire storage and journals under a temporary directory."""
+    file_storage = FileStorage(tmp_path / 'responses', tmp_path / 'generated',
+                               ResponseCatalog(tmp_path / 'responses', tmp_path / 'catalog.json'))
+    monkeypatch.setattr(storage, '_storage', file_storage)
+    monkeypatch.setattr(interactive_questionnaire, 'journal_path',
+                        lambda student_id: tmp_path / 'journals' / f'{student_id}.jsonl')
+    monkeypatch.setattr(builtins, 'input', lambda prompt='': '')
+    monkeypatch.setenv('PORTFOLIO_DISABLE_CACHE', '1')
+    previous = get_backend()
+    yield file_storage, tmp_path / 'journals'
+    set_backend(previous)
+
+def test_chunks_written_as_they_arrive(tmp_path):
+    """Test that each chunk is on disk before the next one is requested."""
+    output_file = tmp_path / 'draft.md'
+    previous = get_backend()
+    backend = set_backend(WatchedBackend(output_file, latency=0, tokens_per_second=1000))
+    try:
+        text = stream_statement(PROMPT, output_file, echo=False, use_cache=False,
+                                header="HEADER\n")
+    finally:
+        set_backend(previous)
+    assert len(backend.seen) > 2
+    # Each chunk is on disk before the next one is requested
+    assert backend.seen[0] == "HEADER\n"
+    for before, after in zip(backend.seen, backend.seen[1:]):
+        assert ("HEADER\n" + text).startswith(after) and len(after) > len(before)
+    assert output_file.read_text(encoding='utf-8') == "HEADER\n" + text
+    print("[OK] Chunks written as they arrive")
+
+def test_interrupted_stream_keeps_incomplete_draft(questionnaire_env):
+    """Test that a mid-stream failure leaves a marked draft, not a finished statement."""
+    file_storage, journals = questionnaire_env
+    set_backend(MockBackend(latency=0, tokens_per_second=0, fail_after_chunks=3))
+    questionnaire = InteractiveQuestionnaire(student_id='stream_cut')
+    questionnaire.responses = get_mock_student_responses()
+
+    assert questionnaire.save_and_generate() is None
+    assert file_storage.list_statements() == []
+    assert not (journals / 'stream_cut.statement.md').exists()
+    draft = (journals / 'stream_cut.statement.incomplete.md').read_text(encoding='utf-8')
+    assert draft.startswith("<!-- statement-of-intent")
+    assert "# Statement of Intent" in draft
+    assert draft.rstrip().endswith("-->")
+    assert INCOMPLETE_MARKER in draft.splitlines()[-1]
+    assert str(MockApiError(503, "Injected mock error mid-stream")) in draft
+    print("[OK] Interrupted stream keeps an incomplete draft")
+
+def test_completed_stream_saved_to_storage(questionnaire_env):
+    """Test that a finished stream is saved as the statement and the draft removed."""
+    file_storage, journals = questionnaire_env
+    set_backend(MockBackend(latency=0, tokens_per_second=0))
+    questionnaire = InteractiveQuestionnaire(student_id='stream_done')
+    questionnaire.responses = get_mock_student_responses()
+
+    assert questionnaire.save_and_generate()
+    assert [student_id for student_id, _ in file_storage.list_statements()] == ['stream_done']
+    name, text = file_storage.load_statement('stream_done')
+    assert name.endswith('.md')
+    assert "# Statement of Intent" in text and INCOMPLETE_MARKER not in text
+    assert not list(journals.glob('*.md'))
+    print("[OK] Completed stream saved to storage")
+
+if __name__ == "__main__":
+    print("Running streaming tests...\n")
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        test_chunks_written_as_they_arrive(Path(tmp))
+    print("\n[SUCCESS] All tests passed!")
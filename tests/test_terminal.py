@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test script for the terminal renderer.
+"""
+
+import io
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.interactive_questionnaire import InteractiveQuestionnaire
+from app.utils.terminal import (
+    CLEAR_BELOW, CURSOR_HOME, TerminalRenderer, progress_bar, supports_ansi
+)
+
+def test_progress_bar():
+    """Test that the bar fills in proportion to the answered questions."""
+    assert progress_bar(0, 4, width=8) == "[--------] 0/4"
+    assert progress_bar(3, 4, width=8) == "[######--] 3/4"
+    assert progress_bar(0, 0, width=8) == "[########] 0/0"
+    print("[OK] Progress bar")
+
+def test_render_in_place_and_plain_fallback(monkeypatch):
+    """Test that ANSI frames redraw in place and dumb terminals get plain text."""
+    out = io.StringIO()
+    TerminalRenderer(out, ansi=True).render(["Title", "two\nrows"])
+    frame = out.getvalue()
+    assert frame.startswith(CURSOR_HOME) and frame.endswith(CLEAR_BELOW)
+    assert frame.count('\x1b[K') == 3
+
+    out = io.StringIO()
+    TerminalRenderer(out).render(["Title"])
+    assert '\x1b' not in out.getvalue() and "Title\n" in out.getvalue()
+
+    class FakeTty(io.StringIO):
+        def isatty(self):
+            return True
+
+    monkeypatch.setenv('TERM', 'dumb')
+    assert not supports_ansi(FakeTty())
+    print("[OK] Rendered in place, plain on dumb terminals")
+
+def test_navigation_spawns_no_processes(monkeypatch):
+    """Test that showing questions never runs a shell command."""
+    def fail(*args, **kwargs):
+        raise AssertionError("a process was spawned")
+    monkeypatch.setattr(os, 'system', fail)
+    monkeypatch.setattr(subprocess, 'Popen', fail)
+
+    questionnaire = InteractiveQuestionnaire(student_id="test_terminal")
+    out = io.StringIO()
+    questionnaire.renderer = TerminalRenderer(out, ansi=True)
+    questionnaire.responses = {'q1': "A project"}
+    questionnaire.display_question(questionnaire.questions[0])
+
+    answered, total = questionnaire.progress()
+    assert answered == 1 and total == len(questionnaire.questions)
+    assert progress_bar(answered, total) in out.getvalue()
+    assert "A project" in out.getvalue()
+    print("[OK] Navigation spawns no processes")
+
+if __name__ == "__main__":
+    print("Running terminal renderer tests...\n")
+    test_progress_bar()
+    for test in (test_render_in_place_and_plain_fallback, test_navigation_spawns_no_processes):
+        monkeypatch = pytest.MonkeyPatch()
+        test(monkeypatch)
+        monkeypatch.undo()
+    print("\n[SUCCESS] All tests passed!")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for prompt token estimation and budgeting.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import settings
+from app.settings import DEFAULT_TOKEN_BUDGET, Settings
+from app.utils.generate_statement_prompt import (
+    generate_prompt, generate_section_prompts, get_mock_student_responses
+)
+from app.utils.token_budget import (
+    TRUNCATION_MARKER, estimate_tokens, fit_responses, get_token_budget
+)
+
+def test_estimate_tokens():
+    """Test that the estimate counts words, long words, digits and punctuation."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("hello world") == 2
+    assert estimate_tokens("internationalisation") == 4
+    assert estimate_tokens("2025, ok!") == 5
+    print("[OK] Token estimates")
+
+def test_token_budget_capped_by_model(monkeypatch):
+    """Test that the budget comes from the settings and is capped by the model limit."""
+    monkeypatch.setenv('PORTFOLIO_TOKEN_BUDGET', '50000')
+    monkeypatch.setattr(settings, '_settings', Settings())
+    assert get_token_budget() == 50000
+    assert get_token_budget('gemini-2.5-flash-preview-05-20') == 50000
+    assert get_token_budget('gemini-pro') == 30720
+    print("[OK] Token budget capped by model limit")
+
+def test_token_budget_from_env_file(monkeypatch, tmp_path):
+    """Test that the budget is read from .env and an invalid value falls back to the default."""
+    monkeypatch.delenv('PORTFOLIO_TOKEN_BUDGET', raising=False)
+    env_file = tmp_path / '.env'
+    env_file.write_text("PORTFOLIO_TOKEN_BUDGET=24000\n", encoding='utf-8')
+    monkeypatch.setattr(settings, '_settings', Settings(env_file))
+    assert get_token_budget() == 24000
+
+    monkeypatch.setenv('PORTFOLIO_TOKEN_BUDGET', '24k')
+    monkeypatch.setattr(settings, '_settings', Settings())
+    assert get_token_budget() == DEFAULT_TOKEN_BUDGET
+    print("[OK] Token budget read from .env")
+
+def test_trimming_steps_in_order():
+    """Test that responses are trimmed step by step only until they fit."""
+    responses = {'q1': "Title", 'q2': "", 'q3': "word " * 400, 'q30': "unused " * 50}
+    full = json.dumps(responses, indent=2)
+
+    text, tokens, steps = fit_responses(responses, 0, estimate_tokens(full))
+    assert (text, steps) == (full, [])
+
+    compact = json.dumps(responses, separators=(',', ':'))
+    _, _, steps = fit_responses(responses, 0, estimate_tokens(compact))
+    assert steps == ['compact_json']
+
+    _, _, steps = fit_responses(responses, 0, estimate_tokens(compact) - 1, ['q1', 'q3'])
+    assert steps == ['compact_json', 'drop_empty']
+
+    text, tokens, steps = fit_responses(responses, 0, 250, ['q1', 'q3'])
+    assert steps == ['compact_json', 'drop_empty', 'referenced_only', 'truncate']
+    assert tokens <= 250 and 'q30' not in json.loads(text)
+    assert json.loads(text)['q3'].endswith(TRUNCATION_MARKER)
+    print("[OK] Trimming steps applied in order")
+
+def test_prompts_fit_budget():
+    """Test that prompts under budget are unchanged and long answers are trimmed to fit."""
+    responses = get_mock_student_responses()
+    stats = {}
+    prompt = generate_prompt(responses, seed=1, stats=stats)
+    assert stats['trimmed'] == [] and json.dumps(responses, indent=2) in prompt
+
+    long_answers = dict(responses, q3="word " * 20000)
+    stats = {}
+    prompt = generate_prompt(long_answers, seed=1, token_budget=12000, stats=stats)
+    assert stats['input_tokens'] <= 12000 and 'truncate' in stats['trimmed']
+    assert abs(estimate_tokens(prompt) - stats['input_tokens']) <= 10
+
+    for section in generate_section_prompts(long_answers, token_budget=5000):
+        assert section['input_tokens'] <= 5000
+    print("[OK] Prompts fit the token budget")
+
+def test_quoted_q4_is_trimmed():
+    """Test that the q4 answer quoted in the instructions is trimmed with the responses."""
+    long_q4 = dict(get_mock_student_responses(), q4="idea " * 20000)
+    stats = {}
+    prompt = generate_prompt(long_q4, seed=1, token_budget=12000, stats=stats)
+    assert stats['input_tokens'] <= 12000 and 'truncate' in stats['trimmed']
+    assert abs(estimate_tokens(prompt) - stats['input_tokens']) <= 10
+    assert "idea " * 20000 not in prompt
+
+    for section in generate_section_prompts(long_q4, token_budget=5000):
+        assert section['input_tokens'] <= 5000
+    print("[OK] Quoted q4 trimmed to fit")
+
+if __name__ == "__main__":
+    import pytest
+    print("Running token budget tests...\n")
+    test_estimate_tokens()
+    test_token_budget_capped_by_model(pytest.MonkeyPatch())
+    test_trimming_steps_in_order()
+    test_prompts_fit_budget()
+    test_quoted_q4_is_trimmed()
+    print("\n[SUCCESS] All tests passed!")